@@ -0,0 +1,96 @@
+import hashlib
+from collections import Counter
+from uuid import uuid4
+
+from django.core.cache import caches
+
+API_CACHE = 'api'
+
+GENERATION_KEY = 'api:generation'
+
+# Hits and misses of this process, kept in memory so counting costs no cache write per request
+response_counts = Counter()
+
+
+def get_cache():
+    return caches[API_CACHE]
+
+
+def new_generation():
+    # Never repeats, so a generation lost to culling cannot bring back the responses cached under an older one
+    return uuid4().hex
+
+
+def get_generation():
+    return get_cache().get_or_set(GENERATION_KEY, new_generation, timeout=None)
+
+
+def peek_generation():
+    # The current generation without creating one, None until the first one is set
+    return get_cache().get(GENERATION_KEY)
+
+
+def bump_generation():
+    # Every cached response is keyed on the generation, so replacing it invalidates all of them at once
+    get_cache().set(GENERATION_KEY, new_generation(), timeout=None)
+
+
+def get_cache_stats():
+    hits = response_counts['hits']
+    misses = response_counts['misses']
+
+    return {
+        'generation': get_generation(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def get_response_cache_key(request):
+    query_params = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+
+    request_key = repr((request.path, query_params, request.META.get('HTTP_ACCEPT', '')))
+
+    return f'api:{get_generation()}:{hashlib.sha1(request_key.encode()).hexdigest()}'
+
+
+class CachedResponseMixin:
+    """
+    Caches successful GET responses of read-only views.
+
+    Responses are keyed on the URL, the query parameters and the Accept header, and on the current generation, which the
+    importer bumps once its changes are committed (see bump_generation). The response carries an X-Cache header with
+    HIT or MISS.
+    """
+
+    cache_responses = True
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or not self.cache_responses:
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        cache_key = get_response_cache_key(request)
+
+        response = cache.get(cache_key)
+
+        if response is not None:
+            response_counts['hits'] += 1
+            response['X-Cache'] = 'HIT'
+
+            return response
+
+        response_counts['misses'] += 1
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            if hasattr(response, 'render'):
+                response.render()
+
+            cache.set(cache_key, response)
+
+        response['X-Cache'] = 'MISS'
+
+        return response
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_cpv_domains(app_configs, **kwargs):
+    domains = settings.CPV_DOMAINS
+
+    if not isinstance(domains, dict) or not all(
+            isinstance(codes, list) and all(isinstance(code, str) for code in codes) for codes in domains.values()):
+        return [Error('CPV_DOMAINS must map domain names to lists of CPV codes', id='api.E001')]
+
+    if settings.CPV_DEFAULT_DOMAIN not in domains:
+        return [Error(f'CPV_DEFAULT_DOMAIN {settings.CPV_DEFAULT_DOMAIN!r} is not one of the CPV_DOMAINS',
+                      hint=f'Add it to CPV_DOMAINS or use one of: {", ".join(domains)}', id='api.E002')]
+
+    return []
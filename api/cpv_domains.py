@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .cache import peek_generation
+from .models import Category
+
+
+class UnknownCPVDomain(Exception):
+    def __init__(self, name):
+        self.name = name
+
+        super().__init__(f'Unknown CPV domain {name}, expected one of: {", ".join(settings.CPV_DOMAINS)}')
+
+
+class CPVDomainCache:
+    """
+    CPV domain name -> ids of the categories in the subtrees of the codes listed for it in settings.CPV_DOMAINS.
+
+    The domains are resolved through the MPTT ranges of their codes on first use, so filtering by a domain is an IN on
+    the category ids instead of a LIKE on the codes. They are kept until the generation of the API cache changes: the
+    importers bump it once their changes are committed (see bump_generation), so every process resolves the domains
+    again after the CPV codes are reloaded.
+    """
+
+    def __init__(self):
+        self.category_ids = None
+        self.generation = None
+
+    def load(self):
+        # Read first, a reload committed while the domains are resolved is picked up on the next use
+        generation = peek_generation()
+
+        codes = {code for domain_codes in settings.CPV_DOMAINS.values() for code in domain_codes}
+        ranges = {code: (tree_id, lft, rght) for code, tree_id, lft, rght in
+                  Category.objects.filter(code__in=codes).order_by().values_list('code', 'tree_id', 'lft', 'rght')}
+
+        category_ids = {}
+
+        for name, domain_codes in settings.CPV_DOMAINS.items():
+            subtrees = Q()
+
+            for tree_id, lft, rght in (ranges[code] for code in domain_codes if code in ranges):
+                subtrees |= Q(tree_id=tree_id, lft__gte=lft, rght__lte=rght)
+
+            # Codes missing from the Category table leave the domain empty rather than matching everything
+            category_ids[name] = frozenset(
+                Category.objects.filter(subtrees).order_by().values_list('id', flat=True) if subtrees else [])
+
+        self.category_ids = category_ids
+        self.generation = generation
+
+    def invalidate(self):
+        self.category_ids = None
+
+    def get_category_ids(self, name):
+        if self.category_ids is None or self.generation != peek_generation():
+            self.load()
+
+        if name not in self.category_ids:
+            raise UnknownCPVDomain(name)
+
+        return self.category_ids[name]
+
+
+cpv_domains = CPVDomainCache()
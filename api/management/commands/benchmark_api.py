@@ -0,0 +1,150 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from ...cache import CachedResponseMixin
+from ...cpv_domains import cpv_domains
+from ...models import Contract, WinnerCpvProfile
+from .benchmark_extractors import percentile
+from .check_query_counts import get_server_name
+from .check_query_plans import get_sample_values
+
+PERCENTILES = [50, 95, 99]
+
+# Endpoint -> function of the sample values returning (URL name, URL kwargs, query parameters, POST body or None)
+ENDPOINTS = {
+    'home-map': lambda values: ('home_map', {}, {}, None),
+    'countries': lambda values: ('countries', {}, {}, None),
+    'categories': lambda values: ('categories', {}, {}, None),
+    'contractors': lambda values: ('contractors', {}, {}, None),
+    'country-overview': lambda values: ('country_overview', {'country_code': values['country']}, {}, None),
+    'country-authorities': lambda values: ('country_authorities', {'country_code': values['country']}, {}, None),
+    'country-contractors': lambda values: ('country_contractors', {'country_code': values['country']}, {}, None),
+    'country-cpv-information': lambda values: ('country_cpv_information', {'country_code': values['country']}, {},
+                                               None),
+    'country-cpv-information-subtree': lambda values: ('country_cpv_information', {'country_code': values['country']},
+                                                       {'subtree': 'true'}, None),
+    'cpv-ranking': lambda values: ('cpv_rankings', {'cpv_code': values['cpv_code']}, {}, None),
+    'cpv-ranking-subtree': lambda values: ('cpv_rankings', {'cpv_code': f'{values["cpv_code"][:2]}000000'},
+                                           {'subtree': 'true'}, None),
+    'authority-details': lambda values: ('authority_details', {'official_name': values['authority']}, {}, None),
+    'authority-contracts': lambda values: ('authority_contracts', {'official_name': values['authority']}, {}, None),
+    'contractor-details': lambda values: ('contractor_details', {'official_name': values['winner']}, {}, None),
+    'contractor-contracts': lambda values: ('winner_object_items', {'official_name': values['winner']}, {}, None),
+    'advanced-search-authorities': lambda values: ('advanced_search', {}, {}, {
+        'authorityOrContractor': 'authority', 'placeOfPerformance': {'code': values['country']}}),
+    'advanced-search-contractors': lambda values: ('advanced_search', {}, {}, {
+        'authorityOrContractor': 'contractor', 'natureOfContract': values['contract_nature']}),
+    'search': lambda values: ('contract_search', {}, {'q': values['search']}, None),
+    'country-time-series': lambda values: ('country_time_series', {'country_code': values['country']}, {}, None),
+    'contractor-time-series': lambda values: ('contractor_time_series', {'official_name': values['winner']},
+                                              {'interval': 'quarter'}, None),
+    'cpv-time-series': lambda values: ('cpv_time_series', {'cpv_code': f'{values["cpv_code"][:2]}000000'},
+                                       {'from': '2020-01', 'to': '2022-12'}, None),
+}
+
+
+class Command(BaseCommand):
+    help = ('Measure the latency percentiles and query counts of every API endpoint on the current data, recorded per '
+            'dataset size (see generate_synthetic_dataset)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Requests per endpoint (default: 50)')
+        parser.add_argument('--only', nargs='+', choices=list(ENDPOINTS), help='Benchmark only these endpoints')
+        parser.add_argument('--cached', action='store_true',
+                            help='Keep the response cache (by default every request reaches the database)')
+        parser.add_argument('--output', metavar='PATH',
+                            help='JSON file the results are added to, keyed by the number of contracts; the p95 '
+                                 'of every size in the file is printed side by side')
+
+    def handle(self, *args, **options):
+        if not Contract.objects.exists() or not WinnerCpvProfile.objects.exists():
+            raise CommandError('The API is benchmarked on imported or generated data, import some documents first')
+
+        dataset_size = Contract.objects.count()
+        values = get_sample_values()
+
+        # Resolved ahead, otherwise the first request that uses a CPV domain would count the queries
+        cpv_domains.load()
+        factory = RequestFactory(SERVER_NAME=get_server_name())
+
+        self.stdout.write(f'{dataset_size} contracts, {options["repeat"]} requests per endpoint')
+
+        results = {}
+
+        for name in options['only'] or list(ENDPOINTS):
+            url_name, url_kwargs, params, body = ENDPOINTS[name](values)
+            path = reverse(url_name, kwargs=url_kwargs)
+
+            view_class = resolve(path).func.view_class
+
+            # Cached responses would only measure the cache
+            view = view_class.as_view(**({'cache_responses': False} if issubclass(view_class, CachedResponseMixin)
+                                         and not options['cached'] else {}))
+
+            # The first request also warms up the connection and the cache
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get_response(view, factory, path, url_kwargs, params, body)
+
+            if response.status_code != 200:
+                raise CommandError(f'{name}: {response.status_code}')
+
+            timings = []
+
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                self.get_response(view, factory, path, url_kwargs, params, body)
+                timings.append(time.perf_counter() - started)
+
+            results[name] = {f'p{percent}_ms': percentile(timings, percent) * 1000 for percent in PERCENTILES}
+            results[name]['query_count'] = len(queries)
+
+            self.stdout.write(f'{name:<32} ' + '  '.join(
+                f'p{percent}: {results[name][f"p{percent}_ms"]:8.2f} ms' for percent in PERCENTILES
+            ) + f'  {len(queries)} queries')
+
+        if options['output']:
+            self.save_results(options['output'], dataset_size, results)
+
+    @staticmethod
+    def get_response(view, factory, path, url_kwargs, params, body):
+        if body is None:
+            request = factory.get(path, params)
+        else:
+            request = factory.post(path, json.dumps(body), content_type='application/json')
+
+        response = view(request, **url_kwargs)
+
+        # DRF responses are rendered by the handler, after the view returns
+        if hasattr(response, 'render'):
+            response.render()
+
+        return response
+
+    def save_results(self, output_path, dataset_size, results):
+        all_results = {}
+
+        if os.path.exists(output_path):
+            with open(output_path) as file:
+                all_results = json.load(file)
+
+        all_results.setdefault(str(dataset_size), {}).update(results)
+
+        with open(output_path, 'w') as file:
+            json.dump(all_results, file, indent=2, sort_keys=True)
+
+        sizes = sorted(all_results, key=int)
+
+        self.stdout.write(f'\np95 by number of contracts ({output_path}):')
+        self.stdout.write(f'{"":<32} ' + ''.join(f'{size:>12}' for size in sizes))
+
+        for name in results:
+            self.stdout.write(f'{name:<32} ' + ''.join(
+                f'{all_results[size][name]["p95_ms"]:9.2f} ms' if name in all_results[size] else f'{"-":>12}'
+                for size in sizes))
@@ -0,0 +1,150 @@
+import os
+import statistics
+import time
+import timeit
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from settings.settings import BASE_DIR
+from ..form_utils.base_helper import BaseHelper
+from ..form_utils.form_03.extract_document import extract_document_data, extract_document_data_streaming, XML_PARSERS
+
+helper = BaseHelper()
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def uncompiled_find_element(obj, el, prefix='.//ns0'):
+    return obj.find(f'{prefix}:{el}', namespaces=helper.namespace)
+
+
+def uncompiled_find_all_elements(obj, el, prefix='.//ns0'):
+    return obj.findall(f'{prefix}:{el}', namespaces=helper.namespace)
+
+
+def first_award_contract_with_val_total(tree):
+    for award_contract in helper.find_all_elements(tree, 'AWARD_CONTRACT'):
+        if helper.element_exists(award_contract, 'VAL_TOTAL'):
+            return award_contract,
+
+    return None
+
+
+# Helper method -> function building its arguments from a parsed document (None when the document has no sample)
+HELPER_CASES = {
+    'find_element': lambda tree: (tree, 'OBJECT_CONTRACT'),
+    'find_all_elements': lambda tree: (tree, 'AWARD_CONTRACT'),
+    'element_exists': lambda tree: (tree, 'LOT_DIVISION'),
+    'get_title': lambda tree: (helper.find_element(tree, 'OBJECT_CONTRACT'),),
+    'get_short_descr': lambda tree: (helper.find_element(tree, 'OBJECT_CONTRACT'),),
+    'check_if_object_lot_no_is_present_in_award_contract': lambda tree: (tree, '1')
+    if helper.find_element(tree, 'LOT_NO') is not None else None,
+    'get_val_total': first_award_contract_with_val_total,
+    'get_val_total_currency': first_award_contract_with_val_total,
+}
+
+# Per call path building and namespace handling, as the helpers did before the paths were compiled
+UNCOMPILED_HELPERS = {
+    'find_element': uncompiled_find_element,
+    'find_all_elements': uncompiled_find_all_elements,
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the tree and streaming extractors (and the BaseHelper lookups) on the test documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Number of passes over the documents (default: 5)')
+        parser.add_argument('--directory', default=str(BASE_DIR / 'api' / 'management' / 'test_documents'),
+                            help='Folder with the XML documents (default: the bundled test documents)')
+        parser.add_argument('--helpers', action='store_true',
+                            help='Also run a micro-benchmark for every BaseHelper lookup method')
+
+    def handle(self, *args, **options):
+        xml_file_paths = sorted(
+            os.path.join(folder_name, filename)
+            for folder_name, sub_folders, filenames in os.walk(options['directory'])
+            for filename in filenames if filename.endswith('.xml')
+        )
+
+        if not xml_file_paths:
+            self.stdout.write(self.style.ERROR(f'No XML documents found in {options["directory"]}'))
+            return
+
+        extractors = {}
+
+        for xml_parser in XML_PARSERS:
+            suffix = '' if xml_parser == 'etree' else f'-{xml_parser}'
+
+            extractors[f'tree{suffix}'] = partial(extract_document_data, xml_parser=xml_parser)
+            extractors[f'streaming{suffix}'] = partial(extract_document_data_streaming, xml_parser=xml_parser)
+
+        expected = [extract_document_data(xml_file_path) for xml_file_path in xml_file_paths]
+
+        results = {}
+
+        for name, extract in extractors.items():
+            mismatches = sum(
+                extract(xml_file_path) != expected_data
+                for xml_file_path, expected_data in zip(xml_file_paths, expected)
+            )
+
+            timings = []
+
+            for _ in range(options['repeat']):
+                for xml_file_path in xml_file_paths:
+                    started = time.perf_counter()
+                    extract(xml_file_path)
+                    timings.append(time.perf_counter() - started)
+
+            results[name] = timings
+
+            self.stdout.write(
+                f'{name:<16} mean: {statistics.mean(timings) * 1000:.3f} ms  '
+                f'p95: {percentile(timings, 95) * 1000:.3f} ms  '
+                f'{len(timings) / sum(timings):.1f} docs/sec  '
+                f'{len(xml_file_paths) - mismatches}/{len(xml_file_paths)} identical',
+                self.style.ERROR if mismatches else None)
+
+        for name, timings in results.items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{name} is {sum(results["tree"]) / sum(timings):.2f}x the tree extractors '
+                f'({len(xml_file_paths)} documents x {options["repeat"]} passes)'))
+
+        if options['helpers']:
+            self.benchmark_helpers(xml_file_paths)
+
+    def benchmark_helpers(self, xml_file_paths):
+        trees = {xml_parser: [parse(xml_file_path) for xml_file_path in xml_file_paths]
+                 for xml_parser, (parse, _) in XML_PARSERS.items()}
+
+        self.stdout.write('\nHelper micro-benchmarks (mean per call over the test documents):')
+
+        for method_name, build_arguments in HELPER_CASES.items():
+            implementations = {
+                xml_parser: (getattr(helper, method_name), parsed_trees)
+                for xml_parser, parsed_trees in trees.items()
+            }
+
+            if method_name in UNCOMPILED_HELPERS:
+                implementations['uncompiled'] = (UNCOMPILED_HELPERS[method_name], trees['etree'])
+
+            timings = []
+
+            for name, (method, parsed_trees) in implementations.items():
+                calls = [arguments for arguments in map(build_arguments, parsed_trees) if arguments is not None]
+
+                if not calls:
+                    continue
+
+                number = max(10000 // len(calls), 1)
+                elapsed = timeit.timeit(lambda: [method(*arguments) for arguments in calls], number=number)
+
+                timings.append(f'{name}: {elapsed / (number * len(calls)) * 1e6:.2f} us')
+
+            self.stdout.write(f'  {method_name:<54} {"  ".join(timings)}')
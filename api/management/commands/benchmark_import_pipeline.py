@@ -0,0 +1,243 @@
+import gc
+import json
+import os
+import statistics
+import time
+import xml.etree.ElementTree as ET
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_databases, teardown_databases
+
+from settings.settings import BASE_DIR
+from ..db_utils.cpv_cache import cpv_cache
+from ..db_utils.entity_cache import authority_cache, winner_cache
+from ..db_utils.save_data import save_data_to_models
+from ..form_utils.form_03.extract_authority import extract_authority_contract_data
+from ..form_utils.form_03.extract_award import map_document_award_contract
+from ..form_utils.form_03.extract_base_contract import extract_base_contract_data
+from ..form_utils.form_03.extract_document import extract_document_data
+from ..form_utils.form_03.extract_object import contract_object_helper, extract_object_data, make_relationship, \
+    map_document_objects
+from .benchmark_extractors import percentile
+from .import_xml_documents_data_to_database import get_doc_id
+
+
+def get_relationship_arguments(tree, date_published):
+    # What extract_object_contract_data hands to make_relationship, built outside of the timed call
+    object_contract = contract_object_helper.find_element(tree, 'OBJECT_CONTRACT')
+    lot_division = contract_object_helper.element_exists(object_contract, 'LOT_DIVISION')
+    items = contract_object_helper.get_object_contract_object_description_items(object_contract)
+
+    return map_document_objects(lot_division, items), map_document_award_contract(tree), date_published
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every stage of the import pipeline separately on the test documents and compare with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Number of passes over the documents (default: 5)')
+        parser.add_argument('--directory', default=str(BASE_DIR / 'api' / 'management' / 'test_documents'),
+                            help='Folder with the XML documents (default: the bundled test documents)')
+        parser.add_argument('--save-baseline', metavar='PATH',
+                            help='Write the results to this JSON file. Saving again on the same documents adds the '
+                                 'run to the baseline, so its spread covers the differences between runs')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare the results with this JSON file')
+        parser.add_argument('--threshold', type=float, default=20,
+                            help='Slowdown of the fastest pass of a stage, in percent of the baseline, reported as a '
+                                 'regression (default: 20)')
+        parser.add_argument('--min-difference', type=float, default=0.05, metavar='MS',
+                            help='Smallest slowdown per document, in milliseconds, reported as a regression '
+                                 '(default: 0.05)')
+
+    def handle(self, *args, **options):
+        xml_file_paths = sorted(
+            os.path.join(folder_name, filename)
+            for folder_name, sub_folders, filenames in os.walk(options['directory'])
+            for filename in filenames if filename.endswith('.xml')
+        )
+
+        if not xml_file_paths:
+            raise CommandError(f'No XML documents found in {options["directory"]}')
+
+        baseline = None
+
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+
+        # Every stage gets the output of the previous ones, computed once before it is timed
+        trees = [ET.parse(xml_file_path) for xml_file_path in xml_file_paths]
+        base_contracts = [extract_base_contract_data(tree) for tree in trees]
+
+        # The importer stops at documents without base contract or authority data
+        extracted = [(tree, base_contract_data['DATE_PUB']) for tree, base_contract_data in zip(trees, base_contracts)
+                     if base_contract_data and extract_authority_contract_data(tree)]
+
+        documents = []
+
+        for xml_file_path, data_dict, warning in map(extract_document_data, xml_file_paths):
+            if not warning:
+                data_dict['BASE_CONTRACT_DATA']['DOC_ID'] = get_doc_id(xml_file_path)
+                documents.append(data_dict)
+
+        stages = {
+            'parse': (ET.parse, [(xml_file_path,) for xml_file_path in xml_file_paths]),
+            'base contract': (extract_base_contract_data, [(tree,) for tree in trees]),
+            'authority': (extract_authority_contract_data, [(tree,) for tree in trees]),
+            'object': (extract_object_data, extracted),
+            '  award mapping': (map_document_award_contract, [(tree,) for tree, _ in extracted]),
+            '  make_relationship': (make_relationship, [get_relationship_arguments(*arguments)
+                                                        for arguments in extracted]),
+        }
+
+        results = {}
+
+        for name, (stage, calls) in stages.items():
+            # One untimed pass warms up the caches of the helpers and the interpreter
+            for arguments in calls:
+                stage(*arguments)
+
+            passes = []
+
+            # Like timeit, a collection in the middle of a pass would be counted against the stage
+            gc.disable()
+
+            try:
+                for _ in range(options['repeat']):
+                    timings = []
+
+                    for arguments in calls:
+                        started = time.perf_counter()
+                        stage(*arguments)
+                        timings.append(time.perf_counter() - started)
+
+                    passes.append(timings)
+            finally:
+                gc.enable()
+
+            results[name.strip()] = self.report(name, passes, baseline, options)
+
+        results['save'] = self.report('save', self.benchmark_save(documents, options['repeat']), baseline, options)
+
+        self.stdout.write(f'({len(xml_file_paths)} documents, {len(documents)} saved, {options["repeat"]} passes, '
+                          f'saved to a new {connection.vendor} database)')
+
+        if options['save_baseline']:
+            self.save_baseline(options['save_baseline'], results, len(xml_file_paths), options['repeat'])
+
+        if baseline is not None:
+            if (baseline['documents'], baseline['vendor']) != (len(xml_file_paths), connection.vendor):
+                self.stdout.write(self.style.WARNING(
+                    f'The baseline was measured on {baseline["documents"]} documents saved to {baseline["vendor"]}'))
+
+            regressions = [name for name, result in results.items() if result.get('regression')]
+
+            if regressions:
+                raise CommandError(f'{len(regressions)} stages are more than {options["threshold"]:g}% and '
+                                   f'{options["min_difference"]:g} ms per document slower than '
+                                   f'{options["baseline"]}: {", ".join(regressions)}')
+
+            self.stdout.write(self.style.SUCCESS(f'No stage is more than {options["threshold"]:g}% and '
+                                                 f'{options["min_difference"]:g} ms per document slower than '
+                                                 f'{options["baseline"]}'))
+
+    def save_baseline(self, output_path, results, document_count, repeat):
+        baseline = {'documents': document_count, 'repeat': repeat, 'vendor': connection.vendor, 'runs': 1,
+                    'stages': results}
+
+        if os.path.exists(output_path):
+            with open(output_path) as file:
+                previous = json.load(file)
+
+            # The same machine can be a lot slower from one run to the next, the passes of a single run do not show it
+            same_documents = (previous['documents'], previous['vendor']) == (document_count, connection.vendor)
+
+            if same_documents and 'runs' in previous:
+                baseline['runs'] = previous['runs'] + 1
+
+                for name, result in results.items():
+                    previous_result = previous['stages'].get(name, result)
+                    result['fastest_ms'] = min(result['fastest_ms'], previous_result['fastest_ms'])
+                    result['slowest_ms'] = max(result['slowest_ms'], previous_result['slowest_ms'])
+                    result['spread_ms'] = result['slowest_ms'] - result['fastest_ms']
+
+        with open(output_path, 'w') as file:
+            json.dump(baseline, file, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f'Baseline saved to {output_path} ({baseline["runs"]} runs)'))
+
+    @staticmethod
+    def benchmark_save(documents, repeat):
+        # A new test database (in memory on SQLite) with the CPV codes, so the numbers do not depend on imported data
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+
+        try:
+            call_command('import_cpv_codes_to_database', stdout=StringIO())
+
+            cpv_cache.load()
+            passes = []
+
+            for _ in range(repeat):
+                # Every pass starts from the same empty tables. The rollback also drops the on_commit callbacks, so
+                # the entity caches stay cold and the API cache is left alone.
+                authority_cache.clear()
+                winner_cache.clear()
+
+                timings = []
+
+                with transaction.atomic():
+                    for data_dict in documents:
+                        started = time.perf_counter()
+                        save_data_to_models(data_dict)
+                        timings.append(time.perf_counter() - started)
+
+                    transaction.set_rollback(True)
+
+                passes.append(timings)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            cpv_cache.invalidate()
+
+        return passes
+
+    def report(self, name, passes, baseline, options):
+        timings = [timing for timings in passes for timing in timings]
+
+        # Mean time per document of every pass. The fastest pass is the least disturbed by the rest of the machine,
+        # the spread between the passes is how far apart two runs of the same code can be.
+        pass_ms = [statistics.mean(timings) * 1000 for timings in passes]
+
+        result = {
+            'mean_ms': statistics.mean(timings) * 1000,
+            'p95_ms': percentile(timings, 95) * 1000,
+            'fastest_ms': min(pass_ms),
+            'slowest_ms': max(pass_ms),
+            'spread_ms': max(pass_ms) - min(pass_ms),
+            'docs_per_sec': len(timings) / sum(timings),
+        }
+
+        line = (f'{name:<20} mean: {result["mean_ms"]:8.3f} ms  p95: {result["p95_ms"]:8.3f} ms  '
+                f'fastest pass: {result["fastest_ms"]:8.3f} ms  {result["docs_per_sec"]:9.1f} docs/sec')
+
+        baseline_result = (baseline or {}).get('stages', {}).get(name.strip())
+
+        if baseline_result is None:
+            self.stdout.write(line)
+            return result
+
+        if 'fastest_ms' not in baseline_result:
+            raise CommandError(f'{options["baseline"]} has no fastest pass per stage, save the baseline again')
+
+        difference = result['fastest_ms'] - baseline_result['fastest_ms']
+        change = difference / baseline_result['fastest_ms'] * 100
+
+        # A slowdown within the spread of the baseline passes is noise
+        result['regression'] = change > options['threshold'] and \
+            difference > max(options['min_difference'], baseline_result['spread_ms'])
+
+        self.stdout.write(f'{line}  {change:+6.1f}% vs baseline', self.style.ERROR if result['regression'] else None)
+
+        return result
@@ -0,0 +1,100 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from ...models import Authority, Country, Winner, WinnerCpvProfile
+from ...pagination import KeysetPaginator
+from ...views import WinnersList, AuthorityContracts, WinnerObjectItems, CountryContractors
+from .benchmark_extractors import percentile
+
+
+def get_busiest(model, relation):
+    return model.objects.annotate(row_count=Count(relation)).order_by('-row_count').first()
+
+
+# Endpoint name -> function returning (view class, view kwargs) for the largest listing in the database
+ENDPOINTS = {
+    'contractors': lambda: (WinnersList, {}),
+    'authority-contracts': lambda: (AuthorityContracts, {
+        'official_name': get_busiest(Authority, 'contract').official_name}),
+    'contractor-contracts': lambda: (WinnerObjectItems, {
+        'official_name': get_busiest(Winner, 'contractobjectitem').official_name}),
+    'country-contractors': lambda: (CountryContractors, {
+        'country_code': get_busiest(Country, 'winnercpvprofile').code}),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare page number (COUNT + OFFSET) and keyset pagination of the listing endpoints at increasing depths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=10, help='Rows per page (default: 10)')
+        parser.add_argument('--depths', type=int, nargs='+', default=[1, 10, 100, 1000, 10000],
+                            help='Page numbers to read (default: 1 10 100 1000 10000, capped at the last page)')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per measurement (default: 20)')
+        parser.add_argument('--only', nargs='+', choices=list(ENDPOINTS), help='Benchmark only these endpoints')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        page_size = options['page_size']
+
+        for name in options['only'] or list(ENDPOINTS):
+            if not Winner.objects.exists() or (name == 'country-contractors' and not WinnerCpvProfile.objects.exists()):
+                self.stdout.write(self.style.WARNING(f'{name}: no data'))
+                continue
+
+            view_class, view_kwargs = ENDPOINTS[name]()
+            view = view_class.as_view(cache_responses=False)
+
+            queryset = view_class(kwargs=view_kwargs, request=None).get_queryset()
+            row_count = queryset.count()
+            last_page = max((row_count - 1) // page_size + 1, 1)
+
+            self.stdout.write(f'\n{name} ({row_count} rows, {last_page} pages of {page_size})')
+
+            keyset = KeysetPaginator(view_class.keyset_ordering, page_size)
+            ordered_queryset = queryset.order_by(*view_class.keyset_ordering)
+
+            for depth in sorted({min(depth, last_page) for depth in options['depths']}):
+                offset_params = {'page': depth, 'page_size': page_size}
+                keyset_params = {'pagination': 'cursor', 'page_size': page_size}
+
+                if depth > 1:
+                    last_row = ordered_queryset[(depth - 1) * page_size - 1]
+                    keyset_params['cursor'] = keyset.encode_cursor(keyset.get_position(last_row))
+
+                results = []
+
+                for mode, params in (('offset', offset_params), ('keyset', keyset_params)):
+                    timings, query_count = self.measure(view, factory, view_kwargs, params, options['repeat'])
+
+                    results.append(f'{mode}: {statistics.mean(timings) * 1000:7.2f} ms '
+                                   f'(p95 {percentile(timings, 95) * 1000:7.2f} ms, '
+                                   f'{query_count} queries)')
+
+                self.stdout.write(f'  page {depth:<7} {"   ".join(results)}')
+
+    @staticmethod
+    def measure(view, factory, view_kwargs, params, repeat):
+        timings = []
+        query_count = 0
+
+        for _ in range(repeat):
+            request = factory.get('/', params)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = view(request, **view_kwargs)
+                timings.append(time.perf_counter() - started)
+
+            if response.status_code != 200:
+                raise RuntimeError(f'{params}: {response.status_code} {response.data}')
+
+            query_count = len(queries)
+
+        return timings, query_count
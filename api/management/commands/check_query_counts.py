@@ -0,0 +1,139 @@
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from ...cache import CachedResponseMixin
+from ...cpv_domains import cpv_domains
+from ...models import Contract, WinnerCpvProfile
+from ...views import AdvancedSearchView, AuthorityContracts, AuthorityDetails, AuthorityTimeSeries, \
+    ContractSearchView, CountryAuthorities, CountryContractors, CountryCPVInformation, CountryInformation, \
+    CountryTimeSeries, CPVCountryRanking, CPVTimeSeries, WinnerDetails, WinnerObjectItems, WinnersList, WinnerTimeSeries
+from .check_query_plans import get_sample_values
+
+PAGE_SIZES = [10, 100]
+
+# Endpoint -> (view class, function of the sample values returning (view kwargs, POST body or None), paginated)
+ENDPOINTS = {
+    'contractors': (WinnersList, lambda values: ({}, None), True),
+    'country-overview': (CountryInformation, lambda values: ({'country_code': values['country']}, None), False),
+    'country-authorities': (CountryAuthorities, lambda values: ({'country_code': values['country']}, None), True),
+    'country-contractors': (CountryContractors, lambda values: ({'country_code': values['country']}, None), True),
+    'country-cpv-information': (CountryCPVInformation, lambda values: ({'country_code': values['country']}, None),
+                                True),
+    'cpv-ranking': (CPVCountryRanking, lambda values: ({'cpv_code': values['cpv_code']}, None), True),
+    'authority-details': (AuthorityDetails, lambda values: ({'official_name': values['authority']}, None), False),
+    'authority-contracts': (AuthorityContracts, lambda values: ({'official_name': values['authority']}, None), True),
+    'contractor-details': (WinnerDetails, lambda values: ({'official_name': values['winner']}, None), False),
+    'contractor-contracts': (WinnerObjectItems, lambda values: ({'official_name': values['winner']}, None), True),
+    'advanced-search-authorities': (AdvancedSearchView, lambda values: ({}, {
+        'authorityOrContractor': 'authority', 'placeOfPerformance': {'code': values['country']}}), True),
+    'advanced-search-contractors': (AdvancedSearchView, lambda values: ({}, {
+        'authorityOrContractor': 'contractor', 'natureOfContract': values['contract_nature']}), True),
+    'search': (ContractSearchView, lambda values: ({}, None), True),
+    'country-time-series': (CountryTimeSeries, lambda values: ({'country_code': values['country']}, None), False),
+    'authority-time-series': (AuthorityTimeSeries, lambda values: ({'official_name': values['authority']}, None),
+                              False),
+    'contractor-time-series': (WinnerTimeSeries, lambda values: ({'official_name': values['winner']}, None), False),
+    'cpv-time-series': (CPVTimeSeries, lambda values: ({'cpv_code': values['cpv_code']}, None), False),
+}
+
+
+def get_server_name():
+    # Absolute URLs (the `next` page links) are built from the request host, which has to be an allowed one
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*':
+            return host.lstrip('.')
+
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = 'Check that every endpoint stays within its query budget and runs as many queries for 10 rows as for 100'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=list(ENDPOINTS), help='Check only these endpoints')
+
+    def handle(self, *args, **options):
+        if not Contract.objects.exists() or not WinnerCpvProfile.objects.exists():
+            raise CommandError('The query counts are checked against imported data, import some documents first')
+
+        values = get_sample_values()
+
+        # Resolved ahead, otherwise the first request that uses a CPV domain would count the queries
+        cpv_domains.load()
+
+        factory = RequestFactory(SERVER_NAME=get_server_name())
+        failures = []
+
+        for name in options['only'] or list(ENDPOINTS):
+            view_class, get_arguments, paginated = ENDPOINTS[name]
+            view_kwargs, body = get_arguments(values)
+
+            # Cached responses would hide the queries
+            view = view_class.as_view(**({'cache_responses': False} if issubclass(view_class, CachedResponseMixin)
+                                         else {}))
+
+            counts = {}
+
+            for mode in self.get_modes(view_class, paginated):
+                params = dict(mode, q=values['search']) if view_class is ContractSearchView else mode
+
+                counts[json.dumps(mode)] = self.count_queries(view, factory, view_kwargs, params, body)
+
+            budget = view_class.query_budget
+            problems = []
+
+            # Cursor pages skip the COUNT, so the page sizes are compared within each pagination mode
+            counts_by_pagination = {}
+
+            for mode, count in counts.items():
+                counts_by_pagination.setdefault(json.loads(mode).get('pagination'), set()).add(count)
+
+            if any(len(pagination_counts) > 1 for pagination_counts in counts_by_pagination.values()):
+                problems.append('query count depends on the page size')
+
+            if max(counts.values()) > budget:
+                problems.append(f'over its budget of {budget}')
+
+            summary = ', '.join(f'{mode}: {count}' for mode, count in counts.items())
+
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: {"; ".join(problems)} ({summary})'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK ({summary}, budget {budget})'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} endpoints fail their query budget: {", ".join(failures)}')
+
+    @staticmethod
+    def get_modes(view_class, paginated):
+        if not paginated:
+            return [{}]
+
+        modes = [{'page_size': page_size} for page_size in PAGE_SIZES]
+
+        if getattr(view_class, 'keyset_ordering', None) is not None:
+            modes += [{'pagination': 'cursor', 'page_size': page_size} for page_size in PAGE_SIZES]
+
+        return modes
+
+    @staticmethod
+    def count_queries(view, factory, view_kwargs, params, body):
+        if body is None:
+            request = factory.get('/', params)
+        else:
+            request = factory.post(f'/?{urlencode(params)}', json.dumps(body), content_type='application/json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, **view_kwargs)
+
+        if response.status_code != 200:
+            raise CommandError(f'{view.view_class.__name__} {params}: {response.status_code} {response.data}')
+
+        return len(queries)
@@ -0,0 +1,137 @@
+import re
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from ...models import Authority, Category, Contract, Country, Winner, WinnerCpvProfile
+from ...search import TOKEN_PATTERN
+from ...views import AdvancedSearchView, AuthorityContracts, CountryAuthorities, CountryContractors, \
+    CountryCPVInformation, CPVCountryRanking, CPVTimeSeries, WinnerObjectItems
+from .benchmark_pagination import get_busiest
+
+PAGE = slice(0, 11)
+
+
+def get_view_queryset(view_class, **kwargs):
+    return view_class(kwargs=kwargs, request=Request(RequestFactory().get('/'))).get_queryset()
+
+
+def get_sample_values():
+    contract = Contract.objects.select_related('authority__country').first()
+
+    return {
+        'authority': get_busiest(Authority, 'contract').official_name,
+        'winner': get_busiest(Winner, 'contractobjectitem').official_name,
+        'country': contract.authority.country.code,
+        'cpv_code': get_busiest(Category, 'contractobjectitem').code,
+        'original_cpv_code': get_busiest(Category, 'contract').code,
+        'contract_nature': contract.contract_nature,
+        'doc_id': contract.doc_id,
+        'search': TOKEN_PATTERN.findall(contract.short_title)[0],
+    }
+
+
+# Endpoint -> (function of the sample values returning the queryset, indexes the plan must use, tables it must not
+# scan in full). Index names are only listed where the name is fixed, Django names the foreign key indexes itself.
+CHECKS = {
+    'authority-contracts': (
+        lambda values: get_view_queryset(AuthorityContracts, official_name=values['authority']).filter(id__gt=0),
+        ['contract_authority_id_idx'], ['api_contract']),
+    'contractor-contracts': (
+        lambda values: get_view_queryset(WinnerObjectItems, official_name=values['winner']),
+        ['api_contractobjectitem_winner_winner_item_idx'], ['api_contractobjectitem_winner']),
+    'country-authorities': (
+        lambda values: get_view_queryset(CountryAuthorities, country_code=values['country']),
+        [], ['api_authority', 'api_contract']),
+    'country-contractors': (
+        lambda values: get_view_queryset(CountryContractors, country_code=values['country']),
+        ['winner_cpv_profile_value_idx'], ['api_winnercpvprofile']),
+    'country-cpv-information': (
+        lambda values: get_view_queryset(CountryCPVInformation, country_code=values['country']),
+        [], ['api_contract', 'api_contractobjectitem', 'api_contractobjectitem_cpv_additional']),
+    'cpv-ranking': (
+        lambda values: get_view_queryset(CPVCountryRanking, cpv_code=values['cpv_code']),
+        ['api_contractobjectitem_cpv_additional_category_item_idx'], ['api_contractobjectitem_cpv_additional']),
+    'advanced-search-cpv': (
+        lambda values: Authority.objects.filter(AdvancedSearchView.get_contract_filter(
+            {'cpvCode': {'code': values['original_cpv_code']}}, 'contract__')).distinct().order_by('id'),
+        ['api_contract_original_cpv_category_contract_idx'], ['api_contract_original_cpv']),
+    'advanced-search-nature': (
+        lambda values: Authority.objects.filter(AdvancedSearchView.get_contract_filter(
+            {'natureOfContract': values['contract_nature'], 'placeOfPerformance': {'code': values['country']}},
+            'contract__')).distinct().order_by('id'),
+        [], ['api_contract']),
+    'cpv-time-series': (
+        lambda values: CPVTimeSeries.get_buckets(Category.objects.get(code=values['cpv_code']).id,
+                                                 date(2020, 1, 1), date(2022, 12, 1)),
+        [], ['api_timeseriesbucket']),
+    'import-doc-id': (
+        lambda values: Contract.objects.filter(doc_id=values['doc_id']),
+        [], ['api_contract']),
+}
+
+
+def get_full_scans(plan):
+    # Tables read from start to end, in the plan format of the database
+    if connection.vendor == 'postgresql':
+        return set(re.findall(r'Seq Scan on (\w+)', plan))
+
+    if connection.vendor == 'sqlite':
+        return set(re.findall(r'\bSCAN (\w+)', plan))
+
+    return set()
+
+
+def explain(queryset):
+    with transaction.atomic():
+        # Small tables are scanned whatever their indexes, the check is whether a usable index exists
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        return queryset[PAGE].explain()
+
+
+def get_plan_problems(name, values):
+    # (plan, problems) of one check, run by the command on the current data and by the tests on their fixture
+    get_queryset, required_indexes, unscanned_tables = CHECKS[name]
+
+    plan = explain(get_queryset(values))
+
+    problems = [f'index {index} not used' for index in required_indexes if index not in plan]
+    problems += [f'full scan of {table}' for table in sorted(get_full_scans(plan) & set(unscanned_tables))]
+
+    return plan, problems
+
+
+class Command(BaseCommand):
+    help = 'Check that the queries of the API endpoints are served by the expected indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=list(CHECKS), help='Check only these endpoints')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query')
+
+    def handle(self, *args, **options):
+        if not Contract.objects.exists() or not WinnerCpvProfile.objects.exists() or not Country.objects.exists():
+            raise CommandError('The query plans are checked against imported data, import some documents first')
+
+        values = get_sample_values()
+        failures = []
+
+        for name in options['only'] or list(CHECKS):
+            plan, problems = get_plan_problems(name, values)
+
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: {", ".join(problems)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+
+            if problems or options['verbose_plans']:
+                self.stdout.write(f'{plan}\n')
+
+        if failures:
+            raise CommandError(f'{len(failures)} endpoints do not use their indexes: {", ".join(failures)}')
@@ -0,0 +1,292 @@
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from ...cache import bump_generation
+from ..db_utils.summaries import rebuild_summaries
+from ..db_utils.winner_totals import recompute_winner_totals
+from ...models import Authority, Category, Contract, ContractObject, ContractObjectItem, Country, Winner
+
+# Synthetic rows are told apart from imported ones by these prefixes, see --delete
+DOC_ID_PREFIX = 'SYN'
+NAME_PREFIX = 'synthetic'
+
+# Rough share of the contract award notices published on TED by each country
+COUNTRY_WEIGHTS = {
+    'FR': 24, 'DE': 14, 'PL': 12, 'ES': 6, 'IT': 5, 'CZ': 4, 'RO': 4, 'SE': 3, 'NL': 3, 'BE': 3, 'AT': 2, 'DK': 2,
+    'FI': 2, 'NO': 2, 'BG': 2, 'HU': 2, 'LT': 2, 'SK': 1.5, 'PT': 1.5, 'LV': 1, 'SI': 1, 'HR': 1, 'EE': 1, 'IE': 1,
+    'GR': 1, 'LU': 0.5, 'CH': 0.5, 'CY': 0.3, 'MT': 0.2, 'IS': 0.1,
+}
+CONTRACT_NATURE_WEIGHTS = {'Services': 48, 'Supplies': 39, 'Works': 13}
+
+COUNTRY_CUM_WEIGHTS = list(accumulate(COUNTRY_WEIGHTS.values()))
+CONTRACT_NATURE_CUM_WEIGHTS = list(accumulate(CONTRACT_NATURE_WEIGHTS.values()))
+
+# Contracts per CPV code, per authority and per winner fall off as 1 / rank ** ZIPF_EXPONENT
+ZIPF_EXPONENT = 1.1
+
+LOT_DIVISION_SHARE = 0.35
+EXTRA_LOT_PROBABILITY = 0.65
+MAX_LOTS = 50
+FOREIGN_WINNER_SHARE = 0.1
+SHARED_AWARD_SHARE = 0.1
+EXTRA_CPV_SHARE = 0.3
+
+# Item values in euros are log-normal, the median is about 60 000
+VALUE_MU = 11
+VALUE_SIGMA = 1.8
+
+FIRST_DATE = date(2019, 1, 1)
+DATE_RANGE_DAYS = 6 * 365
+
+CHUNK_SIZE = 10000
+
+AUTHORITY_FIELDS = ['id', 'official_name', 'address', 'town', 'postal_code', 'country', 'email', 'nuts', 'website']
+WINNER_FIELDS = [*AUTHORITY_FIELDS, 'val_total']
+CONTRACT_OBJECT_FIELDS = ['id', 'cpv_main_code', 'title', 'short_descr', 'type_contract', 'val_total',
+                          'val_total_currency', 'val_total_in_euros', 'lot_division']
+CONTRACT_FIELDS = ['id', 'doc_id', 'uri', 'date_published', 'short_title', 'contract_nature', 'authority',
+                   'contract_object']
+ITEM_FIELDS = ['id', 'contract_object', 'nuts_code', 'title', 'short_descr', 'val_total', 'val_total_currency',
+               'val_total_in_euros']
+
+
+def get_zipf_cum_weights(count):
+    return list(accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, count + 1)))
+
+
+def get_next_id(model):
+    return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+
+def insert_rows(model, fields, rows):
+    # Plain tuples in one executemany, building model instances for bulk_create costs more than the inserts
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(model._meta.get_field(field).column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows)
+
+
+class Command(BaseCommand):
+    help = ('Generate synthetic contracts, items, authorities and winners with skewed CPV code and country '
+            'distributions, to measure the API at scale (use a scratch database)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contracts', type=int, default=100000, help='Number of contracts (default: 100000)')
+        parser.add_argument('--authorities', type=int, help='Number of authorities (default: one per 10 contracts)')
+        parser.add_argument('--winners', type=int, help='Number of winners (default: one per 4 contracts)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator (default: 0)')
+        parser.add_argument('--delete', action='store_true', help='Delete the synthetic rows instead')
+
+    def handle(self, *args, **options):
+        if options['delete']:
+            self.delete_synthetic_data()
+            return
+
+        if not Category.objects.exists():
+            raise CommandError('Import the CPV codes first (import_cpv_codes_to_database)')
+
+        if connection.vendor == 'sqlite':
+            # Only this connection skips the fsync after every transaction
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+
+        self.rng = random.Random(options['seed'])
+        self.categories = self.get_categories()
+        self.category_cum_weights = get_zipf_cum_weights(len(self.categories))
+        self.countries = self.get_countries()
+
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            self.authorities = self.create_entities(Authority, options['authorities'] or
+                                                    max(options['contracts'] // 10, 1))
+            self.winners = self.create_entities(Winner, options['winners'] or max(options['contracts'] // 4, 1))
+
+        self.create_contracts(options['contracts'])
+
+        # The ids were given explicitly, Postgres sequences have to catch up
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Authority, Winner, ContractObject,
+                                                                     ContractObjectItem, Contract]):
+                cursor.execute(sql)
+
+        self.stdout.write('Rebuilding the winner totals and the summaries ...')
+
+        with transaction.atomic():
+            recompute_winner_totals()
+            rebuild_summaries()
+
+            transaction.on_commit(bump_generation)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {options["contracts"]} contracts in {time.perf_counter() - started:.1f} s '
+            f'({Contract.objects.count()} contracts in the database)'))
+
+    def get_categories(self):
+        # The codes used most by the imported contracts come first, so the synthetic data is skewed the same way
+        used_ids = list(ContractObject.objects.values('cpv_main_code').annotate(count=Count('id'))
+                        .order_by('-count', 'cpv_main_code').values_list('cpv_main_code', flat=True))
+        names = dict(Category.objects.values_list('id', 'name'))
+
+        other_ids = sorted(names.keys() - set(used_ids))
+        self.rng.shuffle(other_ids)
+
+        return [(category_id, names[category_id]) for category_id in used_ids + other_ids]
+
+    def get_countries(self):
+        countries = {country.code: country for country in Country.objects.filter(code__in=COUNTRY_WEIGHTS)}
+
+        for code in COUNTRY_WEIGHTS.keys() - countries.keys():
+            # One by one, Country.save() fills in the name
+            countries[code] = Country.objects.create(code=code)
+
+        return [(countries[code].id, code) for code in COUNTRY_WEIGHTS]
+
+    def pick_country(self):
+        return self.rng.choices(self.countries, cum_weights=COUNTRY_CUM_WEIGHTS)[0]
+
+    def create_entities(self, model, count):
+        # country id -> ids of the entities of the country (busiest first) and their cumulative Zipf weights
+        kind = 'authority' if model is Authority else 'contractor'
+        rows = []
+        ids_by_country = defaultdict(list)
+
+        first_id = get_next_id(model)
+
+        for entity_id in range(first_id, first_id + count):
+            country_id, country_code = self.pick_country()
+            ids_by_country[country_id].append(entity_id)
+
+            rows.append((
+                entity_id, f'{NAME_PREFIX} {kind} {entity_id}', f'{self.rng.randint(1, 200)} synthetic street',
+                f'town {self.rng.randint(1, 500)}', str(self.rng.randint(10000, 99999)), country_id,
+                f'{kind}{entity_id}@example.com', f'{country_code}{self.rng.randint(1, 9)}{self.rng.randint(1, 9)}',
+                f'https://{kind}{entity_id}.example.com',
+            ) + ((0.0,) if model is Winner else ()))
+
+        insert_rows(model, WINNER_FIELDS if model is Winner else AUTHORITY_FIELDS, rows)
+        self.stdout.write(f'Created {count} synthetic {kind} rows')
+
+        return {country_id: (ids, get_zipf_cum_weights(len(ids))) for country_id, ids in ids_by_country.items()}
+
+    def pick(self, entities, country_id):
+        if country_id not in entities:
+            country_id = self.rng.choice(list(entities))
+
+        ids, cum_weights = entities[country_id]
+
+        return self.rng.choices(ids, cum_weights=cum_weights)[0]
+
+    def pick_category(self):
+        return self.rng.choices(self.categories, cum_weights=self.category_cum_weights)[0]
+
+    def get_lot_count(self):
+        if self.rng.random() >= LOT_DIVISION_SHARE:
+            return 1
+
+        # Geometric number of extra lots
+        extra_lots = int(math.log(1 - self.rng.random()) / math.log(EXTRA_LOT_PROBABILITY))
+
+        return min(2 + extra_lots, MAX_LOTS)
+
+    def create_contracts(self, count):
+        contract_id = get_next_id(Contract)
+        contract_object_id = get_next_id(ContractObject)
+        item_id = get_next_id(ContractObjectItem)
+
+        started = time.perf_counter()
+
+        for chunk_start in range(0, count, CHUNK_SIZE):
+            contracts, contract_objects, items = [], [], []
+            original_cpvs, cpv_additionals, item_winners = [], [], []
+
+            for _ in range(min(CHUNK_SIZE, count - chunk_start)):
+                authority_country_id, country_code = self.pick_country()
+                authority_id = self.pick(self.authorities, authority_country_id)
+                category_id, category_name = self.pick_category()
+                lot_count = self.get_lot_count()
+                contract_nature = self.rng.choices(list(CONTRACT_NATURE_WEIGHTS),
+                                                   cum_weights=CONTRACT_NATURE_CUM_WEIGHTS)[0]
+
+                contract_value = 0
+
+                for lot_no in range(1, lot_count + 1):
+                    value = round(math.exp(self.rng.gauss(VALUE_MU, VALUE_SIGMA)), 2)
+                    contract_value += value
+
+                    items.append((
+                        item_id, contract_object_id, f'{country_code}{self.rng.randint(1, 9)}{self.rng.randint(1, 9)}',
+                        f'Lot {lot_no}: {category_name}' if lot_count > 1 else category_name, category_name, value,
+                        'EUR', value))
+
+                    item_category_ids = {category_id}
+
+                    if self.rng.random() < EXTRA_CPV_SHARE:
+                        item_category_ids.add(self.pick_category()[0])
+
+                    cpv_additionals += [(item_id, item_category_id) for item_category_id in item_category_ids]
+
+                    winner_count = self.rng.randint(2, 3) if self.rng.random() < SHARED_AWARD_SHARE else 1
+                    winner_ids = set()
+
+                    for _ in range(winner_count):
+                        winner_country_id = self.pick_country()[0] if self.rng.random() < FOREIGN_WINNER_SHARE \
+                            else authority_country_id
+                        winner_ids.add(self.pick(self.winners, winner_country_id))
+
+                    item_winners += [(item_id, winner_id) for winner_id in winner_ids]
+
+                    item_id += 1
+
+                contract_objects.append((
+                    contract_object_id, category_id, f'{contract_nature}: {category_name}',
+                    f'{category_name} for {NAME_PREFIX} authority {authority_id}', contract_nature.upper(),
+                    round(contract_value, 2), 'EUR', round(contract_value, 2), lot_count > 1))
+
+                contracts.append((
+                    contract_id, f'{DOC_ID_PREFIX}{contract_id:09d}',
+                    f'https://example.com/notice/{DOC_ID_PREFIX}{contract_id:09d}',
+                    (FIRST_DATE + timedelta(days=self.rng.randrange(DATE_RANGE_DAYS))).isoformat(),
+                    category_name[:Contract.SHORT_TITLE_MAX_LEN], contract_nature, authority_id, contract_object_id))
+
+                original_cpvs.append((contract_id, category_id))
+
+                contract_id += 1
+                contract_object_id += 1
+
+            with transaction.atomic():
+                insert_rows(ContractObject, CONTRACT_OBJECT_FIELDS, contract_objects)
+                insert_rows(Contract, CONTRACT_FIELDS, contracts)
+                insert_rows(ContractObjectItem, ITEM_FIELDS, items)
+                insert_rows(Contract.original_cpv.through, ['contract', 'category'], original_cpvs)
+                insert_rows(ContractObjectItem.cpv_additional.through, ['contractobjectitem', 'category'],
+                            cpv_additionals)
+                insert_rows(ContractObjectItem.winner.through, ['contractobjectitem', 'winner'], item_winners)
+
+            done = chunk_start + len(contracts)
+            self.stdout.write(f'{done}/{count} contracts ({done / (time.perf_counter() - started):.0f} contracts/sec)')
+
+    def delete_synthetic_data(self):
+        with transaction.atomic():
+            # Deleting the contract objects cascades to their contracts and items
+            deleted, _ = ContractObject.objects.filter(contract__doc_id__startswith=DOC_ID_PREFIX).delete()
+            Authority.objects.filter(official_name__startswith=f'{NAME_PREFIX} authority ').delete()
+            Winner.objects.filter(official_name__startswith=f'{NAME_PREFIX} contractor ').delete()
+
+            recompute_winner_totals()
+            rebuild_summaries()
+
+            transaction.on_commit(bump_generation)
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} synthetic rows'))
@@ -1,37 +1,184 @@
-from django.core.management.base import BaseCommand
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from settings.settings import BASE_DIR
+from ...cache import bump_generation
+from ...cpv_domains import cpv_domains
+from ..db_utils.cpv_cache import cpv_cache
+from ..db_utils.summaries import rebuild_summaries
 from ...models import Category
-import json
-from django.db import transaction
 
 file_path = BASE_DIR / 'api' / 'management' / 'cpv_codes' / 'cpv_codes.json'
 
+TREE_FIELDS = ['lft', 'rght', 'tree_id', 'level']
+
+BATCH_SIZE = 1000
+
+
+def read_cpv_codes(path):
+    with open(path, 'r') as file:
+        data = json.load(file)
+
+    # code -> (name, parent code), in file order
+    cpv_codes = {}
+
+    for item in data:
+        code = item.get('code')
+
+        if code in cpv_codes:
+            raise CommandError(f'Duplicate CPV code {code} in {path}')
+
+        cpv_codes[code] = (item.get('name'), item.get('parent') or None)
+
+    missing_parents = {parent_code for _, parent_code in cpv_codes.values()
+                       if parent_code is not None and parent_code not in cpv_codes}
+
+    if missing_parents:
+        raise CommandError(f'Unknown parent CPV codes in {path}: {", ".join(sorted(missing_parents))}')
+
+    return cpv_codes
+
+
+def get_tree_fields(parents):
+    """
+    Nested set fields for code -> parent code, computed in one depth-first pass.
+
+    Roots get consecutive tree ids and siblings keep the order of `parents`, which is the layout inserting the codes one
+    by one in that order produces.
+    """
+    children = defaultdict(list)
+
+    for code, parent_code in parents.items():
+        children[parent_code].append(code)
+
+    tree_fields = {}
+
+    for tree_id, root_code in enumerate(children[None], start=1):
+        counter = 1
+        stack = [(root_code, 0, False)]
+
+        while stack:
+            code, level, visited = stack.pop()
+
+            if visited:
+                tree_fields[code]['rght'] = counter
+                counter += 1
+                continue
+
+            tree_fields[code] = {'lft': counter, 'tree_id': tree_id, 'level': level}
+            counter += 1
+
+            stack.append((code, level, True))
+            stack.extend((child_code, level + 1, False) for child_code in reversed(children[code]))
+
+    if len(tree_fields) != len(parents):
+        raise CommandError(f'CPV codes in a parent cycle: {", ".join(sorted(parents.keys() - tree_fields.keys()))}')
+
+    return tree_fields
+
 
 class Command(BaseCommand):
-    help = 'Import CPV codes to Database from JSON file'
+    help = 'Import CPV codes to Database from JSON file (new codes are added and changed codes updated on reload)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=str(file_path), help=f'CPV codes JSON file (default: {file_path})')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them')
 
     def handle(self, *args, **options):
-        with open(file_path, 'r') as file:
-            data = json.load(file)
+        cpv_codes = read_cpv_codes(options['file'])
 
         with transaction.atomic():
+            existing = {category.code: category for category in Category.objects.select_related('parent')
+                        .order_by('tree_id', 'lft')}
+
+            # Codes missing from the file stay where they are: contracts may still reference them
+            stale_codes = [code for code in existing if code not in cpv_codes]
+
+            parents = {code: parent_code for code, (_, parent_code) in cpv_codes.items()}
+            parents.update((code, existing[code].parent.code if existing[code].parent else None) for code in stale_codes)
+
+            tree_fields = get_tree_fields(parents)
+
+            new_categories, changed_categories, renamed_count, moved_count = [], [], 0, 0
+
+            for code, (name, parent_code) in cpv_codes.items():
+                category = existing.get(code)
+
+                if category is None:
+                    new_categories.append(Category(code=code, name=name, **tree_fields[code]))
+                    continue
+
+                moved = parents[code] != (category.parent.code if category.parent else None)
+                changed = category.name != name or moved
+                renamed_count += category.name != name
+                moved_count += moved
+
+                category.name = name
+
+                for field, value in tree_fields[code].items():
+                    changed |= getattr(category, field) != value
+                    setattr(category, field, value)
+
+                if changed:
+                    changed_categories.append(category)
+
+            for code in stale_codes:
+                category = existing[code]
+
+                if any(getattr(category, field) != value for field, value in tree_fields[code].items()):
+                    for field, value in tree_fields[code].items():
+                        setattr(category, field, value)
+
+                    changed_categories.append(category)
+
+            if not options['dry_run']:
+                self.save(new_categories, changed_categories, parents, existing)
+
+                # The rebuilds below read the CPV tree through the caches
+                if new_categories or changed_categories:
+                    cpv_cache.invalidate()
+                    cpv_domains.invalidate()
+
+                # The summary tables hold CPV names, the CPV rollups and time series add every item to the categories
+                # above its codes
+                if renamed_count:
+                    rebuild_summaries()
+                elif moved_count:
+                    rebuild_summaries(['cpv_rollups', 'time_series'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would import" if options["dry_run"] else "Imported"} {len(cpv_codes)} CPV codes: '
+            f'{len(new_categories)} new, {len(changed_categories)} changed '
+            f'({renamed_count} renamed, {moved_count} moved), '
+            f'{len(existing) - len(changed_categories)} unchanged'))
+
+        if stale_codes:
+            self.stdout.write(self.style.WARNING(
+                f'{len(stale_codes)} CPV codes are not in the file and were kept: {", ".join(stale_codes)}'))
+
+        if not options['dry_run'] and (new_categories or changed_categories):
+            bump_generation()
+
+    @staticmethod
+    def save(new_categories, changed_categories, parents, existing):
+        # The tree fields are all computed, so the rows are written without MPTT's per-row inserts
+        ids = {code: category.pk for code, category in existing.items()}
+
+        # Parents are created before their children, one bulk insert per tree level
+        for level in sorted({category.level for category in new_categories}):
+            categories = [category for category in new_categories if category.level == level]
 
-            for item in data:
-                code = item.get('code')
-                name = item.get('name')
-                parent_code = item.get('parent')
+            for category in categories:
+                category.parent_id = ids[parents[category.code]] if parents[category.code] else None
 
-                parent_category = None
+            Category.objects.bulk_create(categories, batch_size=BATCH_SIZE)
 
-                if parent_code:
-                    parent_category = Category.objects.filter(code=parent_code).first()
+            ids.update((category.code, category.pk) for category in categories)
 
-                category = Category(
-                    code=code,
-                    name=name,
-                    parent=parent_category
-                )
+        for category in changed_categories:
+            category.parent_id = ids[parents[category.code]] if parents[category.code] else None
 
-                category.save()
-                self.stdout.write(self.style.SUCCESS(f"Category: {code} - {name} successfully saved to database!"))
+        Category.objects.bulk_update(changed_categories, ['name', 'parent', *TREE_FIELDS], batch_size=BATCH_SIZE)
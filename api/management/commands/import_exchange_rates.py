@@ -0,0 +1,58 @@
+import csv
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import ExchangeRate
+
+# eurofxref-hist.csv uses ISO dates, the daily eurofxref.csv spells the month out
+DATE_FORMATS = ('%Y-%m-%d', '%d %B %Y')
+
+
+def parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+
+    raise CommandError(f'Unknown date format: {value}')
+
+
+def read_ecb_csv(csv_path):
+    with open(csv_path, newline='') as file:
+        for row in csv.DictReader(file, skipinitialspace=True):
+            row = {key.strip(): value.strip() for key, value in row.items() if key and key.strip() and value}
+
+            date = parse_date(row.pop('Date'))
+
+            for currency, rate in row.items():
+                # Currencies that were not quoted on that date are N/A
+                if rate != 'N/A':
+                    yield ExchangeRate(currency=currency, date=date, rate=float(rate))
+
+
+class Command(BaseCommand):
+    help = 'Import ECB euro reference exchange rates from offline CSV files (eurofxref.csv or eurofxref-hist.csv)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_paths', nargs='+', help='ECB CSV files to import')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT (default: 1000)')
+
+    def handle(self, *args, **options):
+        exchange_rates = [exchange_rate for csv_path in options['csv_paths'] for exchange_rate in read_ecb_csv(csv_path)]
+
+        if not exchange_rates:
+            self.stdout.write(self.style.WARNING('No exchange rates found'))
+            return
+
+        # Re-importing a file only overwrites the rates it contains
+        ExchangeRate.objects.bulk_create(exchange_rates, batch_size=options['batch_size'], update_conflicts=True,
+                                         unique_fields=['currency', 'date'], update_fields=['rate'])
+
+        dates = [exchange_rate.date for exchange_rate in exchange_rates]
+        currencies = {exchange_rate.currency for exchange_rate in exchange_rates}
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(exchange_rates)} rates for {len(currencies)} currencies ({min(dates)} - {max(dates)}). '
+            f'Run reconvert_values_to_euros to apply them to the imported contracts.'))
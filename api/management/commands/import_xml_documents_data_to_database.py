@@ -1,262 +1,254 @@
 import os
-import re
-import xml.etree.ElementTree as ET
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import time
 from django.core.management import BaseCommand
-from django.db import transaction
+from django.db import connections
 
 from settings.settings import BASE_DIR
-from ..form_utils.form_03.extract_base_contract import extract_base_contract_data
-from ..form_utils.form_03.extract_authority import extract_authority_contract_data
-from ..form_utils.form_03.extract_object import extract_object_data
-from ...models import Authority, ContractObject, Contract, Winner, Category, ContractObjectItem, Country
-
-
-def clean_official_name(name):
-    cleaned_string = name.strip().lower()
-
-    cleaned_string = cleaned_string.translate(
-        str.maketrans({'.': ' ', ',': ' '}))
-
-    cleaned_string = re.sub(r'\s+', ' ', cleaned_string)
-
-    return cleaned_string.lower().strip()
+from ..db_utils.bulk_writer import BulkDocumentWriter
+from ..db_utils.cpv_cache import cpv_cache
+from ..db_utils.import_journal import get_fingerprint, load_journal, write_journal_entries
+from ..form_utils.exchange_rates import set_exchange_rates
+from ..form_utils.form_03.extract_document import extract_document_data, extract_document_data_streaming, XML_PARSERS
+from ...models import Contract, ExchangeRate, ImportJournal
 
 
 def get_current_time() -> str:
     return time.strftime("%H:%M:%S", time.localtime())
 
 
-def fix_date_publish(date):
-    return datetime.strptime(date, "%Y%m%d")
-
-
-def create_or_get_authority(authority_data):
-    official_name = clean_official_name(authority_data.get('OFFICIALNAME'))
+def get_doc_id(xml_file_path):
+    return os.path.basename(xml_file_path).split('.')[0]
 
-    country_code = authority_data.get('COUNTRY')
-    country, _ = Country.objects.get_or_create(code=country_code)
 
-    defaults = {
-        'address': authority_data.get('ADDRESS'),
-        'town': authority_data.get('TOWN'),
-        'contact_point': authority_data.get('CONTACT_POINT'),
-        'postal_code': authority_data.get('POSTAL_CODE'),
-        'fax': authority_data.get('FAX', ''),
-        'national_id': authority_data.get('NATIONALID'),
-        'country': country,
-        'phone': authority_data.get('PHONE'),
-        'email': authority_data.get('E_MAIL'),
-        'nuts': authority_data.get('NUTS'),
-        'website': authority_data.get('URL_GENERAL'),
-    }
+def extract_timed(extract, xml_file_path):
+    started = time.perf_counter()
 
-    authority, created = Authority.objects.get_or_create(
-        official_name=official_name,
-        defaults=defaults
-    )
+    # A file that cannot be parsed or extracted is journaled as failed with the error, the import goes on
+    try:
+        xml_file_path, data_dict, warning = extract(xml_file_path)
+    except Exception as e:
+        data_dict, warning = None, f'{type(e).__name__}: {e}'
 
-    # Fix this garbage
+    return xml_file_path, data_dict, warning, time.perf_counter() - started
 
-    if not created:
-        for field, value in defaults.items():
-            if field != 'country' and value is not None:
-                current_value = getattr(authority, field)
-                if current_value is not None and value not in current_value:
-                    setattr(authority, field, f"{current_value}, {value}")
-                else:
-                    setattr(authority, field, value)
 
-        authority.save()
+def get_extracted(xml_file_path, future):
+    # Errors of the extraction itself are returned by extract_timed, this is left for workers that died
+    try:
+        return future.result()
+    except Exception as e:
+        return xml_file_path, None, f'{type(e).__name__}: {e}', None
 
-    return authority
 
+class Command(BaseCommand):
+    help = 'Import XML data from folder to Database'
 
-def create_or_get_winner(winner_data):
-    official_name = clean_official_name(winner_data['CONTRACTOR_DATA'][0].get('OFFICIALNAME'))
-
-    country_code = winner_data['CONTRACTOR_DATA'][0].get('COUNTRY')
-    country, _ = Country.objects.get_or_create(code=country_code)
-
-    defaults = {
-        'address': winner_data['CONTRACTOR_DATA'][0].get('ADDRESS'),
-        'town': winner_data['CONTRACTOR_DATA'][0].get('TOWN'),
-        'postal_code': winner_data['CONTRACTOR_DATA'][0].get('POSTAL_CODE'),
-        'country': country,
-        'email': winner_data['CONTRACTOR_DATA'][0].get('E_MAIL'),
-        'nuts': winner_data['CONTRACTOR_DATA'][0].get('NUTS'),
-        'website': winner_data['CONTRACTOR_DATA'][0].get('URL'),
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes used to parse and extract the XML documents (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of documents persisted together in one transaction (default: 100)'
+        )
+        parser.add_argument(
+            '--streaming',
+            action='store_true',
+            help='Extract the documents with the single pass iterparse extractor'
+        )
+        parser.add_argument(
+            '--xml-parser',
+            choices=list(XML_PARSERS),
+            default='etree',
+            help='XML parser used for the documents, lxml is available when it is installed (default: etree)'
+        )
+
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip every file already in the import journal, including the ones that failed'
+        )
+        mode.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Only import the files the import journal records as failed or rejected'
+        )
 
-    }
+    def handle(self, *args, **options):
+        root_directory = BASE_DIR / 'api' / 'management' / 'test_documents'
+        workers = max(options['workers'], 1)
 
-    winner, created = Winner.objects.get_or_create(
-        official_name=official_name,
-        defaults=defaults
-    )
+        extract = partial(extract_timed, partial(
+            extract_document_data_streaming if options['streaming'] else extract_document_data,
+            xml_parser=options['xml_parser']))
 
-    # Fix this garbage
+        self.root_directory = root_directory
+        self.pending_entries = []
 
-    if not created:
-        for field, value in defaults.items():
-            if field != 'country' and value is not None:
-                current_value = getattr(winner, field)
-                if current_value is not None and value not in current_value:
-                    setattr(winner, field, f"{current_value}, {value}")
-                else:
-                    setattr(winner, field, value)
+        # xml file path -> (doc id, fingerprint, extract seconds) until the file is journaled
+        self.documents = {}
 
-        winner.save()
+        xml_file_paths = self.collect_xml_file_paths(root_directory, options['resume'], options['retry_failed'])
 
-    return winner
+        # Values are converted to euros with the rates of their publication date while they are extracted
+        exchange_rates = list(ExchangeRate.objects.values_list('currency', 'date', 'rate'))
+        set_exchange_rates(exchange_rates)
 
+        if workers > 1:
+            documents = self.extract_documents_in_pool(extract, xml_file_paths, workers, exchange_rates)
+        else:
+            documents = map(extract, xml_file_paths)
 
-def create_contract_object_item(item_data, contract_object):
-    winners_data = item_data.get('WINNERS', [])
-    if not winners_data:
-        return None
+        cpv_cache.load()
 
-    contract_object_item = ContractObjectItem.objects.create(
-        contract_object=contract_object,
-        nuts_code=item_data.get('NUTS_CODE'),
-        title=item_data.get('TITLE'),
-        val_total=item_data.get('WINNERS')[0]['VAL_TOTAL'],
-        val_total_currency=item_data.get('WINNERS')[0]['VAL_TOTAL_CURRENCY'],
-        val_total_in_euros=item_data.get('WINNERS')[0]['VAL_TOTAL_IN_EUROS'],
-        short_descr=item_data.get('SHORT_DESCR'),
-    )
+        writer = BulkDocumentWriter(batch_size=options['batch_size'])
 
-    cpv_additional = item_data.get('CPV_ADDITIONAL', [])
+        started = time.perf_counter()
+        saved_documents = 0
 
-    if contract_object.cpv_main_code.code not in cpv_additional:
-        cpv_additional.append(contract_object.cpv_main_code.code)
+        for xml_file_path, data_dict, warning, extract_seconds in documents:
+            self.stdout.write(f'[{get_current_time()}] - Working on {xml_file_path}...')
 
-    for cpv_code in cpv_additional:
-        cpv_category = Category.objects.get(code=cpv_code)
-        contract_object_item.cpv_additional.add(cpv_category)
+            doc_id, fingerprint, _ = self.documents[xml_file_path]
+            self.documents[xml_file_path] = (doc_id, fingerprint, extract_seconds)
 
-    # Bulk create winners???
-    for winner_data in item_data.get('WINNERS', []):
-        winner = create_or_get_winner(winner_data)
+            if warning:
+                self.stdout.write(self.style.ERROR(
+                    f'[{get_current_time()}] - Warning: {warning} in {xml_file_path}! Continuing to next xml...'))
+                self.journal(xml_file_path, ImportJournal.STATUS_FAILED, error=warning)
+                continue
 
-        val_total_in_euros = winner_data.get('VAL_TOTAL_IN_EUROS')
+            data_dict['BASE_CONTRACT_DATA']['DOC_ID'] = doc_id
 
-        winner.val_total = winner.val_total + val_total_in_euros if winner.val_total else val_total_in_euros
+            saved_documents += self.checkpoint(writer, lambda: writer.add(xml_file_path, data_dict))
 
-        winner.save()
+        saved_documents += self.checkpoint(writer, writer.flush, final=True)
 
-        contract_object_item.winner.add(winner)
+        if writer.rejected:
+            self.stdout.write(self.style.ERROR(
+                f'[{get_current_time()}] - Skipped {len(writer.rejected)} documents with unknown CPV codes:'))
 
+            for xml_file_path, unknown_codes in writer.rejected.items():
+                self.stdout.write(self.style.ERROR(f'    {xml_file_path}: {", ".join(unknown_codes)}'))
 
-def create_contract_object(object_data):
-    cpv_main_code = object_data.pop('cpv_main_code')
-    cpv_category = Category.objects.get(code=cpv_main_code)
+        if writer.failed:
+            self.stdout.write(self.style.ERROR(
+                f'[{get_current_time()}] - Failed to save {len(writer.failed)} documents:'))
 
-    return ContractObject.objects.create(
-        cpv_main_code=cpv_category,
-        **object_data
-    )
+            for xml_file_path, error in writer.failed.items():
+                self.stdout.write(self.style.ERROR(f'    {xml_file_path}: {error}'))
 
+        elapsed = time.perf_counter() - started
 
-def create_contract(base_contract_data, authority, contract_object):
-    return Contract.objects.create(
-        doc_id=base_contract_data.get('DOC_ID'),
-        uri=base_contract_data.get('URI_DOC_ORIGINAL'),
-        date_published=base_contract_data.get('DATE_PUB'),
-        short_title=base_contract_data.get('SHORT_TITLE'),
-        contract_nature=base_contract_data.get('NC_CONTRACT_NATURE'),
-        authority=authority,
-        contract_object=contract_object,
-    )
+        self.stdout.write(self.style.SUCCESS(
+            f'[{get_current_time()}] - Saved {saved_documents} documents in {elapsed:.2f}s '
+            f'({saved_documents / elapsed if elapsed else 0:.2f} docs/sec, workers: {workers})'))
 
+    def checkpoint(self, writer, write, final=False):
+        # Every batch the writer persists is journaled right away, so an interrupted import can be resumed
+        rejected_count, failed_count = len(writer.rejected), len(writer.failed)
 
-def link_original_cpv_codes(contract, original_cpv_codes):
-    for cpv_code in original_cpv_codes:
-        cpv_category = Category.objects.get(code=cpv_code.split(' - ')[0])
-        contract.original_cpv.add(cpv_category)
+        started = time.perf_counter()
+        xml_file_paths = write()
+        save_seconds = (time.perf_counter() - started) / len(xml_file_paths) if xml_file_paths else None
 
+        for xml_file_path in xml_file_paths:
+            self.stdout.write(self.style.SUCCESS(
+                f'[{get_current_time()}] - Successfully saved data to database from {xml_file_path}'))
+            self.journal(xml_file_path, ImportJournal.STATUS_IMPORTED, save_seconds=save_seconds)
 
-def save_data_to_models(data):
-    with transaction.atomic():
-        authority_data = data.get('AUTHORITY_DATA', {})
-        base_contract_data = data.get('BASE_CONTRACT_DATA', {})
-        object_data = data.get('OBJECT_DATA', {})
+        for xml_file_path, unknown_codes in list(writer.rejected.items())[rejected_count:]:
+            self.journal(xml_file_path, ImportJournal.STATUS_REJECTED,
+                         error=f'Unknown CPV codes: {", ".join(unknown_codes)}')
 
-        authority = create_or_get_authority(authority_data)
-        contract_data_mapped = {x.lower(): y for x, y in object_data.items() if x != 'ITEMS'}
-        contract_object = create_contract_object(contract_data_mapped)
+        for xml_file_path, error in list(writer.failed.items())[failed_count:]:
+            self.journal(xml_file_path, ImportJournal.STATUS_FAILED, error=error)
 
-        for item_id, item_data in object_data.get('ITEMS', {}).items():
-            create_contract_object_item(item_data, contract_object)
+        if self.pending_entries and (xml_file_paths or final):
+            write_journal_entries(self.pending_entries)
+            self.pending_entries = []
 
-        contract = create_contract(base_contract_data, authority, contract_object)
+        return len(xml_file_paths)
 
-        original_cpv_codes = base_contract_data.get('ORIGINAL_CPV', [])
-        link_original_cpv_codes(contract, original_cpv_codes)
+    def journal(self, xml_file_path, status, save_seconds=None, error=None):
+        doc_id, fingerprint, extract_seconds = self.documents.pop(xml_file_path)
 
+        self.pending_entries.append(ImportJournal(
+            file_path=os.path.relpath(xml_file_path, self.root_directory),
+            doc_id=doc_id,
+            fingerprint=fingerprint,
+            status=status,
+            extract_seconds=extract_seconds,
+            save_seconds=save_seconds,
+            error=error,
+        ))
 
-class Command(BaseCommand):
-    help = 'Import XML data from folder to Database'
+    def collect_xml_file_paths(self, root_directory, resume=False, retry_failed=False):
+        # Loaded once, so already imported documents are skipped before they are parsed
+        journal = load_journal()
+        imported_doc_ids = set(Contract.objects.values_list('doc_id', flat=True))
 
-    def handle(self, *args, **options):
-        root_directory = BASE_DIR / 'api' / 'management' / 'test_documents'
+        xml_file_paths = []
+        skipped_count = 0
 
         for folder_name, sub_folders, filenames in os.walk(root_directory):
             for filename in filenames:
-                if filename.endswith('.xml'):
-                    xml_file_path = os.path.join(folder_name, filename)
-
-                    tree = ET.parse(xml_file_path)
+                if not filename.endswith('.xml'):
+                    continue
 
-                    self.stdout.write(f'[{get_current_time()}] - Working on {xml_file_path}...')
+                xml_file_path = os.path.join(folder_name, filename)
+                doc_id = get_doc_id(xml_file_path)
+                fingerprint = get_fingerprint(xml_file_path)
 
-                    doc_id = filename.split('.')[0]
+                journaled_fingerprint, status = journal.get(os.path.relpath(xml_file_path, root_directory),
+                                                            (None, None))
 
-                    if Contract.objects.filter(doc_id=doc_id).exists():
+                if doc_id in imported_doc_ids or status == ImportJournal.STATUS_IMPORTED:
+                    if status == ImportJournal.STATUS_IMPORTED and journaled_fingerprint != fingerprint:
                         self.stdout.write(self.style.WARNING(
-                            f'[{get_current_time()}] - {filename} is already processed! Continuing to next xml...'))
-                        continue
+                            f'[{get_current_time()}] - {filename} changed since it was imported! Skipping it...'))
 
-                    data_dict = self.extract_data_from_xml(tree, xml_file_path)
+                    skipped_count += 1
+                    continue
 
-                    data_dict['BASE_CONTRACT_DATA']['DOC_ID'] = doc_id
+                if (resume and status is not None) or (retry_failed and status is None):
+                    skipped_count += 1
+                    continue
 
-                    save_data_to_models(data_dict)
+                imported_doc_ids.add(doc_id)
+                self.documents[xml_file_path] = (doc_id, fingerprint, None)
+                xml_file_paths.append(xml_file_path)
 
-                    self.stdout.write(self.style.SUCCESS(
-                        f'[{get_current_time()}] - Successfully saved data to database from {xml_file_path}'))
+        self.stdout.write(self.style.WARNING(
+            f'[{get_current_time()}] - Skipping {skipped_count} already processed files, '
+            f'importing {len(xml_file_paths)} files'))
 
-    def extract_data_from_xml(self, tree, xml_file_path):
-        base_contract_data = extract_base_contract_data(tree)
+        return xml_file_paths
 
-        if not base_contract_data:
-            self.stdout.write(self.style.ERROR(
-                f'[{get_current_time()}] - Warning: No Base Contract data in {xml_file_path}! Continuing to next xml...'))
-            return 0
+    @staticmethod
+    def extract_documents_in_pool(extract, xml_file_paths, workers, exchange_rates):
+        # Workers never touch the database, but forked children must not inherit open connections
+        connections.close_all()
 
-        authority_data = extract_authority_contract_data(tree)
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_exchange_rates,
+                                 initargs=(exchange_rates,)) as executor:
+            pending = deque()
 
-        if not authority_data:
-            self.stdout.write(self.style.ERROR(
-                f'[{get_current_time()}] - Warning: No Authority data in {xml_file_path}! Continuing to next xml...'))
-            return 0
-
-        object_data = extract_object_data(tree)
-
-        if not object_data:
-            self.stdout.write(self.style.ERROR(
-                f'[{get_current_time()}] - Warning: No Object data in {xml_file_path}! Continuing to next xml...'))
-            return 0
-
-        if not object_data['ITEMS']:
-            self.stdout.write(self.style.ERROR(
-                f'[{get_current_time()}] - Warning: Items have no Winners in {xml_file_path}! Continuing to next xml...'))
-            return 0
+            for xml_file_path in xml_file_paths:
+                pending.append((xml_file_path, executor.submit(extract, xml_file_path)))
 
-        data_dict = {
-            'BASE_CONTRACT_DATA': base_contract_data,
-            'AUTHORITY_DATA': authority_data,
-            'OBJECT_DATA': object_data,
-        }
+                # Keep a bounded number of extracted documents waiting for the writer
+                if len(pending) >= workers * 4:
+                    yield get_extracted(*pending.popleft())
 
-        return data_dict
+            while pending:
+                yield get_extracted(*pending.popleft())
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...cache import bump_generation
+from ..db_utils.summaries import SUMMARIES, rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the summary tables that the importer keeps up to date from the imported contracts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=list(SUMMARIES),
+            help='Rebuild only these summaries (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        names = options['only'] or list(SUMMARIES)
+
+        with transaction.atomic():
+            rebuild_summaries(names)
+
+            transaction.on_commit(bump_generation)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt summaries: {", ".join(names)}'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...cache import bump_generation
+from ..db_utils.winner_totals import recompute_winner_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute Winner.val_total from the values in euros of the won contract object items in one UPDATE'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = recompute_winner_totals()
+
+            transaction.on_commit(bump_generation)
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed the totals of {updated} winners'))
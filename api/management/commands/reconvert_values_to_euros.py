@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...cache import bump_generation
+from ..db_utils.summaries import rebuild_summaries
+from ..db_utils.winner_totals import recompute_winner_totals
+from ..form_utils.base_helper import BaseHelper
+from ..form_utils.exchange_rates import FALLBACK_EXCHANGE_RATES_TO_EUROS, set_exchange_rates
+from ...models import ContractObject, ContractObjectItem, ExchangeRate
+
+# Rows read and written per query
+BATCH_SIZE = 2000
+
+
+def reconvert(queryset, date_published_field, currencies):
+    # Converted by the same code as at import time, so the rounding matches; only the values that change are written
+    model = queryset.model
+    rows = queryset.filter(val_total__isnull=False, val_total_currency__in=currencies).order_by() \
+        .values_list('id', 'val_total', 'val_total_currency', date_published_field, 'val_total_in_euros')
+
+    changed = []
+    updated = 0
+
+    for pk, val_total, currency, date_published, val_total_in_euros in rows.iterator(chunk_size=BATCH_SIZE):
+        euros = BaseHelper.get_val_total_in_euros(currency, val_total, date_published)
+
+        if euros != val_total_in_euros:
+            changed.append(model(id=pk, val_total_in_euros=euros))
+
+        if len(changed) == BATCH_SIZE:
+            model.objects.bulk_update(changed, ['val_total_in_euros'])
+            updated += len(changed)
+            changed = []
+
+    model.objects.bulk_update(changed, ['val_total_in_euros'])
+
+    return updated + len(changed)
+
+
+class Command(BaseCommand):
+    help = 'Recompute every value in euros from the ExchangeRate table (fallback rates for missing currencies)'
+
+    def handle(self, *args, **options):
+        exchange_rates = list(ExchangeRate.objects.values_list('currency', 'date', 'rate'))
+        set_exchange_rates(exchange_rates)
+
+        currencies = {currency for currency, _, _ in exchange_rates}
+        converted_currencies = currencies | FALLBACK_EXCHANGE_RATES_TO_EUROS.keys()
+
+        with transaction.atomic():
+            contract_objects = reconvert(ContractObject.objects.all(), 'contract__date_published',
+                                         converted_currencies)
+            contract_object_items = reconvert(ContractObjectItem.objects.all(),
+                                              'contract_object__contract__date_published', converted_currencies)
+
+            # Winner totals and the summary tables aggregate the values in euros
+            recompute_winner_totals()
+            rebuild_summaries()
+
+            transaction.on_commit(bump_generation)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconverted the values with the rates of {len(currencies)} currencies, {contract_objects} contract '
+            f'objects and {contract_object_items} contract object items changed'))
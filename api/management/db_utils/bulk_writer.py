@@ -0,0 +1,256 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .cpv_cache import cpv_cache
+from .entity_cache import authority_cache, winner_cache
+from ...cache import bump_generation
+from .summaries import update_summaries
+from .winner_totals import add_to_winner_totals
+from .save_data import clean_official_name, get_authority_defaults, get_winner_defaults, merge_entity_fields, \
+    save_data_to_models, get_document_cpv_codes
+from ...models import Authority, ContractObject, Contract, Winner, ContractObjectItem, Country
+
+
+class BulkDocumentWriter:
+    """
+    Collects extracted documents and persists them in batches.
+
+    Every batch is written in a single transaction with a fixed number of queries: entities are resolved through the
+    entity caches and one SELECT per table for the rest, merged in memory, and only the new and changed ones are written
+    back with bulk_create/bulk_update. The many-to-many links are inserted straight into the through tables.
+
+    If a batch fails, its documents are saved one by one with save_data_to_models, so only the broken documents are
+    lost; they are collected in `failed` (key -> error). Documents referencing unknown CPV codes are never written; they
+    are collected in `rejected` (key -> codes). The caller can report both together.
+    """
+
+    def __init__(self, batch_size=100):
+        self.batch_size = max(batch_size, 1)
+        self.documents = []
+        self.rejected = {}
+        self.failed = {}
+
+    def add(self, key, data):
+        self.documents.append((key, data))
+
+        if len(self.documents) >= self.batch_size:
+            return self.flush()
+
+        return []
+
+    def flush(self):
+        documents, pending, self.documents = [], self.documents, []
+
+        # CPV codes are validated up front, so an unknown code never aborts a transaction halfway through
+        for key, data in pending:
+            unknown_codes = cpv_cache.find_unknown_codes(get_document_cpv_codes(data))
+
+            if unknown_codes:
+                self.rejected[key] = sorted(unknown_codes)
+            else:
+                documents.append((key, data))
+
+        if not documents:
+            return []
+
+        try:
+            with transaction.atomic():
+                self.save_batch([data for _, data in documents])
+        except Exception:
+            saved_keys = []
+
+            for key, data in documents:
+                try:
+                    save_data_to_models(data)
+                except Exception as error:
+                    self.failed[key] = f'{type(error).__name__}: {error}'
+                else:
+                    saved_keys.append(key)
+
+            return saved_keys
+
+        return [key for key, _ in documents]
+
+    def save_batch(self, documents):
+        countries = self.get_or_create_countries(documents)
+
+        authorities, winners = self.resolve_entities(documents, countries)
+
+        winner_totals = defaultdict(float)
+
+        for data in documents:
+            for winner_data in iter_winners_data(data):
+                official_name = clean_official_name(winner_data['CONTRACTOR_DATA'][0].get('OFFICIALNAME'))
+
+                winner_totals[winners[official_name].pk] += winner_data.get('VAL_TOTAL_IN_EUROS') or 0
+
+        add_to_winner_totals(winner_totals)
+
+        contract_objects = []
+        contract_object_items = []
+        item_cpv_codes = []
+        item_winners = []
+
+        for data in documents:
+            object_data = data.get('OBJECT_DATA', {})
+
+            contract_data_mapped = {x.lower(): y for x, y in object_data.items() if x != 'ITEMS'}
+            cpv_main_code = contract_data_mapped.pop('cpv_main_code')
+
+            contract_object = ContractObject(cpv_main_code_id=cpv_cache.get_id(cpv_main_code), **contract_data_mapped)
+            contract_objects.append(contract_object)
+
+            for item_id, item_data in object_data.get('ITEMS', {}).items():
+                winners_data = item_data.get('WINNERS', [])
+                if not winners_data:
+                    continue
+
+                contract_object_items.append(ContractObjectItem(
+                    contract_object=contract_object,
+                    nuts_code=item_data.get('NUTS_CODE'),
+                    title=item_data.get('TITLE'),
+                    val_total=winners_data[0]['VAL_TOTAL'],
+                    val_total_currency=winners_data[0]['VAL_TOTAL_CURRENCY'],
+                    val_total_in_euros=winners_data[0]['VAL_TOTAL_IN_EUROS'],
+                    short_descr=item_data.get('SHORT_DESCR'),
+                ))
+
+                cpv_additional = list(item_data.get('CPV_ADDITIONAL', []))
+
+                if cpv_main_code not in cpv_additional:
+                    cpv_additional.append(cpv_main_code)
+
+                item_cpv_codes.append(cpv_additional)
+                item_winners.append([
+                    winners[clean_official_name(winner_data['CONTRACTOR_DATA'][0].get('OFFICIALNAME'))]
+                    for winner_data in winners_data
+                ])
+
+        ContractObject.objects.bulk_create(contract_objects)
+        ContractObjectItem.objects.bulk_create(contract_object_items)
+
+        contracts = []
+
+        for data, contract_object in zip(documents, contract_objects):
+            base_contract_data = data.get('BASE_CONTRACT_DATA', {})
+            authority_data = data.get('AUTHORITY_DATA', {})
+
+            contracts.append(Contract(
+                doc_id=base_contract_data.get('DOC_ID'),
+                uri=base_contract_data.get('URI_DOC_ORIGINAL'),
+                date_published=base_contract_data.get('DATE_PUB'),
+                short_title=base_contract_data.get('SHORT_TITLE'),
+                contract_nature=base_contract_data.get('NC_CONTRACT_NATURE'),
+                authority=authorities[clean_official_name(authority_data.get('OFFICIALNAME'))],
+                contract_object=contract_object,
+            ))
+
+        Contract.objects.bulk_create(contracts)
+
+        self.link_many_to_many(
+            ContractObjectItem.cpv_additional.through, 'contractobjectitem_id', 'category_id',
+            ((item.pk, cpv_cache.get_id(code)) for item, codes in zip(contract_object_items, item_cpv_codes)
+             for code in codes))
+
+        self.link_many_to_many(
+            ContractObjectItem.winner.through, 'contractobjectitem_id', 'winner_id',
+            ((item.pk, winner.pk) for item, item_winner_list in zip(contract_object_items, item_winners)
+             for winner in item_winner_list))
+
+        self.link_many_to_many(
+            Contract.original_cpv.through, 'contract_id', 'category_id',
+            ((contract.pk, cpv_cache.get_id(cpv_code.split(' - ')[0]))
+             for data, contract in zip(documents, contracts)
+             for cpv_code in data.get('BASE_CONTRACT_DATA', {}).get('ORIGINAL_CPV', [])))
+
+        update_summaries([contract.pk for contract in contracts])
+
+        # Cached API responses are dropped once the batch is committed
+        transaction.on_commit(bump_generation)
+
+        return contracts
+
+    @staticmethod
+    def get_or_create_countries(documents):
+        country_codes = set()
+
+        for data in documents:
+            country_codes.add(data.get('AUTHORITY_DATA', {}).get('COUNTRY'))
+
+            for winner_data in iter_winners_data(data):
+                country_codes.add(winner_data['CONTRACTOR_DATA'][0].get('COUNTRY'))
+
+        countries = Country.objects.in_bulk(country_codes, field_name='code')
+
+        # Country.save() resolves the country name, so the few new countries are not bulk created. Sorted, so the ids
+        # do not depend on the iteration order of the set
+        for country_code in sorted(country_codes - countries.keys()):
+            countries[country_code] = Country.objects.create(code=country_code)
+
+        return countries
+
+    @staticmethod
+    def resolve_entities(documents, countries):
+        authority_names = set()
+        winner_names = set()
+
+        for data in documents:
+            authority_names.add(clean_official_name(data.get('AUTHORITY_DATA', {}).get('OFFICIALNAME')))
+
+            for winner_data in iter_winners_data(data):
+                winner_names.add(clean_official_name(winner_data['CONTRACTOR_DATA'][0].get('OFFICIALNAME')))
+
+        authorities = authority_cache.load_many(authority_names)
+        winners = winner_cache.load_many(winner_names)
+
+        changed_authorities, changed_winners = {}, {}
+
+        # Entities are merged in document order, exactly like the per-document import does
+        for data in documents:
+            authority_data = data.get('AUTHORITY_DATA', {})
+            official_name = clean_official_name(authority_data.get('OFFICIALNAME'))
+            defaults = get_authority_defaults(authority_data, countries[authority_data.get('COUNTRY')])
+
+            if official_name in authorities:
+                if merge_entity_fields(authorities[official_name], defaults):
+                    changed_authorities[official_name] = authorities[official_name]
+            else:
+                authorities[official_name] = Authority(official_name=official_name, **defaults)
+
+            for winner_data in iter_winners_data(data):
+                official_name = clean_official_name(winner_data['CONTRACTOR_DATA'][0].get('OFFICIALNAME'))
+                country = countries[winner_data['CONTRACTOR_DATA'][0].get('COUNTRY')]
+                defaults = get_winner_defaults(winner_data, country)
+
+                if official_name in winners:
+                    if merge_entity_fields(winners[official_name], defaults):
+                        changed_winners[official_name] = winners[official_name]
+                else:
+                    winners[official_name] = Winner(official_name=official_name, **defaults)
+
+        for cache, entities, changed_entities in ((authority_cache, authorities, changed_authorities),
+                                                  (winner_cache, winners, changed_winners)):
+            new_entities = [entity for entity in entities.values() if entity.pk is None]
+            changed_entities = [entity for entity in changed_entities.values() if entity.pk is not None]
+
+            cache.model.objects.bulk_create(new_entities)
+
+            # The changed entities of a batch are written together, unchanged ones are not written at all
+            if changed_entities:
+                cache.model.objects.bulk_update(changed_entities, cache.fields)
+
+            cache.remember(entities.values())
+
+        return authorities, winners
+
+    @staticmethod
+    def link_many_to_many(through_model, from_field, to_field, pairs):
+        through_model.objects.bulk_create(
+            through_model(**{from_field: from_id, to_field: to_id}) for from_id, to_id in dict.fromkeys(pairs)
+        )
+
+
+def iter_winners_data(data):
+    for item_data in data.get('OBJECT_DATA', {}).get('ITEMS', {}).values():
+        yield from item_data.get('WINNERS', [])
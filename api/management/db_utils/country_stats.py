@@ -0,0 +1,91 @@
+from django.db.models import Count, Sum, F, Window
+from django.db.models.functions import RowNumber
+
+from ...models import Contract, CountryStats, CountryCpvStats
+
+
+def update_country_stats(contract_ids):
+    contract_totals = Contract.objects.filter(id__in=contract_ids, authority__country__isnull=False) \
+        .values_list('authority__country') \
+        .annotate(contract_count=Count('id'), val_total=Sum('contract_object__val_total_in_euros'))
+
+    cpv_counts = Contract.original_cpv.through.objects \
+        .filter(contract_id__in=contract_ids, contract__authority__country__isnull=False) \
+        .values_list('contract__authority__country', 'category') \
+        .annotate(contract_count=Count('id'))
+
+    country_stats = {stats.country_id: stats for stats in CountryStats.objects.filter(
+        country_id__in=[country_id for country_id, _, _ in contract_totals])}
+
+    for country_id, contract_count, val_total in contract_totals:
+        stats = country_stats.setdefault(country_id, CountryStats(country_id=country_id))
+
+        stats.contract_count += contract_count
+        stats.val_total_in_euros += val_total or 0
+
+    cpv_stats = {(stats.country_id, stats.category_id): stats for stats in CountryCpvStats.objects.filter(
+        country_id__in={country_id for country_id, _, _ in cpv_counts},
+        category_id__in={category_id for _, category_id, _ in cpv_counts})}
+
+    for country_id, category_id, contract_count in cpv_counts:
+        stats = cpv_stats.setdefault((country_id, category_id),
+                                     CountryCpvStats(country_id=country_id, category_id=category_id))
+
+        stats.contract_count += contract_count
+
+    save_stats(CountryCpvStats, cpv_stats.values(), ['contract_count'])
+
+    set_top_original_cpvs(country_stats)
+
+    save_stats(CountryStats, country_stats.values(), ['contract_count', 'val_total_in_euros', 'top_original_cpvs'])
+
+
+def rebuild_country_stats():
+    CountryCpvStats.objects.all().delete()
+    CountryStats.objects.all().delete()
+
+    CountryCpvStats.objects.bulk_create(
+        CountryCpvStats(country_id=country_id, category_id=category_id, contract_count=contract_count)
+        for country_id, category_id, contract_count in Contract.original_cpv.through.objects
+        .filter(contract__authority__country__isnull=False)
+        .values_list('contract__authority__country', 'category')
+        .annotate(contract_count=Count('id'))
+    )
+
+    country_stats = {
+        country_id: CountryStats(country_id=country_id, contract_count=contract_count,
+                                 val_total_in_euros=val_total or 0)
+        for country_id, contract_count, val_total in Contract.objects
+        .filter(authority__country__isnull=False)
+        .values_list('authority__country')
+        .annotate(contract_count=Count('id'), val_total=Sum('contract_object__val_total_in_euros'))
+    }
+
+    set_top_original_cpvs(country_stats)
+
+    CountryStats.objects.bulk_create(country_stats.values())
+
+
+def set_top_original_cpvs(country_stats):
+    for stats in country_stats.values():
+        stats.top_original_cpvs = []
+
+    top_cpvs = CountryCpvStats.objects.filter(country_id__in=country_stats.keys()) \
+        .annotate(rank=Window(RowNumber(), partition_by=F('country_id'),
+                              order_by=[F('contract_count').desc(), F('category__code').asc()])) \
+        .filter(rank__lte=CountryStats.TOP_ORIGINAL_CPVS) \
+        .order_by('country_id', 'rank') \
+        .values_list('country_id', 'category__code', 'category__name', 'contract_count')
+
+    for country_id, code, name, contract_count in top_cpvs:
+        country_stats[country_id].top_original_cpvs.append({'code': code, 'name': name, 'count': contract_count})
+
+
+def save_stats(model, stats, fields):
+    stats = list(stats)
+
+    new_rows = [row for row in stats if row.pk is None]
+    existing_rows = [row for row in stats if row.pk is not None]
+
+    model.objects.bulk_create(new_rows)
+    model.objects.bulk_update(existing_rows, fields)
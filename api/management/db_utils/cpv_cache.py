@@ -0,0 +1,84 @@
+from ...models import Category
+
+
+class UnknownCPVCodes(Exception):
+    def __init__(self, codes):
+        self.codes = sorted(codes)
+
+        super().__init__(f'Unknown CPV codes: {", ".join(self.codes)}')
+
+
+class CPVCodeCache:
+    """
+    Process-wide CPV code -> Category id lookup, and Category id -> ancestor ids for the summaries that add every item
+    to the categories above its codes.
+
+    The whole Category table is loaded once, so resolving a code never hits the database. Codes missing from the cache
+    are looked up once more before they are reported, which picks up categories added after the cache was loaded.
+    """
+
+    def __init__(self):
+        self.code_to_id = None
+        self.ancestor_ids = None
+
+    def load(self):
+        self.code_to_id = dict(Category.objects.values_list('code', 'id'))
+
+    def invalidate(self):
+        self.code_to_id = None
+        self.ancestor_ids = None
+
+    def get_ancestor_ids(self):
+        # category id -> ids of the category and of every category above it
+        if self.ancestor_ids is None:
+            parent_ids = dict(Category.objects.order_by().values_list('id', 'parent_id'))
+            ancestor_ids = {}
+
+            def get(category_id):
+                if category_id not in ancestor_ids:
+                    parent_id = parent_ids[category_id]
+                    ancestor_ids[category_id] = (category_id, *(get(parent_id) if parent_id is not None else ()))
+
+                return ancestor_ids[category_id]
+
+            for category_id in parent_ids:
+                get(category_id)
+
+            self.ancestor_ids = ancestor_ids
+
+        return self.ancestor_ids
+
+    def get_id(self, code):
+        if self.code_to_id is None:
+            self.load()
+
+        return self.code_to_id[code]
+
+    def get_ids(self, codes):
+        return [self.get_id(code) for code in codes]
+
+    def find_unknown_codes(self, codes):
+        if self.code_to_id is None:
+            self.load()
+
+        unknown_codes = set(codes) - self.code_to_id.keys()
+
+        if unknown_codes:
+            found_codes = dict(Category.objects.filter(code__in=unknown_codes).values_list('code', 'id'))
+
+            if found_codes:
+                self.code_to_id.update(found_codes)
+                self.ancestor_ids = None
+
+            unknown_codes -= self.code_to_id.keys()
+
+        return unknown_codes
+
+    def check_codes(self, codes):
+        unknown_codes = self.find_unknown_codes(codes)
+
+        if unknown_codes:
+            raise UnknownCPVCodes(unknown_codes)
+
+
+cpv_cache = CPVCodeCache()
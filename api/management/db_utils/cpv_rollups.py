@@ -0,0 +1,86 @@
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+from .country_stats import save_stats
+from .cpv_cache import cpv_cache
+from ...models import ContractObjectItem, CpvCountryRollup
+
+# Items per query when the rollups are rebuilt, so the CPV links of every item are read together
+REBUILD_CHUNK_SIZE = 10000
+
+
+def get_rollup_totals(item_cpv_links, ancestor_ids):
+    """
+    (category id, key) -> [item count, value in euros] of the items in the subtree of every category.
+
+    `item_cpv_links` are (item id, category id, key, value) rows ordered by item, the key being the country id for the
+    rollups and the month for the time series. An item with several CPV codes under the same category is counted once
+    for it.
+    """
+    totals = defaultdict(lambda: [0, 0])
+
+    for _, links in groupby(item_cpv_links, key=itemgetter(0)):
+        links = list(links)
+        _, _, key, value = links[0]
+
+        for category_id in set().union(*(ancestor_ids[category_id] for _, category_id, _, _ in links)):
+            total = totals[category_id, key]
+
+            total[0] += 1
+            total[1] += value or 0
+
+    return totals
+
+
+def get_item_cpv_links(items):
+    return ContractObjectItem.cpv_additional.through.objects \
+        .filter(contractobjectitem__in=items.filter(contract_object__contract__authority__country__isnull=False)) \
+        .order_by('contractobjectitem_id') \
+        .values_list('contractobjectitem_id', 'category_id',
+                     'contractobjectitem__contract_object__contract__authority__country',
+                     'contractobjectitem__val_total_in_euros')
+
+
+def update_cpv_rollups(contract_ids):
+    totals = get_rollup_totals(
+        get_item_cpv_links(ContractObjectItem.objects.filter(contract_object__contract__id__in=contract_ids)),
+        cpv_cache.get_ancestor_ids())
+
+    rollups = {(rollup.category_id, rollup.country_id): rollup for rollup in CpvCountryRollup.objects.filter(
+        category_id__in={category_id for category_id, _ in totals},
+        country_id__in={country_id for _, country_id in totals})}
+
+    for (category_id, country_id), (item_count, value) in totals.items():
+        rollup = rollups.setdefault((category_id, country_id),
+                                    CpvCountryRollup(category_id=category_id, country_id=country_id))
+
+        rollup.item_count += item_count
+        rollup.val_total_in_euros += value
+
+    save_stats(CpvCountryRollup, [rollup for key, rollup in rollups.items() if key in totals],
+               ['item_count', 'val_total_in_euros'])
+
+
+def rebuild_cpv_rollups():
+    CpvCountryRollup.objects.all().delete()
+
+    ancestor_ids = cpv_cache.get_ancestor_ids()
+    totals = defaultdict(lambda: [0, 0])
+
+    item_ids = list(ContractObjectItem.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, len(item_ids), REBUILD_CHUNK_SIZE):
+        chunk = item_ids[start:start + REBUILD_CHUNK_SIZE]
+        chunk_totals = get_rollup_totals(
+            get_item_cpv_links(ContractObjectItem.objects.filter(id__gte=chunk[0], id__lte=chunk[-1])), ancestor_ids)
+
+        for key, (item_count, value) in chunk_totals.items():
+            totals[key][0] += item_count
+            totals[key][1] += value
+
+    CpvCountryRollup.objects.bulk_create(
+        CpvCountryRollup(category_id=category_id, country_id=country_id, item_count=item_count,
+                         val_total_in_euros=value)
+        for (category_id, country_id), (item_count, value) in totals.items()
+    )
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+from django.db import transaction
+
+from ...models import Authority, Winner
+
+AUTHORITY_MERGE_FIELDS = ['address', 'town', 'contact_point', 'postal_code', 'fax', 'national_id', 'phone', 'email',
+                          'nuts', 'website']
+
+# val_total is only ever changed in the database, see add_to_winner_totals
+WINNER_MERGE_FIELDS = ['address', 'town', 'postal_code', 'email', 'nuts', 'website']
+
+MAX_ENTRIES = 100000
+
+
+class EntityCache:
+    """
+    Process-wide LRU of official name -> (id, country id, merged field values) for one entity model.
+
+    Entities found in the cache are resolved and merged without reading their rows again. The cache only ever holds
+    committed rows: `remember` records the entities once the surrounding transaction commits, so nothing written by a
+    rolled back batch is kept.
+    """
+
+    def __init__(self, model, fields, max_entries=MAX_ENTRIES):
+        self.model = model
+        self.fields = fields
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def clear(self):
+        self.entries.clear()
+
+    def get(self, official_name):
+        entry = self.entries.get(official_name)
+
+        if entry is None:
+            return None
+
+        self.entries.move_to_end(official_name)
+
+        pk, country_id, values = entry
+
+        return self.model(pk=pk, official_name=official_name, country_id=country_id, **dict(zip(self.fields, values)))
+
+    def get_many(self, official_names):
+        entities = {}
+
+        for official_name in official_names:
+            entity = self.get(official_name)
+
+            if entity is not None:
+                entities[official_name] = entity
+
+        return entities
+
+    def load_many(self, official_names):
+        # Cached entities first, the rest with one SELECT of the merged columns
+        entities = self.get_many(official_names)
+
+        entities.update(self.model.objects.only('official_name', 'country', *self.fields)
+                        .in_bulk(set(official_names) - entities.keys(), field_name='official_name'))
+
+        return entities
+
+    def remember(self, entities):
+        # The values are read now, the cache is only updated if the transaction commits
+        entries = [(entity.official_name, (entity.pk, entity.country_id,
+                                           tuple(getattr(entity, field) for field in self.fields)))
+                   for entity in entities]
+
+        transaction.on_commit(lambda: self.put(entries))
+
+    def put(self, entries):
+        for official_name, entry in entries:
+            self.entries[official_name] = entry
+            self.entries.move_to_end(official_name)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+authority_cache = EntityCache(Authority, AUTHORITY_MERGE_FIELDS)
+winner_cache = EntityCache(Winner, WINNER_MERGE_FIELDS)
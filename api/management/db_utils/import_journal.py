@@ -0,0 +1,25 @@
+import hashlib
+import os
+
+from ...models import ImportJournal
+
+JOURNAL_UPDATE_FIELDS = ['doc_id', 'fingerprint', 'status', 'extract_seconds', 'save_seconds', 'error', 'updated_at']
+
+
+def get_fingerprint(xml_file_path):
+    # Size and modification time identify a version of the file without reading it
+    stat = os.stat(xml_file_path)
+
+    return hashlib.sha1(f'{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()
+
+
+def load_journal():
+    # file path -> (fingerprint, status), read once when the import starts
+    return {file_path: (fingerprint, status) for file_path, fingerprint, status in
+            ImportJournal.objects.values_list('file_path', 'fingerprint', 'status')}
+
+
+def write_journal_entries(entries):
+    # A file is journaled again when it is retried, the latest attempt wins
+    ImportJournal.objects.bulk_create(entries, update_conflicts=True, unique_fields=['file_path'],
+                                      update_fields=JOURNAL_UPDATE_FIELDS)
@@ -0,0 +1,257 @@
+import re
+from collections import defaultdict
+
+from django.db import transaction
+
+from .cpv_cache import cpv_cache
+from .entity_cache import authority_cache, winner_cache
+from ...cache import bump_generation
+from .summaries import update_summaries
+from .winner_totals import add_to_winner_totals
+from ...models import Authority, ContractObject, Contract, Winner, ContractObjectItem, Country
+
+
+NAME_PUNCTUATION = str.maketrans({'.': ' ', ',': ' '})
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+MERGE_SEPARATOR = ', '
+
+# Merged values stop growing at this length, new values are dropped instead of appended
+MERGED_VALUE_MAX_LEN = 1000
+
+
+def clean_official_name(name):
+    cleaned_string = name.strip().lower().translate(NAME_PUNCTUATION)
+
+    return WHITESPACE_PATTERN.sub(' ', cleaned_string).strip()
+
+
+def get_authority_defaults(authority_data, country):
+    return {
+        'address': authority_data.get('ADDRESS'),
+        'town': authority_data.get('TOWN'),
+        'contact_point': authority_data.get('CONTACT_POINT'),
+        'postal_code': authority_data.get('POSTAL_CODE'),
+        'fax': authority_data.get('FAX', ''),
+        'national_id': authority_data.get('NATIONALID'),
+        'country': country,
+        'phone': authority_data.get('PHONE'),
+        'email': authority_data.get('E_MAIL'),
+        'nuts': authority_data.get('NUTS'),
+        'website': authority_data.get('URL_GENERAL'),
+    }
+
+
+def get_winner_defaults(winner_data, country):
+    return {
+        'address': winner_data['CONTRACTOR_DATA'][0].get('ADDRESS'),
+        'town': winner_data['CONTRACTOR_DATA'][0].get('TOWN'),
+        'postal_code': winner_data['CONTRACTOR_DATA'][0].get('POSTAL_CODE'),
+        'country': country,
+        'email': winner_data['CONTRACTOR_DATA'][0].get('E_MAIL'),
+        'nuts': winner_data['CONTRACTOR_DATA'][0].get('NUTS'),
+        'website': winner_data['CONTRACTOR_DATA'][0].get('URL'),
+
+    }
+
+
+def merge_value(current_value, value):
+    if not value:
+        return current_value
+
+    if not current_value:
+        return value
+
+    # Values are compared like official names, so case, commas, dots and spacing do not make a new value
+    merged_values = {'', clean_official_name(current_value)}
+    merged_values.update(clean_official_name(part) for part in current_value.split(MERGE_SEPARATOR))
+
+    if clean_official_name(value) in merged_values:
+        return current_value
+
+    merged_value = f'{current_value}{MERGE_SEPARATOR}{value}'
+
+    return merged_value if len(merged_value) <= MERGED_VALUE_MAX_LEN else current_value
+
+
+# Returns the fields that changed, so unchanged entities are never written
+def merge_entity_fields(entity, defaults):
+    changed_fields = []
+
+    for field, value in defaults.items():
+        if field == 'country':
+            continue
+
+        current_value = getattr(entity, field)
+        merged_value = merge_value(current_value, value)
+
+        if merged_value != current_value:
+            setattr(entity, field, merged_value)
+            changed_fields.append(field)
+
+    return changed_fields
+
+
+def create_or_get_authority(authority_data):
+    official_name = clean_official_name(authority_data.get('OFFICIALNAME'))
+
+    country_code = authority_data.get('COUNTRY')
+    country, _ = Country.objects.get_or_create(code=country_code)
+
+    defaults = get_authority_defaults(authority_data, country)
+
+    authority = authority_cache.get(official_name)
+    created = False
+
+    if authority is None:
+        authority, created = Authority.objects.get_or_create(
+            official_name=official_name,
+            defaults=defaults
+        )
+
+    if not created:
+        changed_fields = merge_entity_fields(authority, defaults)
+
+        if changed_fields:
+            authority.save(update_fields=changed_fields)
+
+    authority_cache.remember([authority])
+
+    return authority
+
+
+def create_or_get_winner(winner_data):
+    official_name = clean_official_name(winner_data['CONTRACTOR_DATA'][0].get('OFFICIALNAME'))
+
+    country_code = winner_data['CONTRACTOR_DATA'][0].get('COUNTRY')
+    country, _ = Country.objects.get_or_create(code=country_code)
+
+    defaults = get_winner_defaults(winner_data, country)
+
+    winner = winner_cache.get(official_name)
+    created = False
+
+    if winner is None:
+        winner, created = Winner.objects.get_or_create(
+            official_name=official_name,
+            defaults=defaults
+        )
+
+    if not created:
+        # val_total is never among the changed fields, it is only ever changed in the database
+        changed_fields = merge_entity_fields(winner, defaults)
+
+        if changed_fields:
+            winner.save(update_fields=changed_fields)
+
+    winner_cache.remember([winner])
+
+    return winner
+
+
+def get_document_cpv_codes(data):
+    object_data = data.get('OBJECT_DATA', {})
+
+    cpv_codes = {object_data.get('CPV_MAIN_CODE')}
+
+    for item_data in object_data.get('ITEMS', {}).values():
+        cpv_codes.update(item_data.get('CPV_ADDITIONAL', []))
+
+    for cpv_code in data.get('BASE_CONTRACT_DATA', {}).get('ORIGINAL_CPV', []):
+        cpv_codes.add(cpv_code.split(' - ')[0])
+
+    return cpv_codes
+
+
+# Returns winner id -> value in euros won with the item
+def create_contract_object_item(item_data, contract_object, cpv_main_code):
+    winner_totals = defaultdict(float)
+
+    winners_data = item_data.get('WINNERS', [])
+    if not winners_data:
+        return winner_totals
+
+    contract_object_item = ContractObjectItem.objects.create(
+        contract_object=contract_object,
+        nuts_code=item_data.get('NUTS_CODE'),
+        title=item_data.get('TITLE'),
+        val_total=item_data.get('WINNERS')[0]['VAL_TOTAL'],
+        val_total_currency=item_data.get('WINNERS')[0]['VAL_TOTAL_CURRENCY'],
+        val_total_in_euros=item_data.get('WINNERS')[0]['VAL_TOTAL_IN_EUROS'],
+        short_descr=item_data.get('SHORT_DESCR'),
+    )
+
+    cpv_additional = item_data.get('CPV_ADDITIONAL', [])
+
+    if cpv_main_code not in cpv_additional:
+        cpv_additional.append(cpv_main_code)
+
+    contract_object_item.cpv_additional.add(*cpv_cache.get_ids(cpv_additional))
+
+    for winner_data in item_data.get('WINNERS', []):
+        winner = create_or_get_winner(winner_data)
+
+        winner_totals[winner.id] += winner_data.get('VAL_TOTAL_IN_EUROS') or 0
+
+        contract_object_item.winner.add(winner)
+
+    return winner_totals
+
+
+def create_contract_object(object_data):
+    cpv_main_code = object_data.pop('cpv_main_code')
+
+    return ContractObject.objects.create(
+        cpv_main_code_id=cpv_cache.get_id(cpv_main_code),
+        **object_data
+    )
+
+
+def create_contract(base_contract_data, authority, contract_object):
+    return Contract.objects.create(
+        doc_id=base_contract_data.get('DOC_ID'),
+        uri=base_contract_data.get('URI_DOC_ORIGINAL'),
+        date_published=base_contract_data.get('DATE_PUB'),
+        short_title=base_contract_data.get('SHORT_TITLE'),
+        contract_nature=base_contract_data.get('NC_CONTRACT_NATURE'),
+        authority=authority,
+        contract_object=contract_object,
+    )
+
+
+def link_original_cpv_codes(contract, original_cpv_codes):
+    contract.original_cpv.add(*cpv_cache.get_ids(cpv_code.split(' - ')[0] for cpv_code in original_cpv_codes))
+
+
+def save_data_to_models(data):
+    # Unknown CPV codes are reported all at once before anything is written
+    cpv_cache.check_codes(get_document_cpv_codes(data))
+
+    with transaction.atomic():
+        authority_data = data.get('AUTHORITY_DATA', {})
+        base_contract_data = data.get('BASE_CONTRACT_DATA', {})
+        object_data = data.get('OBJECT_DATA', {})
+
+        authority = create_or_get_authority(authority_data)
+        contract_data_mapped = {x.lower(): y for x, y in object_data.items() if x != 'ITEMS'}
+        contract_object = create_contract_object(contract_data_mapped)
+
+        winner_totals = defaultdict(float)
+
+        for item_id, item_data in object_data.get('ITEMS', {}).items():
+            item_winner_totals = create_contract_object_item(item_data, contract_object,
+                                                             object_data.get('CPV_MAIN_CODE'))
+
+            for winner_id, total in item_winner_totals.items():
+                winner_totals[winner_id] += total
+
+        add_to_winner_totals(winner_totals)
+
+        contract = create_contract(base_contract_data, authority, contract_object)
+
+        original_cpv_codes = base_contract_data.get('ORIGINAL_CPV', [])
+        link_original_cpv_codes(contract, original_cpv_codes)
+
+        update_summaries([contract.id])
+
+        transaction.on_commit(bump_generation)
@@ -0,0 +1,43 @@
+from django.db.models import Prefetch
+
+from ...models import Contract, ContractObjectItem, ContractSearchDocument
+
+REBUILD_CHUNK_SIZE = 1000
+
+
+def get_search_body(contract):
+    contract_object = contract.contract_object
+
+    texts = [contract.short_title, contract_object.title, contract_object.short_descr]
+
+    for item in contract_object.items.all():
+        texts.extend((item.title, item.short_descr))
+
+    # Items often repeat the title and description of the contract object
+    return '\n'.join(dict.fromkeys(text for text in texts if text))
+
+
+def create_search_documents(contract_ids):
+    contracts = Contract.objects.filter(id__in=contract_ids) \
+        .select_related('contract_object') \
+        .prefetch_related(Prefetch('contract_object__items',
+                                   queryset=ContractObjectItem.objects.only('contract_object', 'title', 'short_descr')))
+
+    ContractSearchDocument.objects.bulk_create(
+        ContractSearchDocument(contract=contract, body=get_search_body(contract)) for contract in contracts
+    )
+
+
+def update_search_documents(contract_ids):
+    ContractSearchDocument.objects.filter(contract_id__in=contract_ids).delete()
+
+    create_search_documents(contract_ids)
+
+
+def rebuild_search_documents():
+    ContractSearchDocument.objects.all().delete()
+
+    contract_ids = list(Contract.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, len(contract_ids), REBUILD_CHUNK_SIZE):
+        create_search_documents(contract_ids[start:start + REBUILD_CHUNK_SIZE])
@@ -0,0 +1,25 @@
+from .country_stats import update_country_stats, rebuild_country_stats
+from .cpv_rollups import update_cpv_rollups, rebuild_cpv_rollups
+from .search_documents import update_search_documents, rebuild_search_documents
+from .time_series import update_time_series, rebuild_time_series
+from .winner_profiles import update_winner_profiles, rebuild_winner_profiles
+
+# Summary tables derived from the imported contracts: name -> (incremental update, full rebuild)
+SUMMARIES = {
+    'country_stats': (update_country_stats, rebuild_country_stats),
+    'winner_profiles': (update_winner_profiles, rebuild_winner_profiles),
+    'cpv_rollups': (update_cpv_rollups, rebuild_cpv_rollups),
+    'time_series': (update_time_series, rebuild_time_series),
+    'search_documents': (update_search_documents, rebuild_search_documents),
+}
+
+
+def update_summaries(contract_ids):
+    for update, _ in SUMMARIES.values():
+        update(contract_ids)
+
+
+def rebuild_summaries(names=None):
+    for name, (_, rebuild) in SUMMARIES.items():
+        if names is None or name in names:
+            rebuild()
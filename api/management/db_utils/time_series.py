@@ -0,0 +1,98 @@
+from collections import defaultdict
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .country_stats import save_stats
+from .cpv_cache import cpv_cache
+from .cpv_rollups import get_rollup_totals
+from ...models import Contract, ContractObjectItem, TimeSeriesBucket
+
+# Contracts per query when the buckets are rebuilt, so the CPV links of every item are read together
+REBUILD_CHUNK_SIZE = 5000
+
+# Dimension -> contract field grouped on, for the dimensions counting contracts
+CONTRACT_DIMENSIONS = {
+    TimeSeriesBucket.DIMENSION_COUNTRY: 'authority__country',
+    TimeSeriesBucket.DIMENSION_AUTHORITY: 'authority',
+}
+
+
+def get_bucket_totals(contract_lookups, ancestor_ids):
+    """
+    (dimension, object id, month) -> [count, value in euros] of the contracts matching `contract_lookups` and of their
+    items.
+    """
+    contracts = Contract.objects.filter(**contract_lookups)
+    items = ContractObjectItem.objects.filter(
+        **{f'contract_object__contract__{lookup}': value for lookup, value in contract_lookups.items()})
+
+    totals = defaultdict(lambda: [0, 0])
+
+    for dimension, field in CONTRACT_DIMENSIONS.items():
+        for object_id, month, count, value in contracts.filter(**{f'{field}__isnull': False}) \
+                .annotate(month=TruncMonth('date_published')) \
+                .order_by() \
+                .values_list(field, 'month') \
+                .annotate(count=Count('id'), value=Sum('contract_object__val_total_in_euros')):
+            totals[dimension, object_id, month] = [count, value or 0]
+
+    for winner_id, month, count, value in ContractObjectItem.winner.through.objects \
+            .filter(contractobjectitem__in=items) \
+            .annotate(month=TruncMonth('contractobjectitem__contract_object__contract__date_published')) \
+            .order_by() \
+            .values_list('winner', 'month') \
+            .annotate(count=Count('id'), value=Sum('contractobjectitem__val_total_in_euros')):
+        totals[TimeSeriesBucket.DIMENSION_WINNER, winner_id, month] = [count, value or 0]
+
+    item_cpv_months = ContractObjectItem.cpv_additional.through.objects \
+        .filter(contractobjectitem__in=items) \
+        .order_by('contractobjectitem_id') \
+        .values_list('contractobjectitem_id', 'category_id',
+                     TruncMonth('contractobjectitem__contract_object__contract__date_published'),
+                     'contractobjectitem__val_total_in_euros')
+
+    for (category_id, month), total in get_rollup_totals(item_cpv_months, ancestor_ids).items():
+        totals[TimeSeriesBucket.DIMENSION_CPV, category_id, month] = total
+
+    return totals
+
+
+def update_time_series(contract_ids):
+    totals = get_bucket_totals({'id__in': contract_ids}, cpv_cache.get_ancestor_ids())
+
+    buckets = {(bucket.dimension, bucket.object_id, bucket.month): bucket for bucket in TimeSeriesBucket.objects.filter(
+        dimension__in={dimension for dimension, _, _ in totals},
+        object_id__in={object_id for _, object_id, _ in totals},
+        month__in={month for _, _, month in totals})}
+
+    for (dimension, object_id, month), (count, value) in totals.items():
+        bucket = buckets.setdefault((dimension, object_id, month),
+                                    TimeSeriesBucket(dimension=dimension, object_id=object_id, month=month))
+
+        bucket.count += count
+        bucket.val_total_in_euros += value
+
+    save_stats(TimeSeriesBucket, [bucket for key, bucket in buckets.items() if key in totals],
+               ['count', 'val_total_in_euros'])
+
+
+def rebuild_time_series():
+    TimeSeriesBucket.objects.all().delete()
+
+    ancestor_ids = cpv_cache.get_ancestor_ids()
+    totals = defaultdict(lambda: [0, 0])
+
+    contract_ids = list(Contract.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, len(contract_ids), REBUILD_CHUNK_SIZE):
+        chunk = contract_ids[start:start + REBUILD_CHUNK_SIZE]
+
+        for key, (count, value) in get_bucket_totals({'id__gte': chunk[0], 'id__lte': chunk[-1]}, ancestor_ids).items():
+            totals[key][0] += count
+            totals[key][1] += value
+
+    TimeSeriesBucket.objects.bulk_create(
+        TimeSeriesBucket(dimension=dimension, object_id=object_id, month=month, count=count, val_total_in_euros=value)
+        for (dimension, object_id, month), (count, value) in totals.items()
+    )
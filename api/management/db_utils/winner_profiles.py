@@ -0,0 +1,86 @@
+from django.db.models import Count, Sum, F, Window
+from django.db.models.functions import RowNumber
+
+from .country_stats import save_stats
+from ...models import ContractObjectItem, WinnerCpvProfile, WinnerCpvStats
+
+
+def update_winner_profiles(contract_ids):
+    item_winners = ContractObjectItem.winner.through.objects \
+        .filter(contractobjectitem__contract_object__contract__id__in=contract_ids)
+
+    winner_totals = item_winners \
+        .values_list('winner', 'winner__country') \
+        .annotate(total_value=Sum('contractobjectitem__val_total_in_euros'))
+
+    cpv_counts = ContractObjectItem.objects.filter(contract_object__contract__id__in=contract_ids) \
+        .values_list('winner', 'cpv_additional') \
+        .annotate(item_count=Count('id'))
+
+    # Items without winners or CPV codes come back from the outer joins as None
+    cpv_counts = [(winner_id, category_id, item_count) for winner_id, category_id, item_count in cpv_counts
+                  if winner_id is not None and category_id is not None]
+
+    profiles = {profile.winner_id: profile for profile in WinnerCpvProfile.objects.filter(
+        winner_id__in=[winner_id for winner_id, _, _ in winner_totals])}
+
+    for winner_id, country_id, total_value in winner_totals:
+        profile = profiles.setdefault(winner_id, WinnerCpvProfile(winner_id=winner_id))
+
+        profile.country_id = country_id
+        profile.total_value += total_value or 0
+
+    cpv_stats = {(stats.winner_id, stats.category_id): stats for stats in WinnerCpvStats.objects.filter(
+        winner_id__in={winner_id for winner_id, _, _ in cpv_counts},
+        category_id__in={category_id for _, category_id, _ in cpv_counts})}
+
+    for winner_id, category_id, item_count in cpv_counts:
+        stats = cpv_stats.setdefault((winner_id, category_id),
+                                     WinnerCpvStats(winner_id=winner_id, category_id=category_id))
+
+        stats.item_count += item_count
+
+    save_stats(WinnerCpvStats, cpv_stats.values(), ['item_count'])
+
+    set_top_cpv_codes(profiles)
+
+    save_stats(WinnerCpvProfile, profiles.values(), ['country', 'total_value', 'top_cpv_codes'])
+
+
+def rebuild_winner_profiles():
+    WinnerCpvStats.objects.all().delete()
+    WinnerCpvProfile.objects.all().delete()
+
+    WinnerCpvStats.objects.bulk_create(
+        WinnerCpvStats(winner_id=winner_id, category_id=category_id, item_count=item_count)
+        for winner_id, category_id, item_count in ContractObjectItem.objects
+        .values_list('winner', 'cpv_additional')
+        .annotate(item_count=Count('id'))
+        if winner_id is not None and category_id is not None
+    )
+
+    profiles = {
+        winner_id: WinnerCpvProfile(winner_id=winner_id, country_id=country_id, total_value=total_value or 0)
+        for winner_id, country_id, total_value in ContractObjectItem.winner.through.objects
+        .values_list('winner', 'winner__country')
+        .annotate(total_value=Sum('contractobjectitem__val_total_in_euros'))
+    }
+
+    set_top_cpv_codes(profiles)
+
+    WinnerCpvProfile.objects.bulk_create(profiles.values())
+
+
+def set_top_cpv_codes(profiles):
+    for profile in profiles.values():
+        profile.top_cpv_codes = []
+
+    top_cpvs = WinnerCpvStats.objects.filter(winner_id__in=profiles.keys()) \
+        .annotate(rank=Window(RowNumber(), partition_by=F('winner_id'),
+                              order_by=[F('item_count').desc(), F('category__code').asc()])) \
+        .filter(rank__lte=WinnerCpvProfile.TOP_CPV_CODES) \
+        .order_by('winner_id', 'rank') \
+        .values_list('winner_id', 'category__code', 'category__name', 'item_count')
+
+    for winner_id, code, name, item_count in top_cpvs:
+        profiles[winner_id].top_cpv_codes.append({'code': code, 'name': name, 'count': item_count})
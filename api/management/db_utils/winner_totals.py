@@ -0,0 +1,33 @@
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from ...models import ContractObjectItem, Winner
+
+# Winners per UPDATE, keeps the CASE and its parameters well under the database limits
+UPDATE_CHUNK_SIZE = 500
+
+
+def add_to_winner_totals(winner_totals):
+    """
+    Add winner id -> value in euros to Winner.val_total.
+
+    The values are added by the database (val_total = val_total + CASE ...), so concurrent imports never overwrite each
+    other's totals and a whole batch costs one UPDATE per chunk of winners.
+    """
+    winner_totals = [(winner_id, total) for winner_id, total in winner_totals.items() if total]
+
+    for start in range(0, len(winner_totals), UPDATE_CHUNK_SIZE):
+        chunk = winner_totals[start:start + UPDATE_CHUNK_SIZE]
+
+        Winner.objects.filter(id__in=[winner_id for winner_id, _ in chunk]).update(val_total=F('val_total') + Case(
+            *(When(id=winner_id, then=Value(total)) for winner_id, total in chunk), output_field=FloatField()))
+
+
+def recompute_winner_totals():
+    # Winner.val_total is the sum of the values in euros of the items the winner won
+    item_totals = ContractObjectItem.winner.through.objects.filter(winner=OuterRef('pk')) \
+        .values('winner') \
+        .annotate(total=Sum('contractobjectitem__val_total_in_euros')) \
+        .values('total')
+
+    return Winner.objects.update(val_total=Coalesce(Subquery(item_totals), Value(0.0)))
@@ -1,8 +1,20 @@
 import string
 from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+
+from .exchange_rates import exchange_rate_store
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
 
 
 class BaseHelper:
+    # (prefix, el) -> compiled lookup, shared by every helper since they all use the same namespaces
+    compiled_paths = {}
+    compiled_xpaths = {}
+
     def __init__(self):
         self.namespace = {'ns0': 'http://publications.europa.eu/resource/schema/ted/R2.0.9/publication',
                           'n2021': 'http://publications.europa.eu/resource/schema/ted/2021/nuts',
@@ -11,40 +23,68 @@ class BaseHelper:
                           'efext': 'http://data.europa.eu/p27/eforms-ubl-extensions/1',
                           'ext': 'urn:oasis:names:specification:ubl:schema:xsd:CommonExtensionComponents-2'
                           }
-        # 11.01.2024 Exchange rates
-        # Create DB Model to Handle this type of information
-        self.exchange_rates_to_euros = {
-            'ALL': 0.00962005,  # Albania,
-            'AMD': 0.00224804,  # Armenia,
-            'AZN': 0.535567,  # Azerbaijan
-            'BYN': 0.276209,  # Belarus
-            'BAM': 0.511292,  # Bosnia and Herzegovina
-            'BGN': 0.511292,  # Bulgaria
-            'CZK': 0.0405105,  # Czech
-            'DKK': 0.134101,  # Denmark
-            'GEL': 0.339732,  # Georgia
-            'HUF': 0.00263746,  # Hungary
-            'ISK': 0.00666226,  # Iceland
-            'LI': 0.934626,  # Liechtenstein
-            'MDL': 0.0512310,  # Moldova
-            'MKD': 0.0162412,  # North Macedonia
-            'NOK': 0.0884774,  # Norway
-            'PLN': 0.229672,  # Poland
-            'RON': 0.201123,  # Romania
-            'RSD': 0.00853088,  # Serbia
-            'SEK': 0.0888406,  # Sweden
-            'CHF': 1.06992,  # Switzerland
-            'TRY': 0.0302849,  # Türkiye
-            'UAH': 0.0239965,  # Ukraine
-            'GBP': 1.16357  # Great Kingdom of Britain
-        }
         self.allowed_lots = [char.lower() for char in string.ascii_uppercase]
 
+    def compile_path(self, el, prefix):
+        """
+        Resolve `{prefix}:{el}` once into a namespace free ElementPath expression.
+
+        Returns (path, tag): `tag` is set for plain `.//tag` lookups, which are answered with Element.iter()
+        without going through ElementPath at all.
+        """
+        axis, separator, namespace_prefix = prefix.rpartition('/')
+        tag = f'{{{self.namespace[namespace_prefix]}}}{el}'
+        path = f'{axis}{separator}{tag}'
+
+        is_descendant_tag_lookup = f'{axis}{separator}' == './/' and el.isidentifier()
+
+        compiled_path = self.compiled_paths[(prefix, el)] = (path, tag if is_descendant_tag_lookup else None)
+
+        return compiled_path
+
+    def compile_xpath(self, el, prefix):
+        compiled_xpath = self.compiled_xpaths[(prefix, el)] = (
+            lxml_etree.XPath(f'({prefix}:{el})[1]', namespaces=self.namespace),
+            lxml_etree.XPath(f'{prefix}:{el}', namespaces=self.namespace),
+        )
+
+        return compiled_xpath
+
     def find_element(self, obj, el, prefix='.//ns0', ):
-        return obj.find(f'{prefix}:{el}', namespaces=self.namespace)
+        if lxml_etree is not None and isinstance(obj, (lxml_etree._Element, lxml_etree._ElementTree)):
+            find_first, _ = self.compiled_xpaths.get((prefix, el)) or self.compile_xpath(el, prefix)
+
+            found = find_first(obj.getroot() if isinstance(obj, lxml_etree._ElementTree) else obj)
+
+            return found[0] if found else None
+
+        path, tag = self.compiled_paths.get((prefix, el)) or self.compile_path(el, prefix)
+
+        if tag is None:
+            return obj.find(path)
+
+        root = obj.getroot() if hasattr(obj, 'getroot') else obj
+
+        for element in root.iter(tag):
+            if element is not root:
+                return element
+
+        return None
 
     def find_all_elements(self, obj, el, prefix='.//ns0', ):
-        return obj.findall(f'{prefix}:{el}', namespaces=self.namespace)
+        if lxml_etree is not None and isinstance(obj, (lxml_etree._Element, lxml_etree._ElementTree)):
+            _, find_all = self.compiled_xpaths.get((prefix, el)) or self.compile_xpath(el, prefix)
+
+            return find_all(obj.getroot() if isinstance(obj, lxml_etree._ElementTree) else obj)
+
+        path, tag = self.compiled_paths.get((prefix, el)) or self.compile_path(el, prefix)
+
+        if tag is None:
+            return obj.findall(path)
+
+        root = obj.getroot() if hasattr(obj, 'getroot') else obj
+
+        return [element for element in root.iter(tag) if element is not root]
 
     def element_exists(self, obj, el, prefix='.//ns0'):
         return self.find_element(obj, el, prefix) is not None
@@ -106,13 +146,17 @@ class BaseHelper:
 
         return val_total_estimate_currency
 
-    def get_val_total_in_euros(self, currency, val_total):
-        if currency not in self.exchange_rates_to_euros:
+    @staticmethod
+    def get_val_total_in_euros(currency, val_total, date=None):
+        rate_to_euros = exchange_rate_store.get_rate_to_euros(currency, date)
+
+        if rate_to_euros is None:
             return val_total
 
-        euros = self.exchange_rates_to_euros[currency] * val_total
+        euros = rate_to_euros * val_total
 
-        return float(f"{euros:.2f}")
+        # Rounded half up from the shortest decimal form of the float, reconvert_values_to_euros uses this as well
+        return float(Decimal(repr(euros)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
 
     @staticmethod
     def fix_date_publish(date):
@@ -0,0 +1,89 @@
+from bisect import bisect_right
+from datetime import datetime
+
+# EUR value of one unit of the currency as of 11.01.2024, used for currencies the ExchangeRate table has no rates for
+FALLBACK_EXCHANGE_RATES_TO_EUROS = {
+    'ALL': 0.00962005,  # Albania,
+    'AMD': 0.00224804,  # Armenia,
+    'AZN': 0.535567,  # Azerbaijan
+    'BYN': 0.276209,  # Belarus
+    'BAM': 0.511292,  # Bosnia and Herzegovina
+    'BGN': 0.511292,  # Bulgaria
+    'CZK': 0.0405105,  # Czech
+    'DKK': 0.134101,  # Denmark
+    'GEL': 0.339732,  # Georgia
+    'HUF': 0.00263746,  # Hungary
+    'ISK': 0.00666226,  # Iceland
+    'LI': 0.934626,  # Liechtenstein
+    'MDL': 0.0512310,  # Moldova
+    'MKD': 0.0162412,  # North Macedonia
+    'NOK': 0.0884774,  # Norway
+    'PLN': 0.229672,  # Poland
+    'RON': 0.201123,  # Romania
+    'RSD': 0.00853088,  # Serbia
+    'SEK': 0.0888406,  # Sweden
+    'CHF': 1.06992,  # Switzerland
+    'TRY': 0.0302849,  # Türkiye
+    'UAH': 0.0239965,  # Ukraine
+    'GBP': 1.16357  # Great Kingdom of Britain
+}
+
+
+class ExchangeRateStore:
+    """
+    Dated exchange rates to EUR, held in memory.
+
+    Rates are set as (currency, date, rate) rows, where the rate is the amount of the currency for one euro (the ECB
+    convention, see the ExchangeRate model). A lookup returns the latest rate published on or before the date (or the
+    earliest one for older dates) and is memoized per (currency, date). Currencies without rates fall back to
+    FALLBACK_EXCHANGE_RATES_TO_EUROS.
+
+    The store never touches the database, so the importer can hand the rows to its worker processes.
+    """
+
+    def __init__(self):
+        self.dates = {}
+        self.rates_to_euros = {}
+        self.lookups = {}
+
+    def set_rates(self, rates):
+        series = {}
+
+        for currency, date, rate in sorted(rates):
+            dates, rates_to_euros = series.setdefault(currency, ([], []))
+            dates.append(date)
+            rates_to_euros.append(1 / rate)
+
+        self.dates = {currency: dates for currency, (dates, _) in series.items()}
+        self.rates_to_euros = {currency: rates_to_euros for currency, (_, rates_to_euros) in series.items()}
+        self.lookups = {}
+
+    def get_rate_to_euros(self, currency, date=None):
+        if isinstance(date, datetime):
+            date = date.date()
+
+        key = (currency, date)
+
+        if key not in self.lookups:
+            self.lookups[key] = self.find_rate_to_euros(currency, date)
+
+        return self.lookups[key]
+
+    def find_rate_to_euros(self, currency, date):
+        if currency not in self.dates:
+            return FALLBACK_EXCHANGE_RATES_TO_EUROS.get(currency)
+
+        rates_to_euros = self.rates_to_euros[currency]
+
+        if date is None:
+            return rates_to_euros[-1]
+
+        return rates_to_euros[max(bisect_right(self.dates[currency], date) - 1, 0)]
+
+
+exchange_rate_store = ExchangeRateStore()
+
+
+def set_exchange_rates(rates):
+    # Module level so it can be the initializer of the importer's worker processes
+    exchange_rate_store.set_rates(rates)
@@ -6,10 +6,14 @@ award_content_helper = AwardContractHelper()
 
 
 def map_document_award_contract(tree):
-    document_award_contract_dict = defaultdict(list)
-
     award_contracts = award_content_helper.find_all_elements(tree, 'AWARD_CONTRACT')
 
+    return map_award_contracts(award_contracts)
+
+
+def map_award_contracts(award_contracts):
+    document_award_contract_dict = defaultdict(list)
+
     for award_contract in award_contracts:
 
         if award_content_helper.element_exists(award_contract, 'NO_AWARDED_CONTRACT'):
@@ -25,7 +29,7 @@ def map_document_award_contract(tree):
     return document_award_contract_dict
 
 
-def extract_award_contract_winner_data(award_contract):
+def extract_award_contract_winner_data(award_contract, date_published=None):
     award_lot = award_content_helper.get_award_content_lot_no(award_contract)
 
     award_contract_data = {'ID': award_contract.get('ITEM', 0), 'LOT_NO': award_lot if len(award_lot) > 0 else ['0']}
@@ -57,7 +61,7 @@ def extract_award_contract_winner_data(award_contract):
                     award_contract)
                 award_contract_data['VAL_TOTAL_IN_EUROS'] = award_content_helper.get_val_total_in_euros(
                     award_contract_data['VAL_TOTAL_CURRENCY'],
-                    award_contract_data['VAL_TOTAL'])
+                    award_contract_data['VAL_TOTAL'], date_published)
 
             elif award_content_helper.element_exists(award_contract_awarded_contract_values, 'VAL_ESTIMATED_TOTAL'):
                 award_contract_data['VAL_TOTAL'] = award_content_helper.get_val_total_estimate(
@@ -67,7 +71,7 @@ def extract_award_contract_winner_data(award_contract):
                 award_contract_data['VAL_TOTAL_IN_EUROS'] = award_content_helper.get_val_total_in_euros(
                     award_contract_data['VAL_TOTAL_CURRENCY'],
 
-                    float(award_contract_data['VAL_TOTAL']))
+                    float(award_contract_data['VAL_TOTAL']), date_published)
             elif award_content_helper.element_exists(award_contract_awarded_contract_values, 'VAL_RANGE_TOTAL'):
                 award_contract_awarded_contract_values_val_range_total = award_content_helper.get_award_contract_awarded_contract_values_val_range_total(
                     award_contract_awarded_contract_values)
@@ -80,7 +84,7 @@ def extract_award_contract_winner_data(award_contract):
                     award_contract_awarded_contract_values_val_range_total)
 
                 award_contract_data['VAL_TOTAL_IN_EUROS'] = award_content_helper.get_val_total_in_euros(
-                    award_contract_data['VAL_TOTAL_CURRENCY'], award_contract_data['VAL_TOTAL'])
+                    award_contract_data['VAL_TOTAL_CURRENCY'], award_contract_data['VAL_TOTAL'], date_published)
             else:
                 award_contract_data['VAL_TOTAL'] = 0
                 award_contract_data['VAL_TOTAL_CURRENCY'] = None
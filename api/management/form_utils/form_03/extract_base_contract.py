@@ -10,6 +10,14 @@ def extract_base_contract_data(tree):
 
     coded_data_section = base_contract_helper.find_element(tree, 'CODED_DATA_SECTION')
 
+    contract_data.update(extract_coded_data_section_data(coded_data_section))
+
+    return contract_data
+
+
+def extract_coded_data_section_data(coded_data_section):
+    contract_data = {}
+
     notice_data = base_contract_helper.find_element(coded_data_section, 'NOTICE_DATA')
 
     uri_list = base_contract_helper.find_element(notice_data, 'URI_LIST')
@@ -0,0 +1,120 @@
+import xml.etree.ElementTree as ET
+from functools import partial
+
+from ..base_helper import lxml_etree
+from .extract_authority import extract_authority_contract_data, base_contract_helper as authority_helper
+from .extract_award import map_award_contracts
+from .extract_base_contract import extract_base_contract_data, extract_coded_data_section_data, base_contract_helper
+from .extract_object import extract_object_data, extract_object_contract_data
+
+NS0 = f"{{{base_contract_helper.namespace['ns0']}}}"
+
+DATE_PUB_TAG = f'{NS0}DATE_PUB'
+ML_TI_DOC_TAG = f'{NS0}ML_TI_DOC'
+CODED_DATA_SECTION_TAG = f'{NS0}CODED_DATA_SECTION'
+ADDRESS_CONTRACTING_BODY_TAG = f'{NS0}ADDRESS_CONTRACTING_BODY'
+OBJECT_CONTRACT_TAG = f'{NS0}OBJECT_CONTRACT'
+AWARD_CONTRACT_TAG = f'{NS0}AWARD_CONTRACT'
+
+# The helpers answer lookups with compiled XPath objects when the document was parsed by lxml
+XML_PARSERS = {'etree': (ET.parse, ET.iterparse)}
+
+if lxml_etree is not None:
+    XML_PARSERS['lxml'] = (
+        partial(lxml_etree.parse, parser=lxml_etree.XMLParser(remove_comments=True, remove_pis=True)),
+        partial(lxml_etree.iterparse, remove_comments=True, remove_pis=True),
+    )
+
+# Top level sections of a TED_EXPORT document, cleared as soon as they are read
+SECTION_TAGS = {f'{NS0}{section}' for section in ('TECHNICAL_SECTION', 'LINKS_SECTION', 'CODED_DATA_SECTION',
+                                                   'TRANSLATION_SECTION', 'FORM_SECTION')}
+
+
+# Runs inside the worker processes of the importer, so it must not touch the database and
+# has to return only plain (picklable) data.
+def extract_document_data(xml_file_path, xml_parser='etree'):
+    parse, _ = XML_PARSERS[xml_parser]
+
+    tree = parse(xml_file_path)
+
+    base_contract_data = extract_base_contract_data(tree)
+
+    if not base_contract_data:
+        return xml_file_path, None, 'No Base Contract data'
+
+    authority_data = extract_authority_contract_data(tree)
+
+    if not authority_data:
+        return xml_file_path, None, 'No Authority data'
+
+    object_data = extract_object_data(tree, base_contract_data['DATE_PUB'])
+
+    return build_document_data(xml_file_path, base_contract_data, authority_data, object_data)
+
+
+# Same result as extract_document_data, but the document is read in a single iterparse pass. Every section the
+# extractors need is handled (or kept) when its end tag is reached and each top level section is cleared once it is
+# read, so the extractors only look at the few small subtrees they use instead of rescanning the whole document and
+# the memory used stays bounded by the largest section.
+def extract_document_data_streaming(xml_file_path, xml_parser='etree'):
+    _, iterparse = XML_PARSERS[xml_parser]
+
+    date_pub = None
+    short_title = None
+    coded_data_section_data = None
+    authority_data = None
+    object_contract = None
+    award_contracts = []
+
+    for event, element in iterparse(xml_file_path):
+        tag = element.tag
+
+        if tag == DATE_PUB_TAG and date_pub is None:
+            date_pub = base_contract_helper.fix_date_publish(element.text)
+
+        elif tag == ML_TI_DOC_TAG:
+            if short_title is None and element.get('LG') == 'EN':
+                short_title = base_contract_helper.get_short_title_text(element)
+
+            element.clear()
+
+        elif tag == CODED_DATA_SECTION_TAG and coded_data_section_data is None:
+            coded_data_section_data = extract_coded_data_section_data(element)
+
+        elif tag == ADDRESS_CONTRACTING_BODY_TAG and authority_data is None:
+            authority_data = authority_helper.get_authority_contract_data(element)
+
+        elif tag == OBJECT_CONTRACT_TAG and object_contract is None:
+            object_contract = element
+
+        elif tag == AWARD_CONTRACT_TAG:
+            award_contracts.append(element)
+
+        if tag in SECTION_TAGS:
+            # OBJECT_CONTRACT and the AWARD_CONTRACTs stay alive through the references kept above
+            element.clear()
+
+    base_contract_data = {'DATE_PUB': date_pub, 'SHORT_TITLE': short_title, **coded_data_section_data}
+
+    if not authority_data:
+        return xml_file_path, None, 'No Authority data'
+
+    object_data = extract_object_contract_data(object_contract, map_award_contracts(award_contracts), date_pub)
+
+    return build_document_data(xml_file_path, base_contract_data, authority_data, object_data)
+
+
+def build_document_data(xml_file_path, base_contract_data, authority_data, object_data):
+    if not object_data:
+        return xml_file_path, None, 'No Object data'
+
+    if not object_data['ITEMS']:
+        return xml_file_path, None, 'Items have no Winners'
+
+    data_dict = {
+        'BASE_CONTRACT_DATA': base_contract_data,
+        'AUTHORITY_DATA': authority_data,
+        'OBJECT_DATA': object_data,
+    }
+
+    return xml_file_path, data_dict, None
@@ -18,7 +18,7 @@ def map_document_objects(lot_division, items):
     return document_objects_dict
 
 
-def make_relationship(document_object_dict, document_award_contract_dict):
+def make_relationship(document_object_dict, document_award_contract_dict, date_published=None):
     items = {}
 
     for k, v in document_object_dict.items():
@@ -34,7 +34,7 @@ def make_relationship(document_object_dict, document_award_contract_dict):
                 award_contracts = document_award_contract_dict[k]
 
                 for award_contract in award_contracts:
-                    winner_data = extract_award_contract_winner_data(award_contract)
+                    winner_data = extract_award_contract_winner_data(award_contract, date_published)
 
                     items[k]['WINNERS'].append(winner_data)
 
@@ -49,18 +49,23 @@ def make_relationship(document_object_dict, document_award_contract_dict):
             award_contracts = document_award_contract_dict[k]
 
             for award_contract in award_contracts:
-                winner_data = extract_award_contract_winner_data(award_contract)
+                winner_data = extract_award_contract_winner_data(award_contract, date_published)
 
                 items[k]['WINNERS'].append(winner_data)
 
     return items
 
 
-def extract_object_data(tree):
-    contract_data = {}
-
+def extract_object_data(tree, date_published=None):
     object_contract = contract_object_helper.find_element(tree, 'OBJECT_CONTRACT')
 
+    return extract_object_contract_data(object_contract, map_document_award_contract(tree), date_published)
+
+
+# date_published picks the exchange rates used for the values in euros
+def extract_object_contract_data(object_contract, document_award_contract_dict, date_published=None):
+    contract_data = {}
+
     contract_data['TITLE'] = contract_object_helper.get_title(object_contract)
 
     contract_data['CPV_MAIN_CODE'] = contract_object_helper.get_object_contract_cpv_main_code(object_contract)
@@ -81,7 +86,7 @@ def extract_object_data(tree):
         contract_data['VAL_TOTAL_CURRENCY'] = contract_object_helper.get_val_total_currency(
             object_contract)
         contract_data['VAL_TOTAL_IN_EUROS'] = contract_object_helper.get_val_total_in_euros(
-            contract_data['VAL_TOTAL_CURRENCY'], contract_data['VAL_TOTAL'])
+            contract_data['VAL_TOTAL_CURRENCY'], contract_data['VAL_TOTAL'], date_published)
     else:
         contract_data['VAL_TOTAL'] = 0
         contract_data['VAL_TOTAL_CURRENCY'] = None
@@ -94,9 +99,7 @@ def extract_object_data(tree):
 
     document_object_dict = map_document_objects(contract_data['LOT_DIVISION'], object_contract_object_descr_items)
 
-    document_award_contract_dict = map_document_award_contract(tree)
-
-    items = make_relationship(document_object_dict, document_award_contract_dict)
+    items = make_relationship(document_object_dict, document_award_contract_dict, date_published)
 
     contract_data['ITEMS'] = items
 
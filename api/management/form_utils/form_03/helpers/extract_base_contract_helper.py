@@ -20,6 +20,9 @@ class BaseContractHelper(BaseHelper):
     def get_translated_short_title_in_english(self, obj):
         translated_title = self.find_element(obj, "ML_TI_DOC[@LG='EN']")
 
+        return self.get_short_title_text(translated_title)
+
+    def get_short_title_text(self, translated_title):
         translated_title_text = self.find_element(translated_title, 'TI_TEXT')
 
         translated_title_text_p = self.find_element(translated_title_text, 'P')
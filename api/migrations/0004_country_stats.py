@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-18 10:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_authority_official_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CountryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_count', models.PositiveIntegerField(default=0)),
+                ('val_total_in_euros', models.FloatField(default=0)),
+                ('top_original_cpvs', models.JSONField(default=list)),
+                ('country', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='api.country')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CountryCpvStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contract_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.category')),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.country')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['country', '-contract_count'], name='country_cpv_stats_top_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='countrycpvstats',
+            constraint=models.UniqueConstraint(fields=('country', 'category'), name='unique_country_cpv_stats'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-18 10:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_country_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WinnerCpvProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_value', models.FloatField(default=0)),
+                ('top_cpv_codes', models.JSONField(default=list)),
+                ('country', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.country')),
+                ('winner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cpv_profile', to='api.winner')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['country', '-total_value'], name='winner_cpv_profile_value_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WinnerCpvStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.category')),
+                ('winner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.winner')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['winner', '-item_count'], name='winner_cpv_stats_top_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='winnercpvstats',
+            constraint=models.UniqueConstraint(fields=('winner', 'category'), name='unique_winner_cpv_stats'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_winner_cpv_profile'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='winnercpvprofile',
+            name='winner_cpv_profile_value_idx',
+        ),
+        migrations.AddIndex(
+            model_name='winnercpvprofile',
+            index=models.Index(fields=['country', '-total_value', 'winner'], name='winner_cpv_profile_value_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_winner_cpv_profile_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['contract_nature', 'authority'], name='contract_nature_authority_idx'),
+        ),
+        # Contracts by CPV code straight from the index of the auto created through table
+        migrations.RunSQL(
+            'CREATE INDEX api_contract_original_cpv_category_contract_idx '
+            'ON api_contract_original_cpv (category_id, contract_id)',
+            'DROP INDEX api_contract_original_cpv_category_contract_idx',
+        ),
+    ]
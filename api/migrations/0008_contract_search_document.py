@@ -0,0 +1,74 @@
+# Generated by Django 5.0 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Postgres: GIN index on the tsvector expression used by api/search.py
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX api_contractsearchdocument_body_gin ON api_contractsearchdocument "
+    "USING GIN (to_tsvector('simple', body))",
+]
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX api_contractsearchdocument_body_gin',
+]
+
+# SQLite: FTS5 index over the documents table, kept in sync by triggers
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_contractsearchdocument_fts USING fts5("
+    "body, content='api_contractsearchdocument', content_rowid='contract_id')",
+    'CREATE TRIGGER api_contractsearchdocument_ai AFTER INSERT ON api_contractsearchdocument BEGIN '
+    'INSERT INTO api_contractsearchdocument_fts(rowid, body) VALUES (new.contract_id, new.body); END',
+    'CREATE TRIGGER api_contractsearchdocument_ad AFTER DELETE ON api_contractsearchdocument BEGIN '
+    "INSERT INTO api_contractsearchdocument_fts(api_contractsearchdocument_fts, rowid, body) "
+    "VALUES ('delete', old.contract_id, old.body); END",
+    'CREATE TRIGGER api_contractsearchdocument_au AFTER UPDATE ON api_contractsearchdocument BEGIN '
+    "INSERT INTO api_contractsearchdocument_fts(api_contractsearchdocument_fts, rowid, body) "
+    "VALUES ('delete', old.contract_id, old.body); "
+    'INSERT INTO api_contractsearchdocument_fts(rowid, body) VALUES (new.contract_id, new.body); END',
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER api_contractsearchdocument_au',
+    'DROP TRIGGER api_contractsearchdocument_ad',
+    'DROP TRIGGER api_contractsearchdocument_ai',
+    'DROP TABLE api_contractsearchdocument_fts',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(schema_editor, direction):
+    # Other databases get no index; api/search.py falls back to a plain scan there
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+
+    if statements:
+        for statement in statements[direction]:
+            schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    run_statements(schema_editor, 0)
+
+
+def drop_search_index(apps, schema_editor):
+    run_statements(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_advanced_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractSearchDocument',
+            fields=[
+                ('contract', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='api.contract')),
+                ('body', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
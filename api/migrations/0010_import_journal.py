@@ -0,0 +1,32 @@
+# Generated by Django 5.0 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_exchange_rate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJournal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=1024, unique=True)),
+                ('doc_id', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('status', models.CharField(choices=[('imported', 'Imported'), ('failed', 'Failed'), ('rejected', 'Rejected')], max_length=20)),
+                ('extract_seconds', models.FloatField(blank=True, null=True)),
+                ('save_seconds', models.FloatField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='contract',
+            name='doc_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
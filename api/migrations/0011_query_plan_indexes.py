@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-18 10:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_import_journal'),
+    ]
+
+    operations = [
+        # The composite index is created first, so the contracts of an authority never lose their index
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['authority', 'id'], name='contract_authority_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='contract',
+            name='authority',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.authority'),
+        ),
+        # Items of a winner in id order, read from the index of the auto created through table
+        migrations.RunSQL(
+            'CREATE INDEX api_contractobjectitem_winner_winner_item_idx '
+            'ON api_contractobjectitem_winner (winner_id, contractobjectitem_id)',
+            'DROP INDEX api_contractobjectitem_winner_winner_item_idx',
+        ),
+        # Items by CPV code, same as the original CPV index of the contracts in 0007
+        migrations.RunSQL(
+            'CREATE INDEX api_contractobjectitem_cpv_additional_category_item_idx '
+            'ON api_contractobjectitem_cpv_additional (category_id, contractobjectitem_id)',
+            'DROP INDEX api_contractobjectitem_cpv_additional_category_item_idx',
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_query_plan_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CpvCountryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('val_total_in_euros', models.FloatField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.category')),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.country')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['country', '-val_total_in_euros'], name='cpv_country_rollup_value_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cpvcountryrollup',
+            constraint=models.UniqueConstraint(fields=('category', 'country'), name='unique_cpv_country_rollup'),
+        ),
+    ]
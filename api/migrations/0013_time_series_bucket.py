@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_cpv_country_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeSeriesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('country', 'Country'), ('authority', 'Authority'), ('winner', 'Winner'), ('cpv', 'CPV')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('month', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('val_total_in_euros', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='timeseriesbucket',
+            constraint=models.UniqueConstraint(fields=('dimension', 'object_id', 'month'), name='unique_time_series_bucket'),
+        ),
+    ]
@@ -161,11 +161,162 @@ class Contract(models.Model):
         ('Works', 'Works'),
         ('Other', 'Other')
     ]
-    doc_id = models.CharField(max_length=DOC_ID_MAX_LEN)
+    doc_id = models.CharField(max_length=DOC_ID_MAX_LEN, db_index=True)
     uri = models.URLField()
     date_published = models.DateField()
     short_title = models.CharField(max_length=SHORT_TITLE_MAX_LEN)
     original_cpv = models.ManyToManyField(Category)
     contract_nature = models.CharField(max_length=CONTRACT_NATURE_MAX_LEN, choices=CONTRACT_NATURE_CHOICES)
-    authority = models.ForeignKey(Authority, on_delete=models.CASCADE)
+    # Indexed together with the id below, which also serves the contracts of an authority in id order
+    authority = models.ForeignKey(Authority, on_delete=models.CASCADE, db_index=False)
     contract_object = models.OneToOneField(ContractObject, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['contract_nature', 'authority'], name='contract_nature_authority_idx'),
+            models.Index(fields=['authority', 'id'], name='contract_authority_id_idx'),
+        ]
+
+
+class CountryStats(models.Model):
+    TOP_ORIGINAL_CPVS = 3
+
+    country = models.OneToOneField(Country, related_name='stats', on_delete=models.CASCADE)
+    contract_count = models.PositiveIntegerField(default=0)
+    val_total_in_euros = models.FloatField(default=0)
+    top_original_cpvs = models.JSONField(default=list)  # [{'code', 'name', 'count'}, ...]
+
+
+class CountryCpvStats(models.Model):
+    country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    contract_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['country', 'category'], name='unique_country_cpv_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['country', '-contract_count'], name='country_cpv_stats_top_idx'),
+        ]
+
+
+class WinnerCpvProfile(models.Model):
+    TOP_CPV_CODES = 3
+
+    winner = models.OneToOneField(Winner, related_name='cpv_profile', on_delete=models.CASCADE)
+    country = models.ForeignKey(Country, on_delete=models.CASCADE, null=True, blank=True)
+    total_value = models.FloatField(default=0)  # in Euros, sum of the items won
+    top_cpv_codes = models.JSONField(default=list)  # [{'code', 'name', 'count'}, ...]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['country', '-total_value', 'winner'], name='winner_cpv_profile_value_idx'),
+        ]
+
+
+class WinnerCpvStats(models.Model):
+    winner = models.ForeignKey(Winner, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    item_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['winner', 'category'], name='unique_winner_cpv_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['winner', '-item_count'], name='winner_cpv_stats_top_idx'),
+        ]
+
+
+class CpvCountryRollup(models.Model):
+    # Items of a country with a CPV code anywhere in the subtree of the category, each item counted once
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    item_count = models.PositiveIntegerField(default=0)
+    val_total_in_euros = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'country'], name='unique_cpv_country_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['country', '-val_total_in_euros'], name='cpv_country_rollup_value_idx'),
+        ]
+
+
+class TimeSeriesBucket(models.Model):
+    DIMENSION_MAX_LEN = 20
+
+    DIMENSION_COUNTRY = 'country'
+    DIMENSION_AUTHORITY = 'authority'
+    DIMENSION_WINNER = 'winner'
+    DIMENSION_CPV = 'cpv'
+
+    DIMENSION_CHOICES = [
+        (DIMENSION_COUNTRY, 'Country'),
+        (DIMENSION_AUTHORITY, 'Authority'),
+        (DIMENSION_WINNER, 'Winner'),
+        (DIMENSION_CPV, 'CPV'),  # items under the category, counted once like in CpvCountryRollup
+    ]
+
+    # Totals of one month of publication for one country, authority, winner or CPV category. Countries and authorities
+    # count contracts and their object values, winners and CPV categories count items and their values.
+    dimension = models.CharField(max_length=DIMENSION_MAX_LEN, choices=DIMENSION_CHOICES)
+    object_id = models.PositiveIntegerField()  # id of the country, authority, winner or category
+    month = models.DateField()  # first day of the month
+    count = models.PositiveIntegerField(default=0)
+    val_total_in_euros = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'object_id', 'month'], name='unique_time_series_bucket'),
+        ]
+
+
+class ContractSearchDocument(models.Model):
+    # Text of a contract, its object and its items, indexed for full-text search (see api/search.py)
+    contract = models.OneToOneField(Contract, primary_key=True, related_name='search_document',
+                                    on_delete=models.CASCADE)
+    body = models.TextField()
+
+
+class ExchangeRate(models.Model):
+    CURRENCY_MAX_LEN = 3
+
+    # ECB reference rate: amount of the currency for one euro on the given date
+    currency = models.CharField(max_length=CURRENCY_MAX_LEN)
+    date = models.DateField()
+    rate = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'date'], name='unique_exchange_rate'),
+        ]
+
+
+class ImportJournal(models.Model):
+    FILE_PATH_MAX_LEN = 1024
+    DOC_ID_MAX_LEN = 255
+    FINGERPRINT_MAX_LEN = 40
+    STATUS_MAX_LEN = 20
+
+    STATUS_IMPORTED = 'imported'
+    STATUS_FAILED = 'failed'
+    STATUS_REJECTED = 'rejected'
+
+    STATUS_CHOICES = [
+        (STATUS_IMPORTED, 'Imported'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_REJECTED, 'Rejected'),  # unknown CPV codes
+    ]
+
+    # One row per XML file, relative to the import root directory
+    file_path = models.CharField(max_length=FILE_PATH_MAX_LEN, unique=True)
+    doc_id = models.CharField(max_length=DOC_ID_MAX_LEN)
+    fingerprint = models.CharField(max_length=FINGERPRINT_MAX_LEN)  # sha1 of the file size and mtime
+    status = models.CharField(max_length=STATUS_MAX_LEN, choices=STATUS_CHOICES)
+    extract_seconds = models.FloatField(null=True, blank=True)
+    save_seconds = models.FloatField(null=True, blank=True)  # share of the batch the document was saved in
+    error = models.TextField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
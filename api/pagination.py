@@ -0,0 +1,142 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination, BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPaginator(BasePagination):
+    """
+    Forward only keyset (cursor) pagination on the `keyset_ordering` of a view, e.g. ['-total_value', 'winner_id'].
+
+    The cursor holds the sort key values of the last row of the previous page, so every page is read with an index
+    range condition instead of an OFFSET and costs the same however deep it is. The total count is only computed when
+    the client asks for it with `count=true`.
+    """
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    @staticmethod
+    def encode_cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+
+        # One sort key value per field of the ordering, anything else never reaches the filter
+        if not isinstance(position, list) or len(position) != len(self.ordering) or not all(
+                isinstance(value, (str, int, float)) for value in position):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+
+        return position
+
+    def get_position(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def get_after_position_filter(self, position):
+        # (a, b) > (x, y) written as a > x OR (a = x AND b > y), with the comparison flipped for descending fields
+        condition = Q(pk__in=[])
+        equal_so_far = Q()
+
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+
+            condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+            equal_so_far &= Q(**{name: value})
+
+        # Redundant bound on the first field, so the database can read a range of the index instead of scanning it
+        first_field, first_value = self.ordering[0], position[0]
+        bound = 'lte' if first_field.startswith('-') else 'gte'
+
+        return condition & Q(**{f'{first_field.lstrip("-")}__{bound}': first_value})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        if cursor:
+            position = self.decode_cursor(cursor)
+
+            queryset = queryset.filter(self.get_after_position_filter(position))
+
+        # One extra row tells whether there is a next page without counting
+        page = list(queryset[:self.page_size + 1])
+
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.get_position(self.page[-1])))
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict([('next', self.get_next_link()), ('previous', None), ('results', data)])
+
+        if self.count is not None:
+            response_data['count'] = self.count
+            response_data.move_to_end('count', last=False)
+
+        return Response(response_data)
+
+
+class CustomPaginator(PageNumberPagination):
+    """
+    Page number pagination, or keyset pagination for views that define `keyset_ordering` when the client opts in with
+    `pagination=cursor` (or sends a cursor).
+    """
+
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    pagination_query_param = 'pagination'
+
+    keyset = None
+
+    def use_keyset(self, request, view):
+        return getattr(view, 'keyset_ordering', None) is not None and (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or KeysetPaginator.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+
+        if self.use_keyset(request, view):
+            self.keyset = KeysetPaginator(view.keyset_ordering, self.get_page_size(request))
+
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
@@ -0,0 +1,164 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('api.profiling')
+
+# Profile of the request being handled, for the serializers
+current_profile = ContextVar('current_profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryProfile:
+    """
+    SQL queries of one request, recorded by a database execute wrapper.
+
+    Statements are counted by their SQL text as well, so a query repeated once per row (an N+1 pattern) shows up as
+    duplicates. The time spent in `serializer.data`, where related objects are read row by row, is recorded separately
+    along with the queries run meanwhile.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.sql_seconds = 0
+        self.statements = {}
+        self.serializing = False
+        self.serialization_seconds = 0
+        self.serialization_query_count = 0
+        self.serialization_sql_seconds = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.sql_seconds += time.perf_counter() - started
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    @property
+    def duplicate_count(self):
+        return self.query_count - len(self.statements)
+
+    def serialize(self, get_data, serializer):
+        # Serializers nested in the data of another one are counted with it
+        if self.serializing:
+            return get_data(serializer)
+
+        self.serializing = True
+        query_count, sql_seconds = self.query_count, self.sql_seconds
+        started = time.perf_counter()
+
+        try:
+            return get_data(serializer)
+        finally:
+            self.serialization_seconds += time.perf_counter() - started
+            self.serialization_query_count += self.query_count - query_count
+            self.serialization_sql_seconds += self.sql_seconds - sql_seconds
+            self.serializing = False
+
+
+def profile_serialization():
+    # Serializer.data and ListSerializer.data both return super().data, the outermost one is timed
+    get_data = BaseSerializer.data.fget
+
+    if getattr(get_data, 'profiled', False):
+        return
+
+    def get_profiled_data(serializer):
+        profile = current_profile.get()
+
+        return get_data(serializer) if profile is None else profile.serialize(get_data, serializer)
+
+    get_profiled_data.profiled = True
+    BaseSerializer.data = property(get_profiled_data)
+
+
+def get_query_budget(view_func):
+    # Views declare `query_budget = <max queries per request>`, as a class attribute or an as_view() argument
+    initkwargs = getattr(view_func, 'view_initkwargs', None) or {}
+
+    return initkwargs.get('query_budget', getattr(getattr(view_func, 'view_class', None), 'query_budget', None))
+
+
+class QueryProfilingMiddleware:
+    """
+    Records the query count, the SQL time, the serialization time (queries included) and the rest of the request time
+    (view code and rendering).
+
+    The numbers are returned in a Server-Timing header and logged as one JSON line per request on the `api.profiling`
+    logger, at DEBUG, or at WARNING when the view's query budget is exceeded. With QUERY_BUDGET_STRICT the request fails instead, so
+    tests and checks catch new N+1 queries.
+    """
+
+    def __init__(self, get_response):
+        if not settings.API_PROFILING:
+            raise MiddlewareNotUsed
+
+        profile_serialization()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = QueryProfile()
+        request.query_budget = None
+
+        started = time.perf_counter()
+        token = current_profile.set(profile)
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+
+        total_seconds = time.perf_counter() - started
+        serialization_seconds = profile.serialization_seconds - profile.serialization_sql_seconds
+        app_seconds = max(total_seconds - profile.sql_seconds - serialization_seconds, 0)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={profile.sql_seconds * 1000:.2f};desc="{profile.query_count} queries"',
+            f'ser;dur={profile.serialization_seconds * 1000:.2f};'
+            f'desc="{profile.serialization_query_count} queries"',
+            f'app;dur={app_seconds * 1000:.2f}',
+            f'total;dur={total_seconds * 1000:.2f}',
+        ])
+
+        over_budget = request.query_budget is not None and profile.query_count > request.query_budget
+
+        logger.log(logging.WARNING if over_budget else logging.DEBUG, json.dumps({
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'query_count': profile.query_count,
+            'duplicate_query_count': profile.duplicate_count,
+            'query_budget': request.query_budget,
+            'sql_ms': round(profile.sql_seconds * 1000, 2),
+            'serialization_ms': round(profile.serialization_seconds * 1000, 2),
+            'serialization_query_count': profile.serialization_query_count,
+            'app_ms': round(app_seconds * 1000, 2),
+            'total_ms': round(total_seconds * 1000, 2),
+        }))
+
+        if over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.get_full_path()} ran {profile.query_count} queries, '
+                f'its budget is {request.query_budget} ({profile.duplicate_count} duplicates)')
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func)
@@ -0,0 +1,93 @@
+import re
+
+from django.db import connection
+
+from .models import ContractSearchDocument
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+SQLITE_COUNT_SQL = 'SELECT COUNT(*) FROM api_contractsearchdocument_fts WHERE api_contractsearchdocument_fts MATCH %s'
+SQLITE_PAGE_SQL = '''
+    SELECT rowid, -bm25(api_contractsearchdocument_fts) AS rank
+    FROM api_contractsearchdocument_fts
+    WHERE api_contractsearchdocument_fts MATCH %s
+    ORDER BY bm25(api_contractsearchdocument_fts), rowid
+    LIMIT %s OFFSET %s
+'''
+
+POSTGRESQL_COUNT_SQL = '''
+    SELECT COUNT(*) FROM api_contractsearchdocument
+    WHERE to_tsvector('simple', body) @@ to_tsquery('simple', %s)
+'''
+POSTGRESQL_PAGE_SQL = '''
+    SELECT contract_id, ts_rank(to_tsvector('simple', body), to_tsquery('simple', %s)) AS rank
+    FROM api_contractsearchdocument
+    WHERE to_tsvector('simple', body) @@ to_tsquery('simple', %s)
+    ORDER BY rank DESC, contract_id
+    LIMIT %s OFFSET %s
+'''
+
+
+class ContractSearchResults:
+    """
+    Ranked (contract_id, rank) matches of a full-text query, counted and sliced lazily by the paginator.
+
+    Every word of the query has to match the start of a word of the contract text. The index is a GIN index on Postgres
+    and an FTS5 table on SQLite; other databases fall back to an unranked scan.
+    """
+
+    def __init__(self, query):
+        self.tokens = TOKEN_PATTERN.findall(query.lower())
+
+    def get_match_query(self):
+        if connection.vendor == 'postgresql':
+            return ' & '.join(f'{token}:*' for token in self.tokens)
+
+        return ' '.join(f'"{token}"*' for token in self.tokens)
+
+    def get_fallback_queryset(self):
+        queryset = ContractSearchDocument.objects.order_by('contract_id')
+
+        for token in self.tokens:
+            queryset = queryset.filter(body__icontains=token)
+
+        return queryset
+
+    def execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+            return cursor.fetchall()
+
+    def count(self):
+        if not self.tokens:
+            return 0
+
+        if connection.vendor == 'postgresql':
+            return self.execute(POSTGRESQL_COUNT_SQL, [self.get_match_query()])[0][0]
+
+        if connection.vendor == 'sqlite':
+            return self.execute(SQLITE_COUNT_SQL, [self.get_match_query()])[0][0]
+
+        return self.get_fallback_queryset().count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('Search results can only be sliced')
+
+        if not self.tokens:
+            return []
+
+        offset = index.start or 0
+        limit = index.stop - offset
+
+        if connection.vendor == 'postgresql':
+            match_query = self.get_match_query()
+
+            return self.execute(POSTGRESQL_PAGE_SQL, [match_query, match_query, limit, offset])
+
+        if connection.vendor == 'sqlite':
+            return self.execute(SQLITE_PAGE_SQL, [self.get_match_query(), limit, offset])
+
+        return [(contract_id, None) for contract_id in
+                self.get_fallback_queryset().values_list('contract_id', flat=True)[offset:offset + limit]]
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from .models import Authority, Winner, Category, Contract, ContractObject, ContractObjectItem, TenderUser, Country
+from .models import Authority, Winner, Category, Contract, ContractObject, ContractObjectItem, TenderUser, Country, \
+    WinnerCpvProfile
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -49,6 +50,18 @@ class CPVRankingSerializer(serializers.Serializer):
     val_total = serializers.FloatField()
 
 
+class CPVRollupRankingSerializer(serializers.Serializer):
+    country = serializers.SerializerMethodField()
+    val_total = serializers.FloatField()
+    item_count = serializers.IntegerField()
+
+    def get_country(self, obj):
+        return {
+            'code': obj['country__code'],
+            'name': obj['country__name']
+        }
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -71,20 +84,30 @@ class ContractObjectItemSerializer(serializers.ModelSerializer):
 
 class CountryAuthoritySerializer(serializers.ModelSerializer):
     top_cpv_codes = CategorySerializer(many=True, read_only=True)
+    total_value = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Authority
-        fields = ['id', 'official_name', 'top_cpv_codes']
+        fields = ['id', 'official_name', 'top_cpv_codes', 'total_value']
 
 
 class CountryContractorSerializer(serializers.ModelSerializer):
-    top_cpv_codes = CategorySerializer(many=True, read_only=True)
+    id = serializers.IntegerField(source='winner_id', read_only=True)
+    official_name = serializers.CharField(source='winner.official_name', read_only=True)
+    top_cpv_codes = serializers.SerializerMethodField()
     total_value = serializers.DecimalField(max_digits=50, decimal_places=2, read_only=True)
 
     class Meta:
-        model = Winner
+        model = WinnerCpvProfile
         fields = ['id', 'official_name', 'top_cpv_codes', 'total_value']
 
+    def get_top_cpv_codes(self, obj):
+        return [{
+            'cpv_additional__code': cpv['code'],
+            'cpv_additional__name': cpv['name'],
+            'occurrence_count': cpv['count'],
+        } for cpv in obj.top_cpv_codes]
+
 
 class CountryCpvInfoSerializer(serializers.Serializer):
     cpv_additional__code = serializers.CharField()
@@ -92,6 +115,49 @@ class CountryCpvInfoSerializer(serializers.Serializer):
     val_total = serializers.FloatField()
 
 
+class CountryCpvRollupSerializer(serializers.Serializer):
+    cpv_additional__code = serializers.CharField(source='category__code')
+    cpv_additional__name = serializers.CharField(source='category__name')
+    val_total = serializers.FloatField()
+    item_count = serializers.IntegerField()
+
+
+class CodeSerializer(serializers.Serializer):
+    code = serializers.CharField()
+
+
+class AdvancedSearchSerializer(serializers.Serializer):
+    authorityOrContractor = serializers.ChoiceField(['authority', 'contractor'], default='contractor')
+    placeOfPerformance = CodeSerializer(required=False, allow_null=True)
+    natureOfContract = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    cpvCode = CodeSerializer(required=False, allow_null=True)
+
+    def validate_natureOfContract(self, value):
+        if not value:
+            return value
+
+        value = value.capitalize()
+
+        if value not in dict(Contract.CONTRACT_NATURE_CHOICES):
+            raise serializers.ValidationError(
+                f'Expected one of: {", ".join(dict(Contract.CONTRACT_NATURE_CHOICES))}.')
+
+        return value
+
+
+class ContractSearchResultSerializer(serializers.ModelSerializer):
+    authority = serializers.CharField(source='authority.official_name')
+    country = serializers.CharField(source='authority.country.code', default=None)
+    contract_object_title = serializers.CharField(source='contract_object.title')
+    contract_object_val_total_in_euros = serializers.FloatField(source='contract_object.val_total_in_euros')
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Contract
+        fields = ['id', 'doc_id', 'short_title', 'date_published', 'contract_nature', 'authority', 'country',
+                  'contract_object_title', 'contract_object_val_total_in_euros', 'rank']
+
+
 class AuthorityContractSerializer(serializers.ModelSerializer):
     uri = serializers.CharField()
     short_title = serializers.CharField()
@@ -1,3 +1,460 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+from datetime import date
+from functools import partial
+from io import StringIO
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import urls as api_urls
+from .cache import bump_generation
+from .cpv_domains import cpv_domains
+from .management.commands.check_query_plans import CHECKS, get_plan_problems, get_sample_values
+from .management.commands.import_xml_documents_data_to_database import Command as ImportCommand, extract_timed
+from .management.db_utils.cpv_cache import cpv_cache
+from .management.db_utils.save_data import MERGE_SEPARATOR, merge_value
+from .management.db_utils.summaries import rebuild_summaries
+from .management.form_utils.base_helper import BaseHelper
+from .management.form_utils.exchange_rates import set_exchange_rates
+from .management.form_utils.form_03.extract_document import extract_document_data
+from .models import Authority, Category, Contract, ContractObject, ContractObjectItem, Country, ExchangeRate, Winner
+from .profiling import QueryBudgetExceeded
+
+# Every request reaches the database, a cached response would run no queries
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'api': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ApiTestCase(TestCase):
+    """
+    A small imported dataset: one busy authority with CONTRACT_COUNT contracts, each with one item won by the busy
+    winner and by a winner of its own, and one contract for each of a few other authorities. Lists are longer than the
+    page sizes the tests compare, and the summaries are rebuilt from the contracts like after an import.
+    """
+
+    CONTRACT_COUNT = 30
+    OTHER_AUTHORITY_COUNT = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = Country.objects.create(code='BG')
+        other_country = Country.objects.create(code='RO')
+
+        medical = Category.objects.create(code='33000000', name='Medical equipments')
+        pharmaceuticals = Category.objects.create(code='33600000', name='Pharmaceutical products', parent=medical)
+        cls.category = Category.objects.create(code='33690000', name='Various medicinal products',
+                                               parent=pharmaceuticals)
+        construction = Category.objects.create(code='45000000', name='Construction work')
+
+        cls.authority = Authority.objects.create(official_name='busy hospital', country=cls.country)
+        cls.winner = Winner.objects.create(official_name='busy supplier', country=cls.country)
+
+        other_authorities = [
+            Authority.objects.create(official_name=f'hospital {number}', country=cls.country)
+            for number in range(cls.OTHER_AUTHORITY_COUNT)
+        ]
+
+        for number in range(cls.CONTRACT_COUNT):
+            cls.create_contract(cls.authority, [cls.winner, Winner.objects.create(
+                official_name=f'supplier {number}', country=other_country if number % 3 else cls.country)],
+                cls.category, number)
+
+        for number, authority in enumerate(other_authorities, start=cls.CONTRACT_COUNT):
+            cls.create_contract(authority, [cls.winner], construction, number)
+
+        # Resolved once per process, the ids differ from one fixture to the next
+        cpv_cache.invalidate()
+        cpv_domains.load()
+
+        rebuild_summaries()
+
+    @staticmethod
+    def create_contract(authority, winners, category, number):
+        contract_object = ContractObject.objects.create(
+            cpv_main_code=category, title=f'supply of medicines {number}', val_total=1000 + number,
+            val_total_currency='EUR', val_total_in_euros=1000 + number, lot_division=False)
+
+        item = ContractObjectItem.objects.create(
+            contract_object=contract_object, title=f'lot {number}', val_total_in_euros=1000 + number)
+        item.cpv_additional.add(category)
+        item.winner.add(*winners)
+
+        contract = Contract.objects.create(
+            doc_id=f'{number:06d}-2024', uri=f'https://ted.europa.eu/{number}',
+            date_published=date(2024, 1 + number % 12, 1), short_title=f'Supply of medicines {number}',
+            contract_nature='Supplies', authority=authority, contract_object=contract_object)
+        contract.original_cpv.add(category)
+
+        return contract
+
+    def get_json(self, url, params=None, status=200):
+        response = self.client.get(url, params)
+
+        self.assertEqual(response.status_code, status, response.content)
+
+        return response.json()
+
+
+class KeysetPaginationTests(ApiTestCase):
+    def get_keyset_urls(self):
+        return [
+            reverse('contractors'),
+            reverse('country_contractors', kwargs={'country_code': self.country.code}),
+            reverse('authority_contracts', kwargs={'official_name': self.authority.official_name}),
+            reverse('winner_object_items', kwargs={'official_name': self.winner.official_name}),
+        ]
+
+    def test_pages_follow_each_other(self):
+        for url in self.get_keyset_urls():
+            with self.subTest(url=url):
+                first = self.get_json(url, {'pagination': 'cursor', 'page_size': 5})
+                second = self.get_json(first['next'])
+
+                self.assertEqual(len(second['results']), 5)
+                self.assertFalse({row['id'] for row in first['results']} & {row['id'] for row in second['results']})
+
+    def test_deep_pages_run_no_count_or_offset(self):
+        for url in self.get_keyset_urls():
+            with self.subTest(url=url):
+                page = self.get_json(url, {'pagination': 'cursor', 'page_size': 5})
+
+                while page['next']:
+                    with CaptureQueriesContext(connection) as queries:
+                        page = self.get_json(page['next'])
+
+                    for query in queries:
+                        self.assertNotIn('COUNT(', query['sql'].upper())
+                        self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_invalid_cursors_are_rejected(self):
+        cursors = ['garbage', encode_cursor([1, 2, 3]), encode_cursor({'id': 1}), encode_cursor([[1], {'a': 1}]),
+                   encode_cursor('1')]
+
+        for url in self.get_keyset_urls():
+            for cursor in cursors:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.get_json(url, {'cursor': cursor}, status=400)
+
+                    self.assertIn('cursor', response)
+
+    def test_unknown_entities_are_not_found(self):
+        for url_name in ['authority_contracts', 'winner_object_items']:
+            with self.subTest(url_name=url_name):
+                self.get_json(reverse(url_name, kwargs={'official_name': 'nobody'}), status=404)
+
+
+class QueryCountTests(ApiTestCase):
+    def count_queries(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_json(url, params)
+
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_the_page_size(self):
+        urls = [
+            reverse('contractors'),
+            reverse('authority_contracts', kwargs={'official_name': self.authority.official_name}),
+            reverse('winner_object_items', kwargs={'official_name': self.winner.official_name}),
+            reverse('country_contractors', kwargs={'country_code': self.country.code}),
+            reverse('country_authorities', kwargs={'country_code': self.country.code}),
+            reverse('authority_details', kwargs={'official_name': self.authority.official_name}),
+        ]
+
+        for url in urls:
+            for pagination in [{}, {'pagination': 'cursor'}]:
+                with self.subTest(url=url, **pagination):
+                    small_page = self.get_json(url, dict(pagination, page_size=10))
+
+                    # The lists are longer than the small page, so the two pages differ in size
+                    if 'results' in small_page:
+                        self.assertEqual(len(small_page['results']), 10)
+
+                    self.assertEqual(self.count_queries(url, dict(pagination, page_size=10)),
+                                     self.count_queries(url, dict(pagination, page_size=100)))
+
+
+class AdvancedSearchTests(ApiTestCase):
+    def search(self, criteria, status=200):
+        response = self.client.post(reverse('advanced_search'), json.dumps(criteria), content_type='application/json')
+
+        self.assertEqual(response.status_code, status, response.content)
+
+        return response.json()
+
+    def test_entities_without_contracts_are_left_out(self):
+        Authority.objects.create(official_name='idle hospital', country=self.country)
+        Winner.objects.create(official_name='idle supplier', country=self.country)
+
+        authorities = self.search({'authorityOrContractor': 'authority'})
+        winners = self.search({'authorityOrContractor': 'contractor'})
+
+        self.assertEqual(authorities['count'], self.OTHER_AUTHORITY_COUNT + 1)
+        self.assertEqual(winners['count'], self.CONTRACT_COUNT + 1)
+
+    def test_criteria_match_the_same_contract(self):
+        authorities = self.search({
+            'authorityOrContractor': 'authority',
+            'placeOfPerformance': {'code': self.country.code},
+            'natureOfContract': 'supplies',
+            'cpvCode': {'code': self.category.code},
+        })
+
+        self.assertEqual([authority['official_name'] for authority in authorities['results']],
+                         [self.authority.official_name])
+
+    def test_invalid_criteria_are_rejected(self):
+        for criteria in [
+            {'authorityOrContractor': 'tenderer'},
+            {'placeOfPerformance': 'BG'},
+            {'cpvCode': ['33690000']},
+            {'cpvCode': {}},
+            {'natureOfContract': 'Gifts'},
+        ]:
+            with self.subTest(criteria=criteria):
+                self.search(criteria, status=400)
+
+
+class CPVDomainTests(ApiTestCase):
+    @override_settings(CACHES=dict(TEST_CACHES, api={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}))
+    def test_domains_are_resolved_again_in_a_new_generation(self):
+        cpv_domains.load()
+
+        category = Category.objects.create(code='33100000', name='Medical equipments',
+                                           parent=Category.objects.get(code='33000000'))
+
+        self.assertNotIn(category.id, cpv_domains.get_category_ids('medical'))
+
+        bump_generation()
+
+        self.assertIn(category.id, cpv_domains.get_category_ids('medical'))
+
+
+class MergeValueTests(SimpleTestCase):
+    def test_near_duplicates_are_not_appended(self):
+        self.assertEqual(merge_value('Zabrze', 'Zabrze,'), 'Zabrze')
+        self.assertEqual(merge_value('rue rene cassin', 'rue Rene  Cassin'), 'rue rene cassin')
+        self.assertEqual(merge_value('Sofia, ul. Vitosha 1', 'ul Vitosha 1'), 'Sofia, ul. Vitosha 1')
+
+    def test_new_values_are_appended(self):
+        self.assertEqual(merge_value('Sofia', 'Sofia 1000'), f'Sofia{MERGE_SEPARATOR}Sofia 1000')
+        self.assertEqual(merge_value(None, 'Sofia'), 'Sofia')
+        self.assertIsNone(merge_value(None, ''))
+        self.assertEqual(merge_value('Sofia', ','), 'Sofia')
+
+
+class ExtractionErrorTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.xml_file_path = os.path.join(directory.name, 'broken.xml')
+
+        with open(self.xml_file_path, 'w') as file:
+            file.write('<TED_EXPORT><broken')
+
+    def test_parse_errors_are_returned_as_warnings(self):
+        xml_file_path, data_dict, warning, _ = extract_timed(extract_document_data, self.xml_file_path)
+
+        self.assertEqual(xml_file_path, self.xml_file_path)
+        self.assertIsNone(data_dict)
+        self.assertIn('ParseError', warning)
+
+    def test_parse_errors_are_returned_as_warnings_by_the_workers(self):
+        documents = list(ImportCommand.extract_documents_in_pool(
+            partial(extract_timed, extract_document_data), [self.xml_file_path], 2, []))
+
+        self.assertEqual(len(documents), 1)
+        self.assertIn('ParseError', documents[0][2])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class EuroConversionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The bundled test documents, with rates for some of their currencies and the fallback rates for the others
+        call_command('import_cpv_codes_to_database', stdout=StringIO())
+
+        ExchangeRate.objects.bulk_create([
+            ExchangeRate(currency='PLN', date=date(2015, 1, 2), rate=4.2935),
+            ExchangeRate(currency='PLN', date=date(2020, 1, 2), rate=4.2544),
+            ExchangeRate(currency='SEK', date=date(2020, 1, 2), rate=10.4728),
+        ])
+
+        call_command('import_xml_documents_data_to_database', stdout=StringIO())
+
+        cls.addClassCleanup(set_exchange_rates, [])
+        cls.addClassCleanup(cpv_cache.invalidate)
+
+    @staticmethod
+    def get_values_in_euros():
+        return (sorted(ContractObject.objects.values_list('id', 'val_total_in_euros')),
+                sorted(ContractObjectItem.objects.values_list('id', 'val_total_in_euros')))
+
+    def test_reconversion_keeps_the_imported_values(self):
+        self.assertTrue(ContractObjectItem.objects.filter(val_total_currency='PLN').exists())
+
+        imported_values = self.get_values_in_euros()
+
+        output = StringIO()
+        call_command('reconvert_values_to_euros', stdout=output)
+
+        self.assertEqual(self.get_values_in_euros(), imported_values)
+        self.assertIn('0 contract objects and 0 contract object items changed', output.getvalue())
+
+    def test_half_cents_are_rounded_up(self):
+        set_exchange_rates([('PLN', date(2024, 1, 2), 4)])
+
+        # 10.7 * 0.25 is printed as 2.675 but stored a little below it
+        self.assertEqual(BaseHelper.get_val_total_in_euros('PLN', 10.7, date(2024, 2, 1)), 2.68)
+
+
+@override_settings(ALLOWED_HOSTS=['localhost', '127.0.0.1'])
+class ApiCommandTests(ApiTestCase):
+    def test_benchmark_requests_every_endpoint_on_an_allowed_host(self):
+        output = StringIO()
+        call_command('benchmark_api', repeat=1, stdout=output)
+
+        self.assertIn('contractor-contracts', output.getvalue())
+
+    def test_query_counts_are_checked_on_an_allowed_host(self):
+        output = StringIO()
+        call_command('check_query_counts', stdout=output)
+
+        self.assertIn('contractor-contracts', output.getvalue())
+
+
+class QueryPlanTests(ApiTestCase):
+    def test_queries_use_their_indexes(self):
+        values = get_sample_values()
+
+        for name in CHECKS:
+            with self.subTest(name=name):
+                plan, problems = get_plan_problems(name, values)
+
+                self.assertEqual(problems, [], plan)
+
+
+class OverBudgetView(APIView):
+    query_budget = 0
+
+    def get(self, request):
+        return Response({'countries': Country.objects.count()})
+
+
+class AuthorityCountrySerializer(serializers.ModelSerializer):
+    country = serializers.CharField(source='country.code')
+
+    class Meta:
+        model = Authority
+        fields = ['official_name', 'country']
+
+
+class AuthorityCountriesView(APIView):
+    def get(self, request):
+        # The country of every authority is read while serializing, one query per row
+        return Response(AuthorityCountrySerializer(Authority.objects.order_by('id'), many=True).data)
+
+
+# The API and views over their budget, for the tests run with ROOT_URLCONF='api.tests'
+urlpatterns = [
+    path('over-budget/', OverBudgetView.as_view(), name='over_budget'),
+    path('authority-countries/', AuthorityCountriesView.as_view(), name='authority_countries'),
+    path('api/', include('api.urls')),
+]
+
+
+@override_settings(API_PROFILING=True, QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(ApiTestCase):
+    def get_requests(self):
+        # URL name -> (URL kwargs, query parameters, POST body or None) of every endpoint
+        country = {'country_code': self.country.code}
+        authority = {'official_name': self.authority.official_name}
+        winner = {'official_name': self.winner.official_name}
+        cpv_code = {'cpv_code': self.category.code}
+
+        return {
+            'home_map': ({}, {}, None),
+            'country_overview': (country, {}, None),
+            'country_authorities': (country, {}, None),
+            'country_contractors': (country, {}, None),
+            'country_cpv_information': (country, {}, None),
+            'country_time_series': (country, {}, None),
+            'categories': ({}, {}, None),
+            'countries': ({}, {}, None),
+            'contractors': ({}, {}, None),
+            'cpv_rankings': (cpv_code, {}, None),
+            'cpv_time_series': (cpv_code, {'interval': 'quarter'}, None),
+            'authority_details': (authority, {}, None),
+            'authority_contracts': (authority, {}, None),
+            'authority_time_series': (authority, {}, None),
+            'contractor_details': (winner, {}, None),
+            'winner_object_items': (winner, {}, None),
+            'contractor_time_series': (winner, {}, None),
+            'advanced_search': ({}, {}, {'authorityOrContractor': 'authority'}),
+            'contract_search': ({}, {'q': 'medicines'}, None),
+            'cache_stats': ({}, {}, None),
+        }
+
+    def test_every_budgeted_endpoint_is_requested(self):
+        budgeted = {pattern.name for pattern in api_urls.urlpatterns
+                    if getattr(pattern.callback.view_class, 'query_budget', None) is not None}
+
+        self.assertEqual(budgeted - self.get_requests().keys(), set())
+
+    def test_endpoints_stay_within_their_budget(self):
+        for name, (kwargs, params, body) in self.get_requests().items():
+            for page_size in [10, 100]:
+                with self.subTest(name=name, page_size=page_size):
+                    url = reverse(name, kwargs=kwargs)
+                    params = dict(params, page_size=page_size)
+
+                    if body is None:
+                        response = self.client.get(url, params)
+                    else:
+                        response = self.client.post(f'{url}?{urlencode(params)}', json.dumps(body),
+                                                    content_type='application/json')
+
+                    self.assertEqual(response.status_code, 200, response.content)
+
+    @override_settings(ROOT_URLCONF='api.tests')
+    def test_over_budget_requests_fail(self):
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('api.profiling', 'WARNING'):
+            self.client.get(reverse('over_budget'))
+
+    @override_settings(ROOT_URLCONF='api.tests', QUERY_BUDGET_STRICT=False)
+    def test_over_budget_requests_are_logged_without_strict_mode(self):
+        with self.assertLogs('api.profiling', 'WARNING'):
+            response = self.client.get(reverse('over_budget'))
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ROOT_URLCONF='api.tests')
+    def test_serialization_is_timed_on_its_own(self):
+        with self.assertLogs('api.profiling', 'DEBUG') as logs:
+            response = self.client.get(reverse('authority_countries'))
+
+        profile = json.loads(logs.records[0].getMessage())
+
+        # The queryset is only read by the serializer as well
+        self.assertEqual(profile['serialization_query_count'], Authority.objects.count() + 1)
+        self.assertEqual(profile['query_count'], profile['serialization_query_count'])
+        self.assertGreaterEqual(profile['serialization_ms'], profile['sql_ms'])
+        self.assertIn(f'ser;dur={profile["serialization_ms"]:.2f};desc="{profile["query_count"]} queries"',
+                      response['Server-Timing'])
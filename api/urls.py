@@ -2,7 +2,8 @@ from django.urls import path
 
 from api.views import CountryInformation, CountryAuthorities, CountryContractors, CPVCategories, \
     AuthorityDetails, AuthorityContracts, HomeMapView, WinnerDetails, WinnerObjectItems, WinnersList, \
-    CountryCPVInformation, CPVCountryRanking, CountriesList, AdvancedSearchView
+    CountryCPVInformation, CPVCountryRanking, CountriesList, AdvancedSearchView, CacheStatsView, \
+    ContractSearchView, CountryTimeSeries, AuthorityTimeSeries, WinnerTimeSeries, CPVTimeSeries
 
 urlpatterns = [
     # Index Map API
@@ -13,6 +14,7 @@ urlpatterns = [
     path('country/<str:country_code>/authorities/', CountryAuthorities.as_view(), name='country_authorities'),
     path('country/<str:country_code>/contractors/', CountryContractors.as_view(), name='country_contractors'),
     path('country/<str:country_code>/cpv-info/', CountryCPVInformation.as_view(), name='country_cpv_information'),
+    path('country/<str:country_code>/time-series/', CountryTimeSeries.as_view(), name='country_time_series'),
 
     # Categories API
     path('categories/', CPVCategories.as_view(), name='categories'),
@@ -25,16 +27,25 @@ urlpatterns = [
 
     # Rankings API
     path('cpv/<str:cpv_code>/rankings', CPVCountryRanking.as_view(), name='cpv_rankings'),
+    path('cpv/<str:cpv_code>/time-series', CPVTimeSeries.as_view(), name='cpv_time_series'),
 
     # Authority Page API
     path('authority/<str:official_name>/', AuthorityDetails.as_view(), name='authority_details'),
     path('authority/<str:official_name>/contracts/', AuthorityContracts.as_view(), name='authority_contracts'),
+    path('authority/<str:official_name>/time-series/', AuthorityTimeSeries.as_view(), name='authority_time_series'),
 
     # Winner Page API
     path('contractor/<str:official_name>/', WinnerDetails.as_view(), name='contractor_details'),
     path('contractor/<str:official_name>/contracts/', WinnerObjectItems.as_view(), name='winner_object_items'),
+    path('contractor/<str:official_name>/time-series/', WinnerTimeSeries.as_view(), name='contractor_time_series'),
 
     # Advanced Search API
     path('advanced-search/', AdvancedSearchView.as_view(), name='advanced_search'),
 
+    # Full-text Search API
+    path('search/', ContractSearchView.as_view(), name='contract_search'),
+
+    # Response Cache API
+    path('cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
+
 ]
@@ -1,79 +1,79 @@
-from django.http import JsonResponse
-from django.db.models import Count, Sum, Q
+import re
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.db.models import Count, Sum, Q, F, Prefetch, Subquery, Window
+from django.db.models.functions import RowNumber
 
 from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.generics import get_object_or_404, ListAPIView
-from rest_framework.pagination import PageNumberPagination
-
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Authority, Contract, ContractObjectItem, Category, ContractObject, Winner, Country
+from .cache import CachedResponseMixin, get_cache_stats
+from .cpv_domains import UnknownCPVDomain, cpv_domains
+from .pagination import CustomPaginator
+from .search import ContractSearchResults
+from .models import Authority, Contract, ContractObjectItem, Category, Winner, Country, CountryStats, \
+    WinnerCpvProfile, CpvCountryRollup, TimeSeriesBucket
 from .serializers import AuthoritySerializer, WinnerSerializer, CategorySerializer, CPVRankingSerializer, \
     CustomWinnerItemsSerializer, AuthorityContractSerializer, CountryAuthoritySerializer, CountryContractorSerializer, \
-    CountryCpvInfoSerializer, CountrySerializer
+    CountryCpvInfoSerializer, CountrySerializer, ContractSearchResultSerializer, CPVRollupRankingSerializer, \
+    CountryCpvRollupSerializer, AdvancedSearchSerializer
 
 
-class CustomPaginator(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+def get_cpv_subtree_filter(cpv_code, prefix=''):
+    # The category and everything below it, as a range of the MPTT fields looked up in the same query
+    root = Category.objects.filter(code=cpv_code).order_by()
 
+    return Q(**{
+        f'{prefix}tree_id': Subquery(root.values('tree_id')),
+        f'{prefix}lft__gte': Subquery(root.values('lft')),
+        f'{prefix}rght__lte': Subquery(root.values('rght')),
+    })
 
-class HomeMapView(APIView):
-    def get(self, request, *args, **kwargs):
-        country_map = {
-            country.id: {
-                "code": country.code,
-                "name": country.name
-            }
-            for country in Country.objects.all()
-        }
 
-        country_data = Authority.objects.values('country').annotate(
-            country_contracts=Count('contract')
-        )
+def get_domain_category_ids(request):
+    # ?domain=<name> picks one of the CPV domains in the settings, resolved once into category ids
+    try:
+        return cpv_domains.get_category_ids(request.query_params.get('domain', settings.CPV_DEFAULT_DOMAIN))
+    except UnknownCPVDomain as e:
+        raise ValidationError({'domain': str(e)})
 
-        original_cpv_counts = Contract.objects.values(
-            'authority__country',
-            'original_cpv__code',
-            'original_cpv__name'
-        ).annotate(
-            original_cpv_count=Count('original_cpv')
-        )
 
-        result_data = {}
+def is_subtree_request(request):
+    # ?subtree=true aggregates over every code under the requested one, from the CpvCountryRollup summary
+    return request.query_params.get('subtree') == 'true'
+
 
-        for country_item in country_data:
-            country_id = country_item['country']
-            country_info = country_map.get(country_id)
+class HomeMapView(CachedResponseMixin, APIView):
+    query_budget = 1
 
-            if not country_info:
-                continue
+    def get(self, request, *args, **kwargs):
+        # Served from the CountryStats summary maintained by the importer (see rebuild_summaries)
+        result_data = {}
 
-            country_code = country_info['code']
+        for country_stats in CountryStats.objects.select_related('country').order_by('country__code'):
+            country_code = country_stats.country.code
 
-            country_result = {
+            result_data[country_code] = {
                 'country': country_code,
-                'country_contracts': country_item['country_contracts'],
-                'top_original_cpvs': {}
+                'country_contracts': country_stats.contract_count,
+                'top_original_cpvs': {
+                    f"{cpv['code']} - {cpv['name']}": cpv['count'] for cpv in country_stats.top_original_cpvs
+                }
             }
 
-            cpvs_for_country = filter(lambda x: x['authority__country'] == country_id, original_cpv_counts)
-            top_original_cpvs = sorted(cpvs_for_country, key=lambda x: x['original_cpv_count'], reverse=True)[:3]
-
-            for cpv_item in top_original_cpvs:
-                cpv_key = f"{cpv_item['original_cpv__code']} - {cpv_item['original_cpv__name']}"
-                country_result['top_original_cpvs'][cpv_key] = cpv_item['original_cpv_count']
-
-            result_data[country_code] = country_result
-
         return JsonResponse(result_data, safe=False)
 
 
-class CountryInformation(APIView):
+class CountryInformation(CachedResponseMixin, APIView):
+    query_budget = 2
+
     def get(self, request, country_code):
-        print(country_code)
         try:
 
             country = Country.objects.get(code=country_code)
@@ -96,16 +96,46 @@ class CountryInformation(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class CountryAuthorities(ListAPIView):
+class CountryAuthorities(CachedResponseMixin, ListAPIView):
     serializer_class = CountryAuthoritySerializer
     pagination_class = CustomPaginator
+    query_budget = 3
+
+    ORDERINGS = {
+        'total_value': [F('total_value').asc(nulls_first=True), 'id'],
+        '-total_value': [F('total_value').desc(nulls_last=True), 'id'],
+        'id': ['id'],
+    }
 
     def get_queryset(self):
         country_code = self.kwargs['country_code']
-
-        return Authority.objects.filter(country__code=country_code).order_by('id')
-
-        # RETURN ORDERED BY VALUE
+        ordering = self.ORDERINGS.get(self.request.query_params.get('ordering'), self.ORDERINGS['-total_value'])
+
+        return Authority.objects.filter(country__code=country_code) \
+            .annotate(total_value=Sum('contract__contract_object__val_total_in_euros')) \
+            .order_by(*ordering)
+
+    @staticmethod
+    def get_top_cpv_codes(authority_ids):
+        # Top 3 original CPVs of every authority on the page in a single windowed query
+        top_cpv_codes = Contract.objects.filter(authority_id__in=authority_ids) \
+            .values('authority_id', 'original_cpv__code', 'original_cpv__name') \
+            .annotate(occurrence_count=Count('original_cpv__code')) \
+            .annotate(rank=Window(RowNumber(), partition_by=F('authority_id'),
+                                  order_by=[F('occurrence_count').desc(), F('original_cpv__code').asc()])) \
+            .filter(rank__lte=3) \
+            .order_by('authority_id', 'rank')
+
+        top_cpv_codes_by_authority = defaultdict(list)
+
+        for cpv in top_cpv_codes:
+            top_cpv_codes_by_authority[cpv['authority_id']].append({
+                'original_cpv__code': cpv['original_cpv__code'],
+                'original_cpv__name': cpv['original_cpv__name'],
+                'occurrence_count': cpv['occurrence_count'],
+            })
+
+        return top_cpv_codes_by_authority
 
     def list(self, request, *args, **kwargs):
         try:
@@ -115,87 +145,86 @@ class CountryAuthorities(ListAPIView):
 
             serializer = self.get_serializer(paginated_queryset, many=True)
 
-            for authority in serializer.data:
-                authority_id = authority['id']
-
-                top_cpv_codes = Contract.objects.filter(authority_id=authority_id) \
-                                    .values('original_cpv__code', 'original_cpv__name') \
-                                    .annotate(occurrence_count=Count('original_cpv__code')) \
-                                    .order_by('-occurrence_count')[:3]
-
-                total_value = ContractObject.objects.filter(contract__authority_id=authority_id) \
-                    .aggregate(total_value=Sum('val_total_in_euros'))['total_value']
+            top_cpv_codes = self.get_top_cpv_codes([authority['id'] for authority in serializer.data])
 
-                authority['total_value'] = total_value
-
-                authority['top_cpv_codes'] = top_cpv_codes
+            for authority in serializer.data:
+                authority['top_cpv_codes'] = top_cpv_codes[authority['id']]
 
             return self.get_paginated_response(serializer.data)
 
         except Authority.DoesNotExist:
             return Response({'error': 'Authorities not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        except (APIException, Http404):
+            raise
+
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class CountryContractors(ListAPIView):
+class CountryContractors(CachedResponseMixin, ListAPIView):
     serializer_class = CountryContractorSerializer
     pagination_class = CustomPaginator
+    keyset_ordering = ['-total_value', 'winner_id']
+    query_budget = 2
 
     def get_queryset(self):
         country_code = self.kwargs['country_code']
 
-        return Winner.objects.filter(country__code=country_code) \
-            .annotate(total_value=Sum('contractobjectitem__val_total_in_euros')) \
-            .order_by('-total_value')
+        # Totals and top CPV codes are precomputed by the importer, see db_utils/winner_profiles.py
+        return WinnerCpvProfile.objects.filter(country__code=country_code) \
+            .select_related('winner') \
+            .order_by('-total_value', 'winner_id')
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.filter_queryset(self.get_queryset())
-
-            paginated_queryset = self.paginate_queryset(queryset)
-
-            serializer = self.get_serializer(paginated_queryset, many=True)
-
-            for contractor in serializer.data:
-                contractor_id = contractor['id']
-
-                top_cpv_codes = ContractObjectItem.objects.filter(winner=contractor_id) \
-                                    .values('cpv_additional__code', 'cpv_additional__name') \
-                                    .annotate(occurrence_count=Count('cpv_additional__code')) \
-                                    .order_by('-occurrence_count')[:3]
-
-                contractor['top_cpv_codes'] = top_cpv_codes
-
-            return self.get_paginated_response(serializer.data)
+            return super().list(request, *args, **kwargs)
 
         except Winner.DoesNotExist:
             return Response({'error': 'Contractors not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        except (APIException, Http404):
+            raise
+
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class CountryCPVInformation(ListAPIView):
+class CountryCPVInformation(CachedResponseMixin, ListAPIView):
     serializer_class = CountryCpvInfoSerializer
     pagination_class = CustomPaginator
+    query_budget = 2
+
+    def get_serializer_class(self):
+        return CountryCpvRollupSerializer if is_subtree_request(self.request) else CountryCpvInfoSerializer
+
+    def get_category_filter(self, prefix):
+        # ?cpv=<code> narrows the list down to the subtree of one code, the CPV domain is used without it
+        cpv_code = self.request.query_params.get('cpv')
+
+        if cpv_code:
+            return get_cpv_subtree_filter(cpv_code, f'{prefix}__')
+
+        return Q(**{f'{prefix}__in': get_domain_category_ids(self.request)})
 
     def get_queryset(self):
         country_code = self.kwargs['country_code']
 
+        if is_subtree_request(self.request):
+            return CpvCountryRollup.objects.filter(self.get_category_filter('category'), country__code=country_code) \
+                .values('category__code', 'category__name', 'item_count', val_total=F('val_total_in_euros')) \
+                .order_by('-val_total', 'category__code')
+
         queryset = ContractObjectItem.objects.filter(contract_object__contract__authority__country__code=country_code)
 
-        queryset = queryset.filter(cpv_additional__code__startswith='33')
+        queryset = queryset.filter(self.get_category_filter('cpv_additional'))
 
-        return queryset
+        return queryset.values('cpv_additional__code', 'cpv_additional__name') \
+            .annotate(val_total=Sum('val_total_in_euros')).order_by('-val_total')
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.filter_queryset(self.get_queryset())
-
-            cpv_info = queryset.values('cpv_additional__code', 'cpv_additional__name') \
-                .annotate(val_total=Sum('val_total_in_euros')).order_by('-val_total')
+            cpv_info = self.filter_queryset(self.get_queryset())
 
             page = self.paginate_queryset(cpv_info)
 
@@ -203,14 +232,21 @@ class CountryCPVInformation(ListAPIView):
 
             return self.get_paginated_response(serializer.data)
 
+        except (APIException, Http404):
+            raise
+
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class CPVCategories(APIView):
+class CPVCategories(CachedResponseMixin, APIView):
+    query_budget = 1
+
     def get(self, request):
+        category_ids = get_domain_category_ids(request)
+
         try:
-            cpv_categories = Category.objects.filter(code__startswith='33')
+            cpv_categories = Category.objects.filter(id__in=category_ids)
 
             serializer = CategorySerializer(cpv_categories, many=True)
 
@@ -220,7 +256,9 @@ class CPVCategories(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class CountriesList(APIView):
+class CountriesList(CachedResponseMixin, APIView):
+    query_budget = 1
+
     def get(self, request):
         try:
             countries = Country.objects.all()
@@ -233,23 +271,32 @@ class CountriesList(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class CPVCountryRanking(ListAPIView):
+class CPVCountryRanking(CachedResponseMixin, ListAPIView):
     serializer_class = CPVRankingSerializer
     pagination_class = CustomPaginator
+    query_budget = 2
+
+    def get_serializer_class(self):
+        return CPVRollupRankingSerializer if is_subtree_request(self.request) else CPVRankingSerializer
 
     def get_queryset(self):
         cpv_code = self.kwargs['cpv_code']
-        queryset = ContractObjectItem.objects.filter(cpv_additional__code=cpv_code)
-        return queryset
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        if is_subtree_request(self.request):
+            return CpvCountryRollup.objects.filter(category__code=cpv_code) \
+                .values('country__code', 'country__name', 'item_count', val_total=F('val_total_in_euros')) \
+                .order_by('-val_total', 'country__code')
 
-        cpv_ranking = queryset.values('contract_object__contract__authority__country__name',
-                                      'contract_object__contract__authority__country__code') \
+        queryset = ContractObjectItem.objects.filter(cpv_additional__code=cpv_code)
+
+        return queryset.values('contract_object__contract__authority__country__name',
+                               'contract_object__contract__authority__country__code') \
             .annotate(val_total=Sum('val_total_in_euros')) \
             .order_by('-val_total')
 
+    def list(self, request, *args, **kwargs):
+        cpv_ranking = self.get_queryset()
+
         page = self.paginate_queryset(cpv_ranking)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -259,16 +306,20 @@ class CPVCountryRanking(ListAPIView):
         return Response(serializer.data)
 
 
-class WinnersList(ListAPIView):
-    queryset = Winner.objects.all().order_by('id')
+class WinnersList(CachedResponseMixin, ListAPIView):
+    queryset = Winner.objects.select_related('country').order_by('id')
     serializer_class = WinnerSerializer
     pagination_class = CustomPaginator
+    keyset_ordering = ['id']
+    query_budget = 2
+
 
+class AuthorityDetails(CachedResponseMixin, APIView):
+    query_budget = 3
 
-class AuthorityDetails(APIView):
     def get(self, request, official_name):
         try:
-            authority = Authority.objects.get(official_name=official_name)
+            authority = Authority.objects.select_related('country').get(official_name=official_name)
 
             total_contracts = Contract.objects.filter(authority=authority).count()
 
@@ -293,16 +344,22 @@ class AuthorityDetails(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class AuthorityContracts(ListAPIView):
+class AuthorityContracts(CachedResponseMixin, ListAPIView):
     serializer_class = AuthorityContractSerializer
     pagination_class = CustomPaginator
+    keyset_ordering = ['id']
+    query_budget = 4
 
     def get_queryset(self):
         official_name = self.kwargs['official_name']
 
         authority = get_object_or_404(Authority, official_name=official_name)
 
-        return Contract.objects.filter(authority=authority).order_by('id')
+        # Everything AuthorityContractSerializer reads, so a page costs the same number of queries whatever its size
+        return Contract.objects.filter(authority=authority) \
+            .select_related('contract_object') \
+            .prefetch_related('original_cpv') \
+            .order_by('id')
 
     def list(self, request, *args, **kwargs):
         try:
@@ -317,14 +374,19 @@ class AuthorityContracts(ListAPIView):
         except Authority.DoesNotExist:
             return Response({'error': 'Authority not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        except (APIException, Http404):
+            raise
+
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class WinnerDetails(APIView):
+class WinnerDetails(CachedResponseMixin, APIView):
+    query_budget = 2
+
     def get(self, request, official_name):
         try:
-            winner = Winner.objects.get(official_name=official_name)
+            winner = Winner.objects.select_related('country').get(official_name=official_name)
 
             contract_object_items = ContractObjectItem.objects.filter(winner=winner).count()
 
@@ -345,16 +407,22 @@ class WinnerDetails(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class WinnerObjectItems(ListAPIView):
+class WinnerObjectItems(CachedResponseMixin, ListAPIView):
     serializer_class = CustomWinnerItemsSerializer
     pagination_class = CustomPaginator
+    keyset_ordering = ['id']
+    query_budget = 5
 
     def get_queryset(self):
         official_name = self.kwargs['official_name']
 
         winner = get_object_or_404(Winner, official_name=official_name)
 
-        return ContractObjectItem.objects.filter(winner=winner).order_by('id')
+        # Everything CustomWinnerItemsSerializer reads, including the country of every winner of an item
+        return ContractObjectItem.objects.filter(winner=winner) \
+            .select_related('contract_object__contract__authority') \
+            .prefetch_related('cpv_additional', Prefetch('winner', queryset=Winner.objects.select_related('country'))) \
+            .order_by('id')
 
     def list(self, request, *args, **kwargs):
         try:
@@ -369,49 +437,202 @@ class WinnerObjectItems(ListAPIView):
         except Winner.DoesNotExist:
             return Response({'error': 'Winner object items not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        except (APIException, Http404):
+            raise
+
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class TimeSeriesView(CachedResponseMixin, APIView):
+    """
+    Monthly or quarterly (`?interval=quarter`) contract counts and values of one entity, optionally limited to
+    `?from=YYYY-MM` and `?to=YYYY-MM`. Served from the TimeSeriesBucket summary, months without contracts are left out.
+    """
+
+    query_budget = 2
+
+    # Set by the subclasses: bucket dimension, model of the entity and the field looked up from the URL kwarg
+    dimension = None
+    model = None
+    lookup_field = None
+    lookup_url_kwarg = None
+
+    INTERVALS = ['month', 'quarter']
+    MONTH_PATTERN = re.compile(r'^(\d{4})-(\d{2})$')
+
+    @classmethod
+    def get_buckets(cls, object_id, start=None, end=None):
+        # A range of the unique (dimension, object_id, month) index
+        buckets = TimeSeriesBucket.objects.filter(dimension=cls.dimension, object_id=object_id)
+
+        if start:
+            buckets = buckets.filter(month__gte=start)
+        if end:
+            buckets = buckets.filter(month__lte=end)
+
+        return buckets.order_by('month')
+
+    def get_month(self, name, quarter_edge=0):
+        value = self.request.query_params.get(name)
+
+        if not value:
+            return None
+
+        match = self.MONTH_PATTERN.match(value)
+
+        if not match or not 1 <= int(match.group(2)) <= 12:
+            raise ValidationError({name: 'Expected a month as YYYY-MM.'})
+
+        year, month = int(match.group(1)), int(match.group(2))
+
+        # Whole quarters: the first month of the quarter of `from`, the last month of the quarter of `to`
+        if quarter_edge:
+            month = (month - 1) // 3 * 3 + quarter_edge
+
+        return date(year, month, 1)
+
+    def get(self, request, **kwargs):
+        interval = request.query_params.get('interval', 'month')
+
+        if interval not in self.INTERVALS:
+            raise ValidationError({'interval': f'Expected one of: {", ".join(self.INTERVALS)}.'})
+
+        quarterly = interval == 'quarter'
+        start = self.get_month('from', 1 if quarterly else 0)
+        end = self.get_month('to', 3 if quarterly else 0)
+
+        object_id = get_object_or_404(self.model.objects.values_list('id', flat=True),
+                                      **{self.lookup_field: kwargs[self.lookup_url_kwarg]})
+
+        series = {}
+
+        for month, count, value in self.get_buckets(object_id, start, end) \
+                .values_list('month', 'count', 'val_total_in_euros'):
+            period = f'{month.year}-Q{(month.month - 1) // 3 + 1}' if quarterly else f'{month:%Y-%m}'
+            entry = series.setdefault(period, {'period': period, 'count': 0, 'val_total': 0})
+
+            entry['count'] += count
+            entry['val_total'] += value
+
+        return Response({'interval': interval, 'series': list(series.values())}, status=status.HTTP_200_OK)
+
+
+class CountryTimeSeries(TimeSeriesView):
+    dimension = TimeSeriesBucket.DIMENSION_COUNTRY
+    model = Country
+    lookup_field = 'code'
+    lookup_url_kwarg = 'country_code'
+
+
+class AuthorityTimeSeries(TimeSeriesView):
+    dimension = TimeSeriesBucket.DIMENSION_AUTHORITY
+    model = Authority
+    lookup_field = 'official_name'
+    lookup_url_kwarg = 'official_name'
+
+
+class WinnerTimeSeries(TimeSeriesView):
+    # Counts the items won instead of the contracts
+    dimension = TimeSeriesBucket.DIMENSION_WINNER
+    model = Winner
+    lookup_field = 'official_name'
+    lookup_url_kwarg = 'official_name'
+
+
+class CPVTimeSeries(TimeSeriesView):
+    # Counts the items with a CPV code anywhere under the category
+    dimension = TimeSeriesBucket.DIMENSION_CPV
+    model = Category
+    lookup_field = 'code'
+    lookup_url_kwarg = 'cpv_code'
+
+
 class AdvancedSearchView(APIView):
-    def post(self, request):
-        search_criteria = request.data
-        entity = search_criteria.get('authorityOrContractor')
+    pagination_class = CustomPaginator
+    keyset_ordering = ['id']
+    query_budget = 2
+
+    @staticmethod
+    def get_contract_filter(search_criteria, prefix=''):
         place_of_performance = search_criteria.get('placeOfPerformance')
         nature_of_contract = search_criteria.get('natureOfContract')
         cpv_code = search_criteria.get('cpvCode')
 
-        if entity == 'authority':
-            query = Q()
+        # At least one contract, also when no criterion is given
+        query = Q(**{f'{prefix}id__isnull': False})
 
-            if place_of_performance:
-                query &= Q(authority__country__code=place_of_performance['code'])
-            if nature_of_contract:
-                query &= Q(contract_nature=nature_of_contract.capitalize())
-            if cpv_code:
-                query &= Q(original_cpv__code=cpv_code['code'])
+        if place_of_performance:
+            query &= Q(**{f'{prefix}authority__country__code': place_of_performance['code']})
+        if nature_of_contract:
+            query &= Q(**{f'{prefix}contract_nature': nature_of_contract.capitalize()})
+        if cpv_code:
+            query &= Q(**{f'{prefix}original_cpv__code': cpv_code['code']})
 
-            contracts = Contract.objects.filter(query)
+        return query
 
-            authorities = [contract.authority for contract in contracts]
+    def post(self, request):
+        serializer = AdvancedSearchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-            serialized_authorities = AuthoritySerializer(authorities, many=True)
+        search_criteria = serializer.validated_data
+        entity = search_criteria['authorityOrContractor']
 
-            return Response(serialized_authorities.data)
+        # Every criterion must match the same contract, so they are applied in a single filter() call
+        if entity == 'authority':
+            queryset = Authority.objects.filter(self.get_contract_filter(search_criteria, 'contract__'))
+            serializer_class = AuthoritySerializer
         else:
-            query = Q()
+            queryset = Winner.objects.filter(
+                self.get_contract_filter(search_criteria, 'contractobjectitem__contract_object__contract__'))
+            serializer_class = WinnerSerializer
+
+        queryset = queryset.select_related('country').distinct().order_by('id')
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+
+        serializer = serializer_class(page, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ContractSearchView(ListAPIView):
+    serializer_class = ContractSearchResultSerializer
+    pagination_class = CustomPaginator
+    query_budget = 3
 
-            if place_of_performance:
-                query &= Q(authority__country__code=place_of_performance['code'])
-            if nature_of_contract:
-                query &= Q(contract_nature=nature_of_contract.capitalize())
-            if cpv_code:
-                query &= Q(original_cpv__code=cpv_code['code'])
+    def get_queryset(self):
+        return ContractSearchResults(self.request.query_params.get('q', ''))
+
+    def list(self, request, *args, **kwargs):
+        try:
+            page = self.paginate_queryset(self.get_queryset())
+
+            contracts = Contract.objects.select_related('authority__country', 'contract_object') \
+                .in_bulk([contract_id for contract_id, _ in page])
+
+            # Keep the order of the ranked matches
+            results = []
+
+            for contract_id, rank in page:
+                contract = contracts[contract_id]
+                contract.rank = rank
+                results.append(contract)
 
-            contracts = Contract.objects.filter(query)
+            serializer = self.get_serializer(results, many=True)
 
-            authorities = [contract.authority for contract in contracts]
+            return self.get_paginated_response(serializer.data)
+
+        except (APIException, Http404):
+            raise
 
-            serialized_authorities = AuthoritySerializer(authorities, many=True)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            return Response(serialized_authorities.data)
+
+class CacheStatsView(APIView):
+    query_budget = 0
+
+    def get(self, request):
+        return Response(get_cache_stats(), status=status.HTTP_200_OK)
@@ -1,4 +1,6 @@
+import json
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
@@ -41,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it counts the queries of every other middleware as well
+    'api.profiling.QueryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -99,6 +103,55 @@ else:
         }
     }
 
+# Cache for the API responses (see api/cache.py). The importer invalidates it from its own process, so the local memory
+# backend only suits setups where imports run in the same process as the server.
+API_CACHE_BACKENDS = {
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': API_CACHE_BACKENDS[os.getenv('API_CACHE_BACKEND', 'file')],
+        'LOCATION': os.getenv('API_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'tender_api_cache')),
+        'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', 60 * 60 * 24)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('API_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Query count and timings of every request (see api/profiling.py), on by default in development. With
+# QUERY_BUDGET_STRICT a view running more queries than its `query_budget` raises instead of only logging a warning.
+# Requests within their budget are logged at DEBUG, API_PROFILING_LOG_LEVEL=DEBUG prints them.
+API_PROFILING = os.getenv('API_PROFILING', str(DEBUG)) == 'True'
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+# Named CPV domains (sector verticals): name -> CPV codes whose subtrees make up the domain (see api/cpv_domains.py).
+# The CPV endpoints take `?domain=<name>` and use CPV_DEFAULT_DOMAIN without it. CPV_DOMAINS is JSON in the environment.
+CPV_DOMAINS = json.loads(os.getenv('CPV_DOMAINS', '{"medical": ["33000000"]}'))
+CPV_DEFAULT_DOMAIN = os.getenv('CPV_DEFAULT_DOMAIN', 'medical')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': os.getenv('API_PROFILING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',